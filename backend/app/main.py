@@ -14,12 +14,12 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, FileResponse, HTMLResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field, validator, root_validator
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Optional, Tuple, Union, Callable
 from datetime import datetime, timedelta
 import logging
 import random
 from enum import Enum
-from elasticsearch import Elasticsearch
+from elasticsearch import Elasticsearch, AsyncElasticsearch
 from app.utils.indexing_utils import process_and_index_file, ES_INDEX_NAME, check_file_exists, format_file_size
 from fastapi.responses import FileResponse, StreamingResponse
 import mimetypes  # 파일 타입 감지용
@@ -29,16 +29,37 @@ from pathlib import Path  # 경로 처리용
 from fastapi import Request as FastAPIRequest # FastAPI의 Request를 명시적으로 임포트
 
 # 검색 개선 모듈 import
-from app.utils.search_enhancer import EnhancedSearchPipeline
+from app.utils.search_enhancer import EnhancedSearchPipeline, reciprocal_rank_fusion, weighted_linear_fusion
 # 피드백 분석 모듈 import
 from app.utils.feedback_analyzer import FeedbackAnalyzer, SearchQualityOptimizer
 # 파일 관리 모듈 import
-from app.utils.file_manager import delete_indexed_file, find_file_by_name
+from app.utils.file_manager import (
+    delete_indexed_file, delete_indexed_file_async, delete_file_from_es, delete_file_from_es_async, find_file_by_name,
+)
+# 요청 간 공유 결과 캐시 모듈 import
+from app.utils.result_cache import get_shared_result_cache, get_rerank_score_cache, normalize_query
+from app.utils.embedding_cache import QueryEmbeddingCache
+from app.utils.batching import BatchDispatcher
+from app.utils.onnx_backend import load_onnx_backend
+from app.utils.generation_scheduler import GenerationScheduler, GenerationQueueFull, GenerationTicket
+from app.utils.continuous_batching import ContinuousBatchingEngine
+from app.utils.llm_utils import CancellationStoppingCriteria, PrefixKVCache
+from app.utils.context_packer import make_token_counter, pack_documents
+from app.utils.sse_utils import TokenCoalescer, format_sse, iterate_streamer, replay_answer_frames
+from app.utils.semantic_cache import get_semantic_cache
+from app.utils.single_flight import Flight, SingleFlightGroup
+from app.utils.citation_utils import CitationIndex
+from app.utils.model_registry import ModelRegistry
+from app.utils.model_residency import get_model_residency_manager
+from app.utils.model_client import ModelServerClient, RemoteEmbeddingFunction, RemoteLLM, RemoteReranker
+from app.utils.warmup import WarmupRunner, build_warmup_plan, collect_frequent_questions
+from app.utils.job_queue import IngestionJobQueue, JobStore
+from app.utils.process_lock import ProcessLock
 
 # 모델 임포트
 import torch
 from torch.cuda.amp import autocast
-from transformers import AutoTokenizer, AutoModelForCausalLM, BitsAndBytesConfig, TextIteratorStreamer
+from transformers import AutoTokenizer, AutoModelForCausalLM, BitsAndBytesConfig, TextIteratorStreamer, StoppingCriteriaList
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain.schema import Document
 from sentence_transformers import CrossEncoder
@@ -74,6 +95,119 @@ EMBEDDING_MODEL_NAME = r"/home/root/kpf-sbert-v1.1"
 #RERANKER_MODEL_NAME = r"/home/root/bge-reranker-large"
 RERANKER_MODEL_NAME = r"/home/root/bge-reranker-v2-m3"
 ES_HOST = "http://172.10.2.70:9200"
+
+# 벡터 검색 방식 설정
+# - "knn": HNSW 인덱스를 사용하는 top-level knn 검색 + BM25 결과를 융합 (코퍼스 크기에 대해 sublinear)
+# - "script_score": match_all 위에서 cosineSimilarity를 계산하는 기존 전수 스캔 방식
+RETRIEVAL_MODE = os.environ.get("RETRIEVAL_MODE", "knn")
+KNN_NUM_CANDIDATES = int(os.environ.get("KNN_NUM_CANDIDATES", "100"))  # HNSW 탐색 후보 수 (k 이상이어야 함)
+HYBRID_FUSION_METHOD = os.environ.get("HYBRID_FUSION_METHOD", "rrf")  # "rrf" 또는 "linear"
+HYBRID_RRF_K = 60  # RRF 순위 평활 상수
+HYBRID_VECTOR_WEIGHT = float(os.environ.get("HYBRID_VECTOR_WEIGHT", "0.5"))  # 융합 시 벡터 결과 가중치 (BM25는 1 - 값)
+
+# 다중 쿼리 변형 검색 설정 (QueryExpander 변형을 한 번의 msearch로 검색 후 RRF 융합)
+MULTI_VARIANT_RETRIEVAL = os.environ.get("MULTI_VARIANT_RETRIEVAL", "true").lower() == "true"
+MULTI_VARIANT_WEIGHT = 0.7  # 원본 쿼리 대비 변형 쿼리 결과의 융합 가중치
+
+# Elasticsearch 연결 풀 및 호출별 타임아웃 설정 (초)
+ES_CONNECTIONS_PER_NODE = int(os.environ.get("ES_CONNECTIONS_PER_NODE", "32"))  # 노드당 최대 커넥션 수
+ES_QUERY_TIMEOUT = float(os.environ.get("ES_QUERY_TIMEOUT", "10"))  # 조회성 API 호출 타임아웃
+ES_DELETE_TIMEOUT = float(os.environ.get("ES_DELETE_TIMEOUT", "120"))  # delete_by_query 등 장시간 작업 타임아웃
+
+# 쿼리 임베딩 캐시 설정 (프로세스 내 LRU + Redis 바이너리 캐시)
+QUERY_EMBEDDING_CACHE = os.environ.get("QUERY_EMBEDDING_CACHE", "true").lower() == "true"
+QUERY_EMBEDDING_CACHE_SIZE = int(os.environ.get("QUERY_EMBEDDING_CACHE_SIZE", "4096"))  # 로컬 LRU 최대 항목 수
+
+# 쿼리 임베딩 마이크로 배칭 설정 (동시 요청의 쿼리를 모아 한 번의 forward로 처리)
+EMBEDDING_MICRO_BATCHING = os.environ.get("EMBEDDING_MICRO_BATCHING", "true").lower() == "true"
+EMBEDDING_BATCH_MAX_SIZE = int(os.environ.get("EMBEDDING_BATCH_MAX_SIZE", "32"))
+EMBEDDING_BATCH_MAX_WAIT_MS = float(os.environ.get("EMBEDDING_BATCH_MAX_WAIT_MS", "5"))
+
+# 색인용 벌크 임베딩 설정 (길이순 정렬 후 토큰 예산 단위로 배치 구성)
+EMBEDDING_BULK_TOKEN_BUDGET = int(os.environ.get("EMBEDDING_BULK_TOKEN_BUDGET", "16384"))  # 배치당 (최대 길이 x 문장 수) 상한
+EMBEDDING_BULK_MAX_BATCH = int(os.environ.get("EMBEDDING_BULK_MAX_BATCH", "128"))  # 배치당 최대 문장 수
+
+# 임베딩/리랭커 추론 백엔드 설정 ("torch", "onnx", "auto"=GPU가 없을 때만 ONNX)
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "torch").lower()
+ONNX_QUANTIZE = os.environ.get("ONNX_QUANTIZE", "true").lower() == "true"  # 동적 int8 양자화 사용 여부
+ONNX_PARITY_CHECK = os.environ.get("ONNX_PARITY_CHECK", "true").lower() == "true"  # PyTorch 출력과 비교 후 사용
+ONNX_NUM_THREADS = int(os.environ.get("ONNX_NUM_THREADS", "0")) or None  # 0이면 onnxruntime 기본값
+
+# 리랭킹 설정 ("full": 상위 후보 전체 cross-encoder, "cascade": 검색 점수로 선별 후 애매한 후보만 계산)
+RERANK_MODE = os.environ.get("RERANK_MODE", "full").lower()
+RERANK_LATENCY_BUDGET_MS = float(os.environ.get("RERANK_LATENCY_BUDGET_MS", "250"))  # cascade 2단계 지연 예산
+RERANK_CASCADE_ACCEPT = 0.9  # 정규화 1차 점수가 이 이상이면 cross-encoder 없이 상위 유지
+RERANK_CASCADE_REJECT = 0.15  # 정규화 1차 점수가 이 이하이면 cross-encoder 없이 하위 처리
+RERANK_CASCADE_BATCH = 4  # 2단계에서 한 번에 계산할 후보 수 (배치마다 예산/안정성 확인)
+RERANK_CASCADE_STABLE_TOP = 7  # 순위 안정성을 확인할 상위 문서 수 (LLM 컨텍스트 문서 수)
+
+# 리랭커 동적 배칭 설정 (동시 요청의 (쿼리, 문서) 쌍을 공유 배치로 처리)
+RERANK_DYNAMIC_BATCHING = os.environ.get("RERANK_DYNAMIC_BATCHING", "true").lower() == "true"
+RERANK_BATCH_MAX_SIZE = int(os.environ.get("RERANK_BATCH_MAX_SIZE", "32"))
+RERANK_BATCH_MAX_WAIT_MS = float(os.environ.get("RERANK_BATCH_MAX_WAIT_MS", "8"))
+
+# LLM 생성 스케줄러 설정 (공유 LLM 동시 생성 수 및 대기열 제한)
+LLM_MAX_CONCURRENT_GENERATIONS = int(os.environ.get("LLM_MAX_CONCURRENT_GENERATIONS", "1"))
+LLM_GENERATION_QUEUE_SIZE = int(os.environ.get("LLM_GENERATION_QUEUE_SIZE", "16"))  # 초과 시 503/busy
+LLM_SCHEDULING_POLICY = os.environ.get("LLM_SCHEDULING_POLICY", "fifo").lower()  # "fifo" 또는 "priority"
+LLM_QUEUE_TIMEOUT = float(os.environ.get("LLM_QUEUE_TIMEOUT", "120"))  # 대기열 최대 대기 시간 (초)
+GENERATION_PRIORITY_CHAT = 0  # priority 정책에서 낮을수록 먼저 처리
+GENERATION_PRIORITY_SQL = 1
+LLM_BUSY_MESSAGE = "현재 요청이 많아 답변을 생성할 수 없습니다. 잠시 후 다시 시도해 주세요."
+
+# LLM 추론 방식 ("generate": 요청별 model.generate 스레드, "continuous": 연속 배칭 엔진)
+LLM_INFERENCE_MODE = os.environ.get("LLM_INFERENCE_MODE", "generate").lower()
+CONTINUOUS_BATCH_MAX_SIZE = int(os.environ.get("CONTINUOUS_BATCH_MAX_SIZE", "8"))  # 동시에 디코딩할 최대 시퀀스 수
+
+# 고정 시스템 프롬프트 접두사의 KV 캐시 재사용 (generate 모드에서만 적용)
+PREFIX_KV_CACHE = os.environ.get("PREFIX_KV_CACHE", "true").lower() == "true"
+
+# LLM 컨텍스트 패킹 (인덱싱 시 저장한 청크별 token_count 기준)
+LLM_CONTEXT_TOKEN_BUDGET = int(os.environ.get("LLM_CONTEXT_TOKEN_BUDGET", "3500"))  # 문서 컨텍스트 최대 토큰 수
+LLM_CONTEXT_MAX_DOCS = int(os.environ.get("LLM_CONTEXT_MAX_DOCS", "7"))  # /api/chat 컨텍스트 최대 문서 수
+
+# SSE 토큰 프레임 묶음 전송 (시간 창 또는 바이트 임계값 도달 시 전송, 0이면 토큰마다 전송)
+SSE_COALESCE_WINDOW_MS = float(os.environ.get("SSE_COALESCE_WINDOW_MS", "30"))
+SSE_COALESCE_MAX_BYTES = int(os.environ.get("SSE_COALESCE_MAX_BYTES", "256"))
+
+# 의미 기반 답변 캐시 (표현만 다른 질문을 질문 임베딩 유사도로 매칭)
+SEMANTIC_CACHE = os.environ.get("SEMANTIC_CACHE", "true").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", "0.95"))  # 코사인 유사도 임계값
+
+# 모델 로딩 (startup 이벤트에서 독립적인 모델을 백그라운드로 병렬 로드)
+MODEL_LOAD_WORKERS = int(os.environ.get("MODEL_LOAD_WORKERS", "3"))  # 동시에 로드할 최대 모델 수
+MODEL_BACKGROUND_LOADING = os.environ.get("MODEL_BACKGROUND_LOADING", "true").lower() == "true"  # false면 startup에서 로드 완료까지 대기
+MODELS_LOADING_MESSAGE = "모델을 불러오는 중입니다. 잠시 후 다시 시도해 주세요."
+# SQLCoder는 기본적으로 첫 SQL 요청 시 로드 (메모리 예산/유휴 해제는 MODEL_MEMORY_BUDGET_GB, MODEL_IDLE_UNLOAD_SECONDS)
+SQLCODER_PRELOAD = os.environ.get("SQLCODER_PRELOAD", "false").lower() == "true"
+
+# 모델 서버 분리 (설정 시 임베딩/리랭커/LLM을 로드하지 않고 app.model_server 프로세스를 HTTP로 호출)
+# API 워커를 uvicorn --workers N 으로 늘려도 모델 사본은 모델 서버에 하나만 유지됨
+MODEL_SERVER_URL = os.environ.get("MODEL_SERVER_URL", "").strip()  # 예: http://127.0.0.1:8001
+MODEL_SERVER_TIMEOUT = float(os.environ.get("MODEL_SERVER_TIMEOUT", "60"))  # 임베딩/리랭크 호출 타임아웃 (초)
+MODEL_SERVER_READY_TIMEOUT = float(os.environ.get("MODEL_SERVER_READY_TIMEOUT", "900"))  # 모델 서버 로드 완료 대기 (초)
+
+# 시작 워밍업 (합성 질문 + 자주 묻는 질문을 카테고리별로 채팅 파이프라인에 통과시켜 모델 경로와 캐시를 미리 준비)
+WARMUP_ON_STARTUP = os.environ.get("WARMUP_ON_STARTUP", "true").lower() == "true"  # false면 /api/warmup 호출 시에만 실행
+WARMUP_TOP_N = int(os.environ.get("WARMUP_TOP_N", "5"))  # 카테고리별 자주 묻는 질문 수
+WARMUP_MAX_RUNS = int(os.environ.get("WARMUP_MAX_RUNS", "20"))  # 워밍업 1회 최대 실행 질문 수
+WARMUP_LOCK_PATH = "app/warmup.lock"  # API 워커가 여러 개여도 시작 워밍업은 잠금을 얻은 워커 하나만 실행
+WARMUP_CATEGORIES = [c.strip() for c in os.environ.get("WARMUP_CATEGORIES", "").split(",") if c.strip()]  # 비우면 색인된 전체 카테고리
+
+# 업로드 색인 작업 대기열 (업로드는 작업 ID를 즉시 반환하고 워커가 백그라운드에서 색인)
+INGESTION_JOB_DIR = "app/jobs"  # 작업별 상태 JSON 저장 디렉토리 (재시작 시 미완료 작업 재처리)
+INGESTION_WORKERS = int(os.environ.get("INGESTION_WORKERS", "1"))  # 동시에 처리할 작업 수
+INGESTION_JOB_RETENTION_DAYS = float(os.environ.get("INGESTION_JOB_RETENTION_DAYS", "7"))  # 완료 작업 보관 기간
+
+# 동일 질문(정규화 질문 + 카테고리) 동시 요청은 먼저 들어온 요청의 스트림을 공유
+CHAT_SINGLE_FLIGHT = os.environ.get("CHAT_SINGLE_FLIGHT", "true").lower() == "true"
+
+# RAG 답변 생성용 시스템 지시문 (문서 컨텍스트 앞의 고정 부분)
+SYSTEM_PROMPT_HEADER = """You are a helpful AI assistant. Answer the questions based on the provided documents.
+If the information is not in the documents, say that you cannot answer.
+Provided documents:
+"""
+
 STATIC_DIR = "app/static"
 IMAGE_DIR = os.path.join(STATIC_DIR, "document_images")
 os.makedirs(IMAGE_DIR, exist_ok=True)
@@ -116,6 +250,7 @@ def get_elasticsearch_client():
             retry_on_timeout=True,
             max_retries=3,
             verify_certs=False,
+            connections_per_node=ES_CONNECTIONS_PER_NODE,  # 스레드 풀(검색/벌크 인덱싱)에서 공유
         )
 
         if not client.ping():
@@ -166,6 +301,7 @@ def get_elasticsearch_client():
                         "total_chunks": {"type": "integer"},
                         "indexed_at": {"type": "date"},
                         "image_path": {"type": "keyword"},
+                        "token_count": {"type": "integer"},
                     }
                 },
             }
@@ -176,6 +312,14 @@ def get_elasticsearch_client():
             except Exception as e:
                 print(f"Elasticsearch 인덱스 생성 실패: {e}")
                 return None
+        else:
+            # 기존 인덱스에 LLM 토큰 수 필드 추가 (이미 있으면 변경 없음)
+            try:
+                client.indices.put_mapping(
+                    index=ES_INDEX_NAME, properties={"token_count": {"type": "integer"}}
+                )
+            except Exception as e:
+                print(f"token_count 매핑 추가 실패 (무시하고 진행): {e}")
 
         return client
     except Exception as e:
@@ -184,6 +328,50 @@ def get_elasticsearch_client():
         return None
 
 
+async def get_async_elasticsearch_client() -> Optional[AsyncElasticsearch]:
+    """
+    이벤트 루프에서 사용하는 공유 AsyncElasticsearch 클라이언트를 생성합니다.
+    (인덱스 생성은 동기 클라이언트 초기화 시 처리됨)
+    """
+    print("Initializing async Elasticsearch client...")
+    client = None
+    try:
+        client = AsyncElasticsearch(
+            ES_HOST,
+            request_timeout=60,
+            retry_on_timeout=True,
+            max_retries=3,
+            verify_certs=False,
+            connections_per_node=ES_CONNECTIONS_PER_NODE,
+        )
+
+        if not await client.options(request_timeout=ES_QUERY_TIMEOUT).ping():
+            print("비동기 Elasticsearch 클라이언트가 서버에 연결할 수 없습니다.")
+            await client.close()
+            return None
+
+        print(f"Async Elasticsearch client connected successfully (connections_per_node={ES_CONNECTIONS_PER_NODE}).")
+        return client
+    except Exception as e:
+        print(f"비동기 Elasticsearch 클라이언트 초기화 중 오류 발생: {e}")
+        traceback.print_exc()
+        if client is not None:
+            await client.close()
+        return None
+
+
+def es_call(client: AsyncElasticsearch, timeout: float = ES_QUERY_TIMEOUT) -> AsyncElasticsearch:
+    """호출별 타임아웃이 적용된 AsyncElasticsearch 클라이언트 뷰 반환"""
+    return client.options(request_timeout=timeout)
+
+
+def use_onnx_backend() -> bool:
+    """설정에 따라 임베딩/리랭커에 ONNX Runtime 백엔드를 사용할지 결정"""
+    if INFERENCE_BACKEND == "onnx":
+        return True
+    return INFERENCE_BACKEND == "auto" and not torch.cuda.is_available()
+
+
 def get_embedding_function():
     """임베딩 기능을 제공하는 함수를 반환합니다."""
     print("Loading embedding function...")
@@ -210,6 +398,132 @@ def get_embedding_function():
                         model_name=model_name, 
                         model_kwargs={"device": "cpu"}
                     )
+
+                # CPU 노드에서는 동일한 인터페이스의 ONNX Runtime 백엔드로 교체
+                if use_onnx_backend():
+                    onnx_model = load_onnx_backend(
+                        "embedding",
+                        model_name,
+                        quantize=ONNX_QUANTIZE,
+                        reference=self.embeddings_model if ONNX_PARITY_CHECK else None,
+                        num_threads=ONNX_NUM_THREADS,
+                    )
+                    if onnx_model is not None:
+                        self.embeddings_model = onnx_model
+
+                # 쿼리 경로용 임베딩 캐시 (문서 색인 경로는 __call__ 사용)
+                self.query_cache = (
+                    QueryEmbeddingCache(model_name, local_max_entries=QUERY_EMBEDDING_CACHE_SIZE)
+                    if QUERY_EMBEDDING_CACHE else None
+                )
+
+                # 동시 요청의 쿼리 임베딩을 모아서 처리하는 디스패처
+                self.query_dispatcher = (
+                    BatchDispatcher(
+                        self._encode_batch,
+                        max_batch_size=EMBEDDING_BATCH_MAX_SIZE,
+                        max_wait_ms=EMBEDDING_BATCH_MAX_WAIT_MS,
+                        name="query-embedding",
+                    )
+                    if EMBEDDING_MICRO_BATCHING else None
+                )
+
+            def _encode_batch(self, texts: List[str]) -> List[List[float]]:
+                """디스패처용 배치 인코딩 (배치마다 CUDA 캐시를 비우지 않음)"""
+                return self.embeddings_model.embed_documents(texts)
+
+            def _token_lengths(self, texts: List[str]) -> List[int]:
+                """텍스트별 토큰 길이 (모델 최대 길이로 제한, 토크나이저가 없으면 문자 수로 근사)"""
+                st_model = getattr(self.embeddings_model, "client", None)
+                tokenizer = getattr(st_model, "tokenizer", None)
+                max_len = getattr(st_model, "max_seq_length", None) or 512
+                if tokenizer is None:
+                    return [min(max_len, len(t) // 2 + 2) for t in texts]
+                encoded = tokenizer(texts, add_special_tokens=True, truncation=True, max_length=max_len)
+                return [len(ids) for ids in encoded["input_ids"]]
+
+            def _pack_batches(self, lengths: List[int]) -> List[List[int]]:
+                """길이 내림차순으로 정렬한 인덱스를 토큰 예산(패딩 포함) 단위 배치로 묶음"""
+                order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+                batches, current, current_max = [], [], 0
+                for idx in order:
+                    new_max = max(current_max, lengths[idx])
+                    if current and (
+                        new_max * (len(current) + 1) > EMBEDDING_BULK_TOKEN_BUDGET
+                        or len(current) >= EMBEDDING_BULK_MAX_BATCH
+                    ):
+                        batches.append(current)
+                        current, new_max = [], lengths[idx]
+                    current.append(idx)
+                    current_max = new_max
+                if current:
+                    batches.append(current)
+                return batches
+
+            def encode_bulk(self, texts: List[str]) -> List[List[float]]:
+                """
+                색인용 대량 임베딩
+                - 토큰 길이순 정렬 후 토큰 예산 단위로 배치를 구성하여 패딩 낭비 감소
+                - 결과는 입력 순서로 복원
+                - CUDA 캐시 정리는 전체 작업 후 한 번만 수행
+                """
+                if not texts:
+                    return []
+                texts = [t if isinstance(t, str) else str(t) for t in texts]
+                start_time = time.time()
+                try:
+                    lengths = self._token_lengths(texts)
+                    batches = self._pack_batches(lengths)
+                    st_model = getattr(self.embeddings_model, "client", None)
+
+                    embeddings: List[Optional[List[float]]] = [None] * len(texts)
+                    for batch_indices in batches:
+                        batch_texts = [texts[i] for i in batch_indices]
+                        if st_model is not None:
+                            # 배치를 이미 구성했으므로 내부 배치 크기를 배치 전체로 지정
+                            batch_embeddings = st_model.encode(
+                                batch_texts,
+                                batch_size=len(batch_texts),
+                                normalize_embeddings=True,
+                                show_progress_bar=False,
+                            ).tolist()
+                        else:
+                            batch_embeddings = self.embeddings_model.embed_documents(batch_texts)
+                        for i, emb in zip(batch_indices, batch_embeddings):
+                            embeddings[i] = emb
+                except Exception as e:
+                    print(f"벌크 임베딩 오류, 기본 배치 처리로 대체: {e}")
+                    traceback.print_exc()
+                    return self(texts)
+                finally:
+                    if torch.cuda.is_available():
+                        torch.cuda.empty_cache()
+
+                elapsed = max(time.time() - start_time, 1e-6)
+                total_tokens = sum(lengths)
+                padded_tokens = sum(max(lengths[i] for i in b) * len(b) for b in batches)
+                print(
+                    f"벌크 임베딩 완료: {len(texts)}개 텍스트, {len(batches)}개 배치, "
+                    f"{total_tokens} 토큰, {elapsed:.2f}초 ({total_tokens / elapsed:.0f} tokens/sec, "
+                    f"패딩 효율 {total_tokens / max(padded_tokens, 1):.1%})"
+                )
+                return embeddings
+
+            def _embed_single(self, text: str) -> List[float]:
+                """캐시 미스 쿼리 인코딩 (마이크로 배칭 사용 시 다른 요청과 함께 처리)"""
+                if self.query_dispatcher is None:
+                    return self([text])[0]
+                try:
+                    return self.query_dispatcher.call(text)
+                except Exception as e:
+                    print(f"쿼리 임베딩 배치 처리 실패, 단건 처리로 대체: {e}")
+                    return self([text])[0]
+
+            def embed_query(self, text: str) -> List[float]:
+                """단일 검색 쿼리 임베딩 (캐시 적중 시 모델 호출 생략)"""
+                if self.query_cache is None:
+                    return self._embed_single(text)
+                return self.query_cache.get_or_compute(text, self._embed_single)
             
             # 캐싱 데코레이터 제거 - 올바른 위치로 이동
             def __call__(self, texts: list[str]) -> List[List[float]]:
@@ -262,23 +576,29 @@ def get_embedding_function():
         return None
 
 
+def get_llm_tokenizer():
+    """LLM 토크나이저 로드 (모델 서버 사용 시 API 워커는 프롬프트 구성/토큰 계산용으로 토크나이저만 로드)"""
+    # 토크나이저 로드 최적화: 병렬 처리 옵션 활성화
+    tokenizer = AutoTokenizer.from_pretrained(
+        LLM_MODEL_NAME,
+        use_fast=True,  # 빠른 토크나이저 사용
+        padding_side="left",  # 왼쪽 패딩 (생성 모델에 적합)
+        use_auth_token=None,  # 인증 토큰 불필요 시 명시적으로 None
+        trust_remote_code=True,  # 원격 코드 신뢰 (일부 모델에 필요)
+    )
+
+    # 특수 토큰 설정
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    return tokenizer
+
+
 def get_llm_model_and_tokenizer():
     print("Loading LLM model and tokenizer...")
     try:
         torch.cuda.empty_cache()  # 메모리 정리
 
-        # 토크나이저 로드 최적화: 병렬 처리 옵션 활성화
-        tokenizer = AutoTokenizer.from_pretrained(
-            LLM_MODEL_NAME,
-            use_fast=True,  # 빠른 토크나이저 사용
-            padding_side="left",  # 왼쪽 패딩 (생성 모델에 적합)
-            use_auth_token=None,  # 인증 토큰 불필요 시 명시적으로 None
-            trust_remote_code=True,  # 원격 코드 신뢰 (일부 모델에 필요)
-        )
-
-        # 특수 토큰 설정
-        if tokenizer.pad_token is None:
-            tokenizer.pad_token = tokenizer.eos_token
+        tokenizer = get_llm_tokenizer()
 
         # Qwen2.5 모델에 최적화된 양자화 설정
         quantization_config = BitsAndBytesConfig(
@@ -341,6 +661,19 @@ def get_reranker_model():
             RERANKER_MODEL_NAME, device="cuda" if torch.cuda.is_available() else "cpu"
         )
         print("Reranker model loaded successfully.")
+
+        # CPU 노드에서는 predict 인터페이스가 같은 ONNX Runtime 리랭커로 교체
+        if use_onnx_backend():
+            onnx_reranker = load_onnx_backend(
+                "reranker",
+                RERANKER_MODEL_NAME,
+                quantize=ONNX_QUANTIZE,
+                reference=reranker if ONNX_PARITY_CHECK else None,
+                num_threads=ONNX_NUM_THREADS,
+            )
+            if onnx_reranker is not None:
+                del reranker
+                return onnx_reranker
         return reranker
     except Exception as e:
         print(f"Reranker 모델 로딩 중 오류 발생: {e}")
@@ -348,18 +681,52 @@ def get_reranker_model():
         return None
 
 
+def create_reranker_dispatcher(reranker: Any) -> Optional[BatchDispatcher]:
+    """여러 요청의 (쿼리, 문서) 쌍을 모아 한 번의 predict로 처리하는 디스패처 생성"""
+    if reranker is None or not RERANK_DYNAMIC_BATCHING:
+        return None
+
+    def predict_batch(pairs: List[Tuple[str, str]]) -> List[float]:
+        # torch CUDA 설정으로 성능 최적화
+        with torch.no_grad(), torch.cuda.amp.autocast(enabled=True):
+            return [float(score) for score in reranker.predict(pairs, batch_size=len(pairs))]
+
+    return BatchDispatcher(
+        predict_batch,
+        max_batch_size=RERANK_BATCH_MAX_SIZE,
+        max_wait_ms=RERANK_BATCH_MAX_WAIT_MS,
+        name="reranker",
+    )
+
+
+def clone_documents(docs: List[Document]) -> List[Document]:
+    """공유 캐시에 저장/반환할 Document 복사본 생성 (요청 간 메타데이터 변경이 섞이지 않도록)"""
+    return [Document(page_content=doc.page_content, metadata=dict(doc.metadata)) for doc in docs]
+
+
 # ElasticsearchRetriever 클래스 정의
 class ElasticsearchRetriever:
-    def __init__(self, es_client: Any, embedding_function: Any, category: str, k=25):
+    def __init__(
+        self,
+        es_client: Any,
+        embedding_function: Any,
+        category: str,
+        k=25,
+        mode: Optional[str] = None,
+        num_candidates: Optional[int] = None,
+        fusion_method: Optional[str] = None,
+    ):
         self.es_client = es_client
         self.index_name = ES_INDEX_NAME
         self.embedding_function = embedding_function
         self.k = k
         self.category = category
-        # 성능 최적화를 위한 캐시 추가
-        self._cache = {}
-        self._cache_size = 150  # 최대 캐시 항목 수 증가 (100 → 150)
-        self._cache_ttl = 7200  # 캐시 유효 시간 증가 (3600 → 7200초, 2시간)
+        # 벡터 검색 방식 및 결과 융합 방식 (미지정 시 전역 설정 사용)
+        self.mode = mode or RETRIEVAL_MODE
+        self.num_candidates = max(num_candidates or KNN_NUM_CANDIDATES, k)
+        self.fusion_method = fusion_method or HYBRID_FUSION_METHOD
+        # 요청 간 공유되는 결과 캐시 (인스턴스가 요청마다 새로 생성되므로 프로세스 전역 캐시 사용)
+        self._cache = get_shared_result_cache()
         # 피드백 기반 검색 최적화 도구 초기화
         self.search_optimizer = SearchQualityOptimizer()
 
@@ -368,143 +735,31 @@ class ElasticsearchRetriever:
             print("Elasticsearch 클라이언트 또는 임베딩 함수가 초기화되지 않았습니다.")
             return []
 
-        # 캐시 키 생성 (쿼리와 카테고리 조합)
-        query_normalized = query.lower().strip()
-        cache_key = f"{query_normalized}:{self.category}"
-
-        # 캐시에서 결과 확인
-        current_time = time.time()
-        if cache_key in self._cache:
-            cache_entry = self._cache[cache_key]
-            if current_time - cache_entry["timestamp"] < self._cache_ttl:
-                print(f"캐시에서 검색 결과 반환: '{query[:30]}...'")
-                return cache_entry["results"]
-
-        # 캐시 정리 (필요시) - LRU 방식 최적화
-        if len(self._cache) >= self._cache_size:
-            # 가장 오래된 항목부터 삭제 (LRU)
-            oldest_keys = sorted(
-                self._cache.keys(), 
-                key=lambda k: self._cache[k]["timestamp"]
-            )[:len(self._cache) // 3]  # 1/3 정도 삭제 (기존 1/4에서 증가)
-            for old_key in oldest_keys:
-                del self._cache[old_key]
+        # 캐시 키 생성 (정규화 쿼리 + 카테고리 + 인덱스 세대 + 검색 설정)
+        cache_key = self._cache.make_key("retrieval", query, self.category, self.mode, self.k)
+
+        # 캐시에서 결과 확인 (후속 단계에서 메타데이터를 수정하므로 복사본 반환)
+        cached_docs = self._cache.get(cache_key)
+        if cached_docs is not None:
+            print(f"캐시에서 검색 결과 반환: '{query[:30]}...'")
+            return clone_documents(cached_docs)
 
         try:
             # 임베딩 생성
             query_normalized = query.lower().strip()
-            try:
-                # 임베딩 함수 호출 시 오류 방지를 위한 타입 확인
-                if callable(self.embedding_function):
-                    query_embedding = self.embedding_function([query_normalized])[0]
-                else:
-                    print("경고: 임베딩 함수가 호출 가능하지 않음")
-                    return []
-            except Exception as embed_error:
-                print(f"임베딩 생성 중 오류 발생: {embed_error}")
-                traceback.print_exc()
+            query_embedding = self._embed_query(query_normalized)
+            if query_embedding is None:
                 return []  # 임베딩 실패 시 빈 결과 반환
 
-            # 하이브리드 쿼리 구성 (BM25 + 벡터 검색) - 가중치 최적화
-            hybrid_query = {
-                "size": self.k,
-                "_source": {"excludes": ["embedding"]},
-                "query": {
-                    "bool": {
-                        "should": [
-                            # 1. 정확한 문구 검색 (가중치 상향)
-                            {
-                                "match_phrase": {
-                                    "text": {"query": query, "boost": 3.5, "slop": 3}  # 3.0 → 3.5
-                                }
-                            },
-                            # 2. BM25 키워드 검색 (가중치 상향)
-                            {
-                                "match": {
-                                    "text": {
-                                        "query": query,
-                                        "boost": 2.5,  # 2.0 → 2.5
-                                        "operator": "OR",
-                                        "minimum_should_match": "60%",  # 50%에서 60%로 상향
-                                    }
-                                }
-                            },
-                            # 3. 벡터 검색 (가중치 상향)
-                            {
-                                "script_score": {
-                                    "query": {"match_all": {}},
-                                    "script": {
-                                        "source": "cosineSimilarity(params.query_vector, 'embedding') + 1.0",
-                                        "params": {"query_vector": query_embedding},
-                                    },
-                                    "boost": 2.2,  # 가중치 상향 (1.5 → 2.2)
-                                }
-                            },
-                        ],
-                        "filter": [{"term": {"category": self.category}}],
-                        "minimum_should_match": 1,
-                    }
-                },
-            }
-
-            # 피드백 기반 쿼리 최적화 적용
-            try:
-                optimized_query = self.search_optimizer.apply_optimizations_to_query(
-                    query_normalized, hybrid_query
-                )
-                if optimized_query != hybrid_query:
-                    print(f"피드백 기반 쿼리 최적화 적용됨: '{query[:30]}...'")
-                    hybrid_query = optimized_query
-            except Exception as optimize_error:
-                print(f"쿼리 최적화 적용 중 오류: {optimize_error}")
-                # 최적화 오류 시 원본 쿼리 사용
-
-            # 검색 실행 (타임아웃 설정)
-            response = self.es_client.search(
-                index=self.index_name,
-                body=hybrid_query,
-                request_timeout=30  # 30초 타임아웃
-            )
-
-            # 결과 처리
-            docs = []
-            for hit in response["hits"]["hits"]:
-                # 메타데이터 추출 (embedding 필드 제외)
-                metadata = {}
-                for k, v in hit["_source"].items():
-                    if k != "text" and k != "embedding":
-                        metadata[k] = v
-
-                # 점수 정규화 (0~1 사이로)
-                raw_score = hit["_score"]
-                # Elasticsearch 스코어는 범위가 다양하므로 정규화
-                normalized_score = min(
-                    max(raw_score / 10, 0), 1
-                )  # 10으로 나누어 0~1 범위로 조정
-
-                metadata["relevance_score"] = raw_score  # 원본 점수 유지
-                metadata["source"] = hit["_source"].get("source", "unknown")
-                metadata["page"] = hit["_source"].get("page", 1)
-
-                # chunk_id가 정수형이면 문자열로 변환 (type 오류 방지)
-                chunk_id = hit["_source"].get("chunk_id")
-                if chunk_id is not None:
-                    metadata["chunk_id"] = str(chunk_id)  # 명시적 문자열 변환
-
-                # Document 객체 생성
-                docs.append(
-                    Document(
-                        page_content=hit["_source"].get("text", ""), metadata=metadata
-                    )
-                )
+            if self.mode == "knn":
+                docs = self._search_knn_hybrid(query, query_normalized, query_embedding)
+            else:
+                docs = self._search_script_score(query, query_normalized, query_embedding)
 
-            print(f"검색 완료: {len(docs)} 문서 검색됨")
+            print(f"검색 완료: {len(docs)} 문서 검색됨 (mode={self.mode})")
 
             # 결과 캐싱
-            self._cache[cache_key] = {
-                "results": docs,
-                "timestamp": current_time,
-            }
+            self._cache.set(cache_key, clone_documents(docs), category=self.category)
 
             return docs
         except Exception as e:
@@ -512,69 +767,524 @@ class ElasticsearchRetriever:
             traceback.print_exc()
             return []
 
+    def get_relevant_documents_multi(self, query: str, variants: List[str]) -> List[Document]:
+        """
+        원본 쿼리와 확장 쿼리 변형들을 한 번의 msearch로 검색하고 RRF로 융합합니다.
+        - 쿼리 임베딩은 원본 쿼리 기준으로 한 번만 계산하여 공유
+        - knn 모드: 변형별 BM25 검색 + kNN 검색 1회
+        - script_score 모드: 변형별 하이브리드 검색
+        """
+        # 원본 쿼리를 맨 앞에 두고 중복/빈 변형 제거
+        search_queries = [query]
+        seen = {query.lower().strip()}
+        for variant in variants or []:
+            variant_normalized = (variant or "").lower().strip()
+            if variant_normalized and variant_normalized not in seen:
+                seen.add(variant_normalized)
+                search_queries.append(variant)
+
+        if len(search_queries) == 1:
+            return self.get_relevant_documents(query)
+
+        if not self.es_client or not self.embedding_function:
+            print("Elasticsearch 클라이언트 또는 임베딩 함수가 초기화되지 않았습니다.")
+            return []
+
+        variant_key = "|".join(sorted(q.lower().strip() for q in search_queries[1:]))
+        cache_key = self._cache.make_key("retrieval_multi", query, self.category, self.mode, self.k, variant_key)
+        cached_docs = self._cache.get(cache_key)
+        if cached_docs is not None:
+            print(f"캐시에서 다중 변형 검색 결과 반환: '{query[:30]}...'")
+            return clone_documents(cached_docs)
+
+        try:
+            query_normalized = query.lower().strip()
+            query_embedding = self._embed_query(query_normalized)
+            if query_embedding is None:
+                return []
+
+            # 원본 쿼리 결과는 가중치 1.0, 변형 쿼리 결과는 MULTI_VARIANT_WEIGHT 적용
+            variant_weights = [1.0] + [MULTI_VARIANT_WEIGHT] * (len(search_queries) - 1)
+
+            if self.mode == "knn":
+                bodies = [self._build_bm25_body(q, q.lower().strip()) for q in search_queries]
+                bodies.append(self._build_knn_body(query_embedding))
+                weights = [(1.0 - HYBRID_VECTOR_WEIGHT) * w for w in variant_weights] + [HYBRID_VECTOR_WEIGHT]
+                score_fields = ["bm25_score"] + [None] * (len(search_queries) - 1) + ["vector_score"]
+            else:
+                bodies = [
+                    self._build_script_score_body(q, q.lower().strip(), query_embedding)
+                    for q in search_queries
+                ]
+                weights = variant_weights
+                score_fields = ["hybrid_score"] + [None] * (len(search_queries) - 1)
+
+            hit_lists = self._msearch(bodies)
+            # 변형 간 점수 척도가 다르므로 항상 순위 기반(RRF)으로 융합
+            docs = self._fuse_hit_lists(hit_lists, weights, score_fields, fusion_method="rrf")
+
+            print(
+                f"다중 변형 검색 완료: 변형 {len(search_queries)}개, 요청 {len(bodies)}건(msearch 1회), "
+                f"{len(docs)} 문서 융합됨 (mode={self.mode})"
+            )
+
+            self._cache.set(cache_key, clone_documents(docs), category=self.category)
+            return docs
+        except Exception as e:
+            print(f"다중 변형 검색 중 오류 발생, 단일 쿼리 검색으로 대체: {e}")
+            traceback.print_exc()
+            return self.get_relevant_documents(query)
+
+    def _embed_query(self, query_normalized: str) -> Optional[List[float]]:
+        """쿼리 임베딩 생성 (실패 시 None)"""
+        try:
+            # 임베딩 함수 호출 시 오류 방지를 위한 타입 확인
+            # 쿼리 임베딩 캐시를 지원하는 임베딩 함수는 embed_query 사용
+            if hasattr(self.embedding_function, "embed_query"):
+                return self.embedding_function.embed_query(query_normalized)
+            if callable(self.embedding_function):
+                return self.embedding_function([query_normalized])[0]
+            print("경고: 임베딩 함수가 호출 가능하지 않음")
+            return None
+        except Exception as embed_error:
+            print(f"임베딩 생성 중 오류 발생: {embed_error}")
+            traceback.print_exc()
+            return None
+
+    def _bm25_clauses(self, query: str) -> List[Dict[str, Any]]:
+        """BM25 기반 should 절 (정확한 문구 + 키워드 검색)"""
+        return [
+            # 1. 정확한 문구 검색 (가중치 상향)
+            {
+                "match_phrase": {
+                    "text": {"query": query, "boost": 3.5, "slop": 3}  # 3.0 → 3.5
+                }
+            },
+            # 2. BM25 키워드 검색 (가중치 상향)
+            {
+                "match": {
+                    "text": {
+                        "query": query,
+                        "boost": 2.5,  # 2.0 → 2.5
+                        "operator": "OR",
+                        "minimum_should_match": "60%",  # 50%에서 60%로 상향
+                    }
+                }
+            },
+        ]
+
+    def _apply_feedback_optimizations(self, query: str, query_normalized: str, es_query: Dict[str, Any]) -> Dict[str, Any]:
+        """피드백 기반 쿼리 최적화 적용 (실패 시 원본 쿼리 유지)"""
+        try:
+            optimized_query = self.search_optimizer.apply_optimizations_to_query(
+                query_normalized, es_query
+            )
+            if optimized_query != es_query:
+                print(f"피드백 기반 쿼리 최적화 적용됨: '{query[:30]}...'")
+            return optimized_query
+        except Exception as optimize_error:
+            print(f"쿼리 최적화 적용 중 오류: {optimize_error}")
+            return es_query
+
+    def _build_script_score_body(self, query: str, query_normalized: str, query_embedding: List[float]) -> Dict[str, Any]:
+        """BM25 + script_score(cosineSimilarity) 하이브리드 검색 본문"""
+        # 하이브리드 쿼리 구성 (BM25 + 벡터 검색) - 가중치 최적화
+        hybrid_query = {
+            "size": self.k,
+            "_source": {"excludes": ["embedding"]},
+            "query": {
+                "bool": {
+                    "should": self._bm25_clauses(query) + [
+                        # 3. 벡터 검색 (가중치 상향)
+                        {
+                            "script_score": {
+                                "query": {"match_all": {}},
+                                "script": {
+                                    "source": "cosineSimilarity(params.query_vector, 'embedding') + 1.0",
+                                    "params": {"query_vector": query_embedding},
+                                },
+                                "boost": 2.2,  # 가중치 상향 (1.5 → 2.2)
+                            }
+                        },
+                    ],
+                    "filter": [{"term": {"category": self.category}}],
+                    "minimum_should_match": 1,
+                }
+            },
+        }
+
+        # 피드백 기반 쿼리 최적화 적용
+        return self._apply_feedback_optimizations(query, query_normalized, hybrid_query)
+
+    def _search_script_score(self, query: str, query_normalized: str, query_embedding: List[float]) -> List[Document]:
+        """script_score(cosineSimilarity) 기반 하이브리드 검색 - 카테고리 내 전체 청크를 스캔"""
+        hybrid_query = self._build_script_score_body(query, query_normalized, query_embedding)
+
+        # 검색 실행 (타임아웃 설정)
+        response = self.es_client.search(
+            index=self.index_name,
+            body=hybrid_query,
+            request_timeout=30  # 30초 타임아웃
+        )
+
+        docs = []
+        for hit in response["hits"]["hits"]:
+            doc = self._hit_to_document(hit)
+            doc.metadata["relevance_score"] = hit["_score"]  # 원본 점수 유지
+            docs.append(doc)
+        return docs
+
+    def _build_bm25_body(self, query: str, query_normalized: str) -> Dict[str, Any]:
+        """BM25 전용 검색 본문 (knn 모드에서 벡터 검색과 별도로 실행)"""
+        bm25_body = {
+            "size": self.k,
+            "_source": {"excludes": ["embedding"]},
+            "query": {
+                "bool": {
+                    "should": self._bm25_clauses(query),
+                    "filter": [{"term": {"category": self.category}}],
+                    "minimum_should_match": 1,
+                }
+            },
+        }
+        # 피드백 기반 쿼리 최적화는 BM25 쪽에만 적용 (knn 절은 function_score로 감쌀 수 없음)
+        return self._apply_feedback_optimizations(query, query_normalized, bm25_body)
+
+    def _build_knn_body(self, query_embedding: List[float]) -> Dict[str, Any]:
+        """HNSW 인덱스를 사용하는 top-level knn 검색 본문"""
+        return {
+            "size": self.k,
+            "_source": {"excludes": ["embedding"]},
+            "knn": {
+                "field": "embedding",
+                "query_vector": query_embedding,
+                "k": self.k,
+                "num_candidates": self.num_candidates,
+                # 카테고리 필터는 HNSW 탐색 중에 적용되어야 k개를 온전히 채울 수 있음
+                "filter": {"term": {"category": self.category}},
+            },
+        }
+
+    def _msearch(self, bodies: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """여러 검색 본문을 한 번의 msearch로 실행하고 본문별 hit 목록 반환 (실패한 본문은 빈 목록)"""
+        searches = []
+        for body in bodies:
+            searches.extend([{"index": self.index_name}, body])
+        response = self.es_client.msearch(searches=searches, request_timeout=30)
+
+        hit_lists = []
+        for i, sub_response in enumerate(response["responses"]):
+            if "error" in sub_response:
+                print(f"msearch {i+1}번째 검색 오류 (해당 결과 제외): {sub_response['error']}")
+                hit_lists.append([])
+            else:
+                hit_lists.append(sub_response["hits"]["hits"])
+        return hit_lists
+
+    def _fuse_hit_lists(
+        self,
+        hit_lists: List[List[Dict[str, Any]]],
+        weights: List[float],
+        score_fields: List[Optional[str]],
+        fusion_method: Optional[str] = None,
+    ) -> List[Document]:
+        """
+        여러 hit 목록을 RRF 또는 가중 선형 결합으로 융합
+
+        Args:
+            hit_lists: 검색별 hit 목록
+            weights: 검색별 융합 가중치
+            score_fields: 검색별 원본 점수를 기록할 메타데이터 키 (None이면 기록하지 않음)
+            fusion_method: "rrf" 또는 "linear" (None이면 인스턴스 설정 사용)
+        """
+        fusion_method = fusion_method or self.fusion_method
+        hits_by_id: Dict[str, Dict[str, Any]] = {}
+        score_maps: List[Dict[str, float]] = []
+        for hits in hit_lists:
+            scores = {}
+            for hit in hits:
+                hits_by_id.setdefault(hit["_id"], hit)
+                scores[hit["_id"]] = hit["_score"]
+            score_maps.append(scores)
+
+        if fusion_method == "linear":
+            fused = weighted_linear_fusion(score_maps, weights=weights)
+        else:
+            fused = reciprocal_rank_fusion(
+                [[hit["_id"] for hit in hits] for hits in hit_lists],
+                k=HYBRID_RRF_K,
+                weights=weights,
+            )
+
+        docs = []
+        for doc_id, fused_score in fused[:self.k]:
+            doc = self._hit_to_document(hits_by_id[doc_id])
+            doc.metadata["fusion_score"] = fused_score  # RRF 값은 0.01~0.03 수준이므로 표시 점수와 분리
+            for field, scores in zip(score_fields, score_maps):
+                if field:
+                    doc.metadata[field] = scores.get(doc_id)
+            docs.append(doc)
+        return docs
+
+    def _search_knn_hybrid(self, query: str, query_normalized: str, query_embedding: List[float]) -> List[Document]:
+        """HNSW kNN 검색과 BM25 검색을 한 번의 msearch로 실행하고 결과를 융합"""
+        bodies = [
+            self._build_bm25_body(query, query_normalized),
+            self._build_knn_body(query_embedding),
+        ]
+        hit_lists = self._msearch(bodies)
+        return self._fuse_hit_lists(
+            hit_lists,
+            weights=[1.0 - HYBRID_VECTOR_WEIGHT, HYBRID_VECTOR_WEIGHT],
+            score_fields=["bm25_score", "vector_score"],
+        )
+
+    def _hit_to_document(self, hit: Dict[str, Any]) -> Document:
+        """ES 검색 hit을 Document 객체로 변환"""
+        # 메타데이터 추출 (embedding 필드 제외)
+        metadata = {}
+        for k, v in hit["_source"].items():
+            if k != "text" and k != "embedding":
+                metadata[k] = v
+
+        metadata["es_score"] = hit["_score"]
+        metadata["source"] = hit["_source"].get("source", "unknown")
+        metadata["page"] = hit["_source"].get("page", 1)
+
+        # chunk_id가 정수형이면 문자열로 변환 (type 오류 방지)
+        chunk_id = hit["_source"].get("chunk_id")
+        if chunk_id is not None:
+            metadata["chunk_id"] = str(chunk_id)  # 명시적 문자열 변환
+
+        # Document 객체 생성
+        return Document(page_content=hit["_source"].get("text", ""), metadata=metadata)
+
 
 # 향상된 리랭커 클래스 정의
 class EnhancedLocalReranker:
-    def __init__(self, reranker_model: Any, top_n=18):  # top_n 증가 (15 → 18)
+    def __init__(
+        self,
+        reranker_model: Any,
+        top_n=18,  # top_n 증가 (15 → 18)
+        category: Optional[str] = None,
+        mode: Optional[str] = None,
+        dispatcher: Optional[BatchDispatcher] = None,
+    ):
         self.reranker = reranker_model
+        # 요청 간 공유 배치 디스패처 (없으면 요청 단위로 predict 호출)
+        self.dispatcher = dispatcher
         self.top_n = top_n
-        # 성능 최적화를 위한 캐시 추가
-        self._cache = {}
-        self._cache_size = 150  # 캐시 크기 증가 (100 → 150)
-        self._cache_ttl = 7200  # 캐시 유효 시간 증가 (1시간 → 2시간)
+        # 캐시 무효화 세대 계산에 사용할 카테고리
+        self.category = category
+        # 리랭킹 방식 ("full": 상위 12개 전체 cross-encoder, "cascade": 1차 점수 기반 선별)
+        self.mode = mode or RERANK_MODE
+        # 요청 간 공유되는 (쿼리, 청크) 쌍 점수 캐시
+        self._cache = get_rerank_score_cache()
         # 배치 처리 최적화
         self.batch_size = 24  # 배치 크기 증가 (16 → 24)
+        self.threshold = 0.52  # 임계값 하향 (0.6 → 0.52)
+        # 마지막 rerank 호출의 단계별 소요 시간 및 처리 통계
+        self.last_timings: Dict[str, Any] = {}
+
+    @staticmethod
+    def _chunk_key(doc: Document) -> str:
+        """청크 식별자 (chunk_id는 파일 내 번호이므로 파일명/페이지와 함께 사용)"""
+        meta = doc.metadata
+        return f"{meta.get('source', '')}|{meta.get('page', '')}|{meta.get('chunk_id', '')}"
+
+    def _pair_key(self, query_normalized: str, doc: Document) -> Tuple:
+        """(정규화 쿼리, 카테고리, 인덱스 세대, 청크 식별자) 캐시 키"""
+        return self._cache.make_key("rerank_pair", query_normalized, self.category, self._chunk_key(doc))
+
+    def _predict(self, pairs: List[Tuple[str, str]]) -> List[float]:
+        """cross-encoder 배치 점수 계산 (디스패처가 있으면 다른 요청의 쌍과 함께 처리)"""
+        if self.dispatcher is not None and pairs:
+            try:
+                return self.dispatcher.call_many(pairs)
+            except Exception as e:
+                print(f"리랭커 공유 배치 처리 실패, 요청 단위 처리로 대체: {e}")
+
+        scores = []
+        for i in range(0, len(pairs), self.batch_size):
+            batch_pairs = pairs[i:i + self.batch_size]
+            # torch CUDA 설정으로 성능 최적화
+            with torch.no_grad(), torch.cuda.amp.autocast(enabled=True):
+                batch_scores = self.reranker.predict(batch_pairs)
+                scores.extend(float(score) for score in batch_scores)
+        return scores
+
+    def _score_pairs(self, query_normalized: str, docs: List[Document]) -> Tuple[List[float], int]:
+        """
+        (쿼리, 청크) 쌍 단위 점수 계산
+        - 캐시 키: (정규화 쿼리, 카테고리, 인덱스 세대, 청크 식별자)
+        - 캐시에 없는 쌍만 cross-encoder로 계산
+        - 반환: (점수 목록, 캐시 적중 수)
+        """
+        keys = [self._pair_key(query_normalized, doc) for doc in docs]
+        scores: List[Optional[float]] = [self._cache.get(key) for key in keys]
+        missing = [i for i, score in enumerate(scores) if score is None]
+
+        if missing:
+            # 메모리 최적화를 위한 캐시 정리
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+
+            new_scores = self._predict([(query_normalized, docs[i].page_content) for i in missing])
+            for i, score in zip(missing, new_scores):
+                scores[i] = score
+                self._cache.set(keys[i], score, category=self.category, size_bytes=256)
+
+        print(f"리랭킹 쌍 캐시: {len(docs) - len(missing)}/{len(docs)} 적중, {len(missing)}쌍 계산")
+        return scores, len(docs) - len(missing)
+
+    @staticmethod
+    def _normalize_rerank_score(score: float) -> float:
+        # 점수 범위를 0~1로 정규화 (-1~1 범위에서)
+        return min(max((score + 1) / 2, 0), 1)
+
+    @staticmethod
+    def _first_stage_scores(docs: List[Document]) -> List[float]:
+        """검색 단계 점수(relevance_score, kNN 모드는 fusion_score)를 후보 내에서 0~1로 min-max 정규화"""
+        raw = [
+            float(
+                doc.metadata.get("relevance_score", doc.metadata.get("fusion_score", doc.metadata.get("es_score", 0.0)))
+                or 0.0
+            )
+            for doc in docs
+        ]
+        low, high = min(raw), max(raw)
+        if high - low < 1e-9:
+            return [0.5] * len(raw)  # 구분 불가 - 모두 애매한 후보로 취급
+        return [(score - low) / (high - low) for score in raw]
+
+    def _provisional_scores(self, first_stage: List[float], scored: Dict[int, float]) -> List[float]:
+        """
+        cross-encoder 점수와 1차 점수를 같은 척도의 rerank_score로 결합
+        - cross-encoder 점수가 있으면 정규화 점수 사용
+        - 1차 점수가 확실히 높은 후보: 계산된 최고 점수 위치에 배치
+          (1차 점수는 후보 내 상대값이므로 최소 임계값을 보장하지 않음 - 모두 무관한 검색 결과면 함께 임계값 미만)
+        - 그 외 계산하지 못한 후보: 관련성이 확인되지 않았으므로 임계값 × 1차 점수 (1차 점수 순서 유지)
+        """
+        normalized = {i: self._normalize_rerank_score(score) for i, score in scored.items()}
+        top_score = max(normalized.values()) if normalized else self.threshold
+        provisional = []
+        for i, s1 in enumerate(first_stage):
+            if i in normalized:
+                provisional.append(normalized[i])
+            elif s1 >= RERANK_CASCADE_ACCEPT:
+                provisional.append(top_score)
+            else:
+                provisional.append(self.threshold * s1)
+        return provisional
+
+    def _top_ids(self, provisional: List[float]) -> Tuple[int, ...]:
+        # 동점은 1차 점수 순서(입력 순서) 유지
+        order = sorted(range(len(provisional)), key=lambda i: -provisional[i])
+        return tuple(order[:RERANK_CASCADE_STABLE_TOP])
+
+    def _cascade_score(self, query_normalized: str, docs: List[Document]) -> None:
+        """
+        캐스케이드 리랭킹
+        1단계: 검색 점수로 후보를 확실히 높음/낮음/애매함으로 분류
+        2단계: 1차 점수 상위 N개(LLM 컨텍스트 후보)는 항상, 나머지는 애매한 후보만 1차 점수 순으로 cross-encoder 계산,
+               상위 N개 계산 후 지연 예산 소진 또는 상위 N개 순위가 안정되면 조기 종료
+        """
+        stage1_start = time.time()
+        first_stage = self._first_stage_scores(docs)
+        keys = [self._pair_key(query_normalized, doc) for doc in docs]
+        scored: Dict[int, float] = {}
+        for i, key in enumerate(keys):
+            cached_score = self._cache.get(key)
+            if cached_score is not None:
+                scored[i] = cached_score
+        from_cache = len(scored)
+
+        # 1차 점수는 후보 내 min-max 정규화 값이라 최상위 후보는 무관한 검색 결과여도 1.0이 되므로,
+        # 상위 N개는 반드시 cross-encoder로 관련성을 확인 (임계값 필터가 기본 경로와 같게 동작)
+        by_first_stage = sorted(range(len(docs)), key=lambda i: -first_stage[i])
+        required = [i for i in by_first_stage[:RERANK_CASCADE_STABLE_TOP] if i not in scored]
+        ambiguous = required + [
+            i
+            for i in by_first_stage[RERANK_CASCADE_STABLE_TOP:]
+            if i not in scored and RERANK_CASCADE_REJECT < first_stage[i] < RERANK_CASCADE_ACCEPT
+        ]
+        first_stage_ms = (time.time() - stage1_start) * 1000
+
+        stage2_start = time.time()
+        deadline = stage2_start + RERANK_LATENCY_BUDGET_MS / 1000.0
+        stop_reason = "exhausted"
+        cross_encoded = 0
+        previous_top = self._top_ids(self._provisional_scores(first_stage, scored))
+        for b in range(0, len(ambiguous), RERANK_CASCADE_BATCH):
+            if b >= len(required) and time.time() >= deadline:
+                stop_reason = "latency_budget"
+                break
+            batch = ambiguous[b:b + RERANK_CASCADE_BATCH]
+            batch_scores = self._predict([(query_normalized, docs[i].page_content) for i in batch])
+            for i, score in zip(batch, batch_scores):
+                scored[i] = score
+                self._cache.set(keys[i], score, category=self.category, size_bytes=256)
+            cross_encoded += len(batch)
+
+            current_top = self._top_ids(self._provisional_scores(first_stage, scored))
+            if (
+                current_top == previous_top
+                and b + RERANK_CASCADE_BATCH >= len(required)
+                and b + RERANK_CASCADE_BATCH < len(ambiguous)
+            ):
+                stop_reason = "stable_top"
+                break
+            previous_top = current_top
+        cross_encoder_ms = (time.time() - stage2_start) * 1000
+
+        provisional = self._provisional_scores(first_stage, scored)
+        for i, doc in enumerate(docs):
+            doc.metadata["first_stage_score"] = first_stage[i]
+            doc.metadata["rerank_score"] = float(provisional[i])
+            if i in scored:
+                doc.metadata["raw_rerank_score"] = float(scored[i])  # 원본 점수도 저장
+                doc.metadata["rerank_stage"] = "cross_encoder"
+            else:
+                doc.metadata["rerank_stage"] = "first_stage"
+
+        self.last_timings.update({
+            "first_stage_ms": round(first_stage_ms, 2),
+            "cross_encoder_ms": round(cross_encoder_ms, 2),
+            "candidates": len(docs),
+            "required": len(required),
+            "ambiguous": len(ambiguous) - len(required),
+            "cross_encoded": cross_encoded,
+            "from_cache": from_cache,
+            "stop_reason": stop_reason,
+        })
 
     def rerank(self, query: str, docs: List[Document]) -> List[Document]:
         if not docs or not self.reranker:
             return []
 
-        # 캐시 키 생성 (쿼리와 문서 ID 조합)
-        # chunk_id를 명시적으로 문자열로 변환하여 에러 방지
         query_normalized = query.lower().strip()
-        cache_key = f"{query_normalized}:{','.join([str(d.metadata.get('chunk_id', i)) for i, d in enumerate(docs[:10])])}"
-
-        # 캐시에서 결과 확인
-        current_time = time.time()
-        if cache_key in self._cache:
-            cache_entry = self._cache[cache_key]
-            if current_time - cache_entry["timestamp"] < self._cache_ttl:
-                print(f"리랭킹 캐시 적중: '{query[:30]}...'")
-                return cache_entry["results"]
-
-        # 캐시 정리 (필요시) - LRU 방식 최적화
-        if len(self._cache) >= self._cache_size:
-            oldest_keys = sorted(
-                self._cache.keys(), 
-                key=lambda k: self._cache[k]["timestamp"]
-            )[:len(self._cache) // 3]  # 1/3 정도 삭제 (1/4에서 증가)
-            for old_key in oldest_keys:
-                del self._cache[old_key]
+        rerank_start = time.time()
+        self.last_timings = {"mode": self.mode}
 
         try:
-            # 메모리 최적화를 위한 캐시 정리
-            if torch.cuda.is_available():
-                torch.cuda.empty_cache()
-
             # 상위 12개 문서 리랭킹 (원래 10개에서 상향) → 12개 그대로 유지
             docs_to_rerank = docs[:12]
-            pairs = [(query_normalized, doc.page_content) for doc in docs_to_rerank]
-
-            # 배치 처리로 성능 최적화
-            scores = []
-            for i in range(0, len(pairs), self.batch_size):
-                batch_pairs = pairs[i:i + self.batch_size]
-                # torch CUDA 설정으로 성능 최적화
-                with torch.no_grad(), torch.cuda.amp.autocast(enabled=True):
-                    batch_scores = self.reranker.predict(batch_pairs)
-                    scores.extend(batch_scores)
-
-            # 메타데이터에 점수 추가 및 정규화
-            for doc, score in zip(docs_to_rerank, scores):
-                # 점수 범위를 0~1로 정규화 (-1~1 범위에서)
-                normalized_score = min(max((score + 1) / 2, 0), 1)
-                doc.metadata["rerank_score"] = float(normalized_score)
-                doc.metadata["raw_rerank_score"] = float(score)  # 원본 점수도 저장
+            if self.mode == "cascade":
+                self._cascade_score(query_normalized, docs_to_rerank)
+            else:
+                scores, from_cache = self._score_pairs(query_normalized, docs_to_rerank)
+
+                # 메타데이터에 점수 추가 및 정규화
+                for doc, score in zip(docs_to_rerank, scores):
+                    doc.metadata["rerank_score"] = float(self._normalize_rerank_score(score))
+                    doc.metadata["raw_rerank_score"] = float(score)  # 원본 점수도 저장
+
+                self.last_timings.update({
+                    "cross_encoder_ms": round((time.time() - rerank_start) * 1000, 2),
+                    "candidates": len(docs_to_rerank),
+                    "cross_encoded": len(docs_to_rerank) - from_cache,
+                    "from_cache": from_cache,
+                })
 
             # 리랭킹된 문서와 나머지 문서 결합
             sorted_docs = sorted(
@@ -588,7 +1298,7 @@ class EnhancedLocalReranker:
             sorted_docs.extend(remaining_docs)
 
             # 임계값 필터링 - 점수가 낮은 문서 제외 (임계값 하향으로 더 많은 문서 포함)
-            threshold = 0.52  # 임계값 하향 (0.6 → 0.52)
+            threshold = self.threshold
             filtered_docs = [
                 doc
                 for doc in sorted_docs
@@ -604,14 +1314,9 @@ class EnhancedLocalReranker:
                 ][:min_docs - len(filtered_docs)]
                 filtered_docs.extend(additional_docs)
 
-            # 결과 캐싱
-            result_docs = filtered_docs[:self.top_n]
-            self._cache[cache_key] = {
-                "results": result_docs,
-                "timestamp": current_time
-            }
-
-            return result_docs
+            self.last_timings["total_ms"] = round((time.time() - rerank_start) * 1000, 2)
+            print(f"리랭킹 단계별 처리: {self.last_timings}")
+            return filtered_docs[:self.top_n]
 
         except Exception as e:
             print(f"Reranking 중 오류 발생: {e}")
@@ -619,6 +1324,22 @@ class EnhancedLocalReranker:
             return docs
 
 
+def source_metadata_scores(doc: Document) -> Dict[str, Any]:
+    """
+    출처 정보에 표시할 점수
+
+    score는 리랭커 점수(0~1)를 우선 사용하고, 없으면 검색 점수를 사용합니다.
+    kNN 모드의 RRF 융합 점수는 fusion_score로 따로 전달합니다.
+    """
+    metadata = doc.metadata
+    scores = {
+        "score": metadata.get("rerank_score", metadata.get("relevance_score", metadata.get("es_score", 0))),
+    }
+    if metadata.get("fusion_score") is not None:
+        scores["fusion_score"] = metadata["fusion_score"]
+    return scores
+
+
 # LLM 답변 생성 함수
 async def generate_llm_response(
     request: Request,
@@ -645,10 +1366,7 @@ async def generate_llm_response(
                 logger.warning(f"Invalid entry in conversation_history: {entry}")
 
     # 시스템 메시지 추가
-    system_message = f"""You are a helpful AI assistant. Answer the questions based on the provided documents.
-If the information is not in the documents, say that you cannot answer.
-Provided documents:
-{context_str}"""
+    system_message = f"{SYSTEM_PROMPT_HEADER}{context_str}"
     messages.insert(0, {"role": "system", "content": system_message})
     
     # 사용자 질문 추가
@@ -689,7 +1407,7 @@ Provided documents:
             "display_name": clean_filename,  # 화면 표시용 정제된 파일명 추가
             "page": page_num,
             "chunk_id": chunk_id,
-            "score": doc.metadata.get("relevance_score", 0),
+            **source_metadata_scores(doc),
         })
     
     # 프롬프트 텍스트와 소스 메타데이터를 함께 반환
@@ -701,6 +1419,34 @@ Provided documents:
 
 
 # 검색 및 결합 함수
+def stream_cached_answer(cached_result: Dict[str, Any], cache_info: Optional[Dict[str, Any]] = None) -> StreamingResponse:
+    """캐시된 답변을 SSE 스트림으로 즉시 재생"""
+
+    async def cached_response_stream():
+        answer_text = cached_result.get("answer", "")
+        sources = cached_result.get("sources", [])
+        cited_sources = cached_result.get("cited_sources", [])
+
+        # 캐시된 답변은 인위적인 지연 없이 즉시 재생
+        for frame in replay_answer_frames(answer_text):
+            yield frame
+
+        # 소스 정보 전송
+        yield format_sse({'event': 'sources', 'sources': sources, 'cited_sources': cited_sources})
+
+        # 캐시 사용 정보 전송 (클라이언트에서 캐시 사용 여부 표시 가능)
+        yield format_sse({'event': 'cache_info', 'from_cache': True, **(cache_info or {})})
+
+        # 스트림 종료 이벤트
+        yield format_sse({'event': 'eos', 'message': 'Stream ended (from cache).'})
+
+    return StreamingResponse(
+        cached_response_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 async def search_and_combine(
     es_client: Any,
     embedding_function: Any,
@@ -761,35 +1507,23 @@ async def search_and_combine(
         cached_result["from_cache"] = True
         cached_result["processing_time"]["cache_hit"] = round(time.time() - start_time, 3)
         
-        # 캐시된 결과를 스트리밍 방식으로 반환
-        async def cached_response_stream():
-            # 캐시된 텍스트 응답을 작은 청크로 나누어 스트리밍
-            answer_text = cached_result.get("answer", "")
-            sources = cached_result.get("sources", [])
-            cited_sources = cached_result.get("cited_sources", [])
-            
-            # 텍스트를 토큰 단위로 스트리밍 (여기서는 간단히 문자 단위로 나눔)
-            chunk_size = 4  # 4자씩 스트리밍 (실제 토큰 크기와 유사하게)
-            for i in range(0, len(answer_text), chunk_size):
-                chunk = answer_text[i:i+chunk_size]
-                yield f"data: {json.dumps({'token': chunk})}\n\n"
-                await asyncio.sleep(0.01)  # 실제 스트리밍 효과를 위한 짧은 지연
-            
-            # 소스 정보 전송
-            yield f"data: {json.dumps({'event': 'sources', 'sources': sources, 'cited_sources': cited_sources})}\n\n"
-            
-            # 캐시 사용 정보 전송 (클라이언트에서 캐시 사용 여부 표시 가능)
-            yield f"data: {json.dumps({'event': 'cache_info', 'from_cache': True})}\n\n"
-            
-            # 스트림 종료 이벤트
-            yield f"data: {json.dumps({'event': 'eos', 'message': 'Stream ended (from cache).'})}\n\n"
-        
         # 캐시된 응답을 스트리밍 형태로 반환
-        return StreamingResponse(
-            cached_response_stream(),
-            media_type="text/event-stream",
-            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
-        )
+        return stream_cached_answer(cached_result, {"cache_tier": "exact"})
+
+    # 의미 기반 캐시 조회 (표현만 다른 질문)
+    # 이전 대화에 의존하는 후속 질문은 다른 대화의 답변과 섞이지 않도록 조회/저장하지 않음
+    semantic_generation = get_shared_result_cache().generation(category)
+    question_embedding = None
+    if semantic_cache is not None and not conversation_history:
+        question_embedding = await asyncio.to_thread(embedding_function.embed_query, query)
+        match = semantic_cache.lookup(query, category, question_embedding)
+        if match is not None:
+            cached_payload, similarity, matched_question = match
+            print(f"의미 기반 캐시 사용: '{query}' ≈ '{matched_question}' (유사도 {similarity:.3f})")
+            return stream_cached_answer(
+                cached_payload,
+                {"cache_tier": "semantic", "similarity": round(similarity, 4), "matched_question": matched_question},
+            )
         
         # 기존 코드 (한 번에 반환)
         # return cached_result
@@ -809,7 +1543,12 @@ async def search_and_combine(
             es_client, embedding_function, category=category, k=10
         )
 
-        docs = retriever.get_relevant_documents(query)
+        # 쿼리 확장을 검색 전에 수행하여 변형 쿼리들을 한 번의 msearch로 검색
+        query_info = search_pipeline.query_expander.expand_query(query)
+        if MULTI_VARIANT_RETRIEVAL:
+            docs = retriever.get_relevant_documents_multi(query, query_info.get("variants", []))
+        else:
+            docs = retriever.get_relevant_documents(query)
         retrieval_time = time.time() - retrieval_start
         print(f"Retrieval time: {retrieval_time:.2f}s, Found {len(docs)} docs from ES.")
 
@@ -829,7 +1568,7 @@ async def search_and_combine(
         enhance_start = time.time()
         # 검색 개선 파이프라인 실행
         try:
-            query_info, enhanced_docs = search_pipeline.process(query, docs)
+            query_info, enhanced_docs = search_pipeline.process(query, docs, query_info=query_info)
 
             if enhanced_docs:
                 docs = enhanced_docs
@@ -847,7 +1586,9 @@ async def search_and_combine(
         # 2. Reranking (최적화 - 비동기 처리)
         rerank_start = time.time()
         # EnhancedLocalReranker는 top_n=18 (성능 최적화 설정)
-        reranker = EnhancedLocalReranker(reranker_model, top_n=18)
+        reranker = EnhancedLocalReranker(
+            reranker_model, top_n=18, category=category, dispatcher=reranker_dispatcher
+        )
 
         try:
             reranked_docs = reranker.rerank(query, docs)
@@ -860,22 +1601,12 @@ async def search_and_combine(
             reranked_docs = docs[:15]  # 상위 15개만 사용
 
         # 최종 토큰 수 제한
-        # 컨텍스트 크기를 최대 3,500 토큰으로 제한
-        max_tokens = 3500
-        token_count = 0
-        final_docs = []
-
-        for doc in reranked_docs:
-            if not doc.page_content:
-                continue
-
-            # 입력에 대해 예상 토큰 수 계산 (한국어 토큰화는 복잡하므로 근사치 사용)
-            approx_tokens = len(doc.page_content) / 3
-            if token_count + approx_tokens > max_tokens:
-                break
-
-            token_count += approx_tokens
-            final_docs.append(doc)
+        # 인덱싱 시 저장한 LLM 토큰 수로 컨텍스트를 토큰 예산 내로 패킹
+        final_docs, token_count = pack_documents(
+            reranked_docs,
+            max_tokens=LLM_CONTEXT_TOKEN_BUDGET,
+            token_counter=llm_token_counter,
+        )
 
         # LLM 입력 형식으로 변환
         # 리랭킹 결과 문서들을 하나의 컨텍스트로 결합
@@ -907,7 +1638,7 @@ async def search_and_combine(
                     "display_name": clean_filename,  # 화면 표시용 정제된 파일명 추가
                         "page": page_num,
                         "chunk_id": chunk_id,
-                        "score": doc.metadata.get("relevance_score", 0),
+                        **source_metadata_scores(doc),
                 })
 
         full_context = "\n\n".join(context_chunks)
@@ -972,50 +1703,13 @@ async def search_and_combine(
             print("정제된 응답이 비어있어 원본 응답을 사용합니다.")
             cleaned_answer = "안녕하세요! 어떻게 도와드릴까요?"
         
-        # 인용 감지를 위한 간단한 키워드 추출
-        def extract_keywords(text, min_length=3, max_keywords=20):
-            # None이나 비문자열 체크
-            if text is None or not isinstance(text, str):
-                print(f"extract_keywords: 유효하지 않은 입력 타입 - {type(text)}")
-                return []
-                
-            # 특수문자, 공백 등을 기준으로 단어 분리
-            words = re.findall(r'\b[가-힣a-zA-Z0-9]+\b', text)
-            # 길이가 min_length 이상인 단어만 필터링
-            filtered_words = [w for w in words if len(w) >= min_length]
-            # 중복 제거 및 최대 개수 제한
-            unique_words = list(set(filtered_words))[:max_keywords]
-            return unique_words
-            
-        # 응답에서 키워드 추출
-        answer_keywords = extract_keywords(cleaned_answer)
-        
-        # answer가 None이 아닌 경우만 인용 처리 진행 
+        # answer가 None이 아닌 경우만 인용 처리 진행
         if cleaned_answer and isinstance(cleaned_answer, str):
+            # 1. 30자 shingle 일치 / 2. 키워드의 30% 이상 포함 시 인용으로 간주
+            citation_index = CitationIndex(context_chunks, shingle_size=30, keyword_ratio=0.3)
+            citation_index.feed(cleaned_answer)
             for i, meta in enumerate(source_metadata):
-                cited = False
-                source_text = context_chunks[i] if i < len(context_chunks) else ""
-    
-                # 1. 기존 방식: 연속된 텍스트 일치 여부 확인 (최소 30자)
-                if len(source_text) > 50:
-                    for j in range(0, len(source_text) - 30, 10):
-                        snippet = source_text[j:j+30]
-                        if snippet in cleaned_answer:
-                            cited = True
-                            break
-    
-                # 2. 개선된 방식: 키워드 기반 매칭 (기존 방식으로 감지되지 않은 경우)
-                if not cited and source_text:
-                    # 소스에서 키워드 추출
-                    source_keywords = extract_keywords(source_text)
-                    # 키워드 일치율 계산
-                    if source_keywords:
-                        matches = [k for k in source_keywords if k in cleaned_answer]
-                        match_ratio = len(matches) / len(source_keywords)
-                        # 키워드의 30% 이상이 응답에 포함되어 있으면 인용으로 간주
-                        if match_ratio > 0.3:
-                            cited = True
-                
+                cited = citation_index.is_cited(i) if i < len(context_chunks) else False
                 # 메타데이터에 인용 여부 저장
                 meta["is_cited"] = cited
                 if cited:
@@ -1039,6 +1733,7 @@ async def search_and_combine(
                 "retrieval": round(retrieval_time, 2),
                 "enhancement": round(enhance_time, 2),
                 "reranking": round(rerank_time, 2),
+                "reranking_stages": reranker.last_timings,
                 "llm_generation": round(llm_time, 2),
                 "total": round(time.time() - start_time, 2),
             },
@@ -1048,6 +1743,8 @@ async def search_and_combine(
         try:
             RedisCache.set(cache_key, final_result, CACHE_TTL_SEARCH)
             print(f"응답 결과 캐싱 완료: {cache_key}")
+            if semantic_cache is not None and question_embedding is not None:
+                semantic_cache.add(query, category, question_embedding, final_result, generation=semantic_generation)
         except Exception as cache_error:
             print(f"캐싱 중 오류 발생 (무시됨): {cache_error}")
         
@@ -1071,31 +1768,213 @@ async def search_and_combine(
         }
 
 
-# SQLCoder 모델 로드 함수 추가
-def get_sqlcoder_model():
-    """SQLCoder 모델을 로드합니다."""
-    print("SQLCoder 모델 로딩 중...")
+# 모델 초기화 (startup 이벤트에서 model_registry가 백그라운드로 로드하며, 로드 완료 시 아래 전역 변수가 설정됨)
+es_client = None
+async_es_client: Optional[AsyncElasticsearch] = None  # startup 이벤트에서 초기화
+embedding_function = None
+llm_model, tokenizer = None, None
+llm_token_counter = None
+reranker_model = None
+reranker_dispatcher = None
+llm_engine = None
+prefix_kv_cache = None
+semantic_cache = get_semantic_cache(SEMANTIC_CACHE_THRESHOLD) if SEMANTIC_CACHE else None
+chat_flights = SingleFlightGroup("chat") if CHAT_SINGLE_FLIGHT else None
+generation_scheduler = GenerationScheduler(
+    max_concurrent=LLM_MAX_CONCURRENT_GENERATIONS,
+    max_queue=LLM_GENERATION_QUEUE_SIZE,
+    policy=LLM_SCHEDULING_POLICY,
+)
+
+
+def build_system_prompt_prefix(tokenizer: Any) -> Optional[str]:
+    """채팅 템플릿을 적용한 프롬프트 중 문서 컨텍스트 앞까지의 고정 접두사 문자열"""
+    marker = "<<<CONTEXT>>>"
     try:
-        from app.utils.sqlcoder_utils import load_sqlcoder_model
-        model, tokenizer = load_sqlcoder_model()
-        
-        if model is None or tokenizer is None:
-            print("SQLCoder 모델 로드 실패")
-            return None, None
-            
-        print("SQLCoder 모델 로드 성공")
-        return model, tokenizer
+        rendered = tokenizer.apply_chat_template(
+            [{"role": "system", "content": f"{SYSTEM_PROMPT_HEADER}{marker}"}],
+            tokenize=False,
+        )
     except Exception as e:
-        print(f"SQLCoder 모델 로딩 중 오류 발생: {e}")
-        traceback.print_exc()
-        return None, None
+        print(f"시스템 프롬프트 접두사 생성 실패: {e}")
+        return None
+    index = rendered.find(marker)
+    return rendered[:index] if index > 0 else None
+
+
+def create_prefix_kv_cache() -> Optional[PrefixKVCache]:
+    """generate 모드에서 시스템 프롬프트 접두사 KV 캐시 생성 (모델 로드 시 1회 prefill)"""
+    if not PREFIX_KV_CACHE or llm_model is None or tokenizer is None or llm_engine is not None:
+        return None
+    prefix_text = build_system_prompt_prefix(tokenizer)
+    if not prefix_text:
+        return None
+    cache = PrefixKVCache(llm_model, tokenizer, prefix_text)
+    return cache if cache.build() else None
+
+
+def _load_elasticsearch():
+    global es_client
+    es_client = get_elasticsearch_client()
+    return es_client
+
+
+def _load_embedding():
+    global embedding_function
+    embedding_function = get_embedding_function()
+    return embedding_function
+
+
+def _load_llm():
+    global llm_model, tokenizer, llm_token_counter, llm_engine, prefix_kv_cache
+    model, model_tokenizer = get_llm_model_and_tokenizer()
+    if model is None or model_tokenizer is None:
+        return None
+    llm_model, tokenizer = model, model_tokenizer
+    llm_token_counter = make_token_counter(tokenizer)
+    # 연속 배칭 모드에서는 엔진 배치 크기만큼 동시에 생성 슬롯을 허용
+    if LLM_INFERENCE_MODE == "continuous":
+        llm_engine = ContinuousBatchingEngine(llm_model, tokenizer, max_batch_size=CONTINUOUS_BATCH_MAX_SIZE)
+        generation_scheduler.max_concurrent = max(LLM_MAX_CONCURRENT_GENERATIONS, CONTINUOUS_BATCH_MAX_SIZE)
+    prefix_kv_cache = create_prefix_kv_cache()
+    app.state.llm_model = llm_model
+    app.state.tokenizer = tokenizer
+    return llm_model
+
 
-# 모델 초기화
-es_client = get_elasticsearch_client()
-embedding_function = get_embedding_function()
-llm_model, tokenizer = get_llm_model_and_tokenizer()
-reranker_model = get_reranker_model()
-sqlcoder_model, sqlcoder_tokenizer = get_sqlcoder_model()
+def _load_reranker():
+    global reranker_model, reranker_dispatcher
+    reranker_model = get_reranker_model()
+    reranker_dispatcher = create_reranker_dispatcher(reranker_model)
+    return reranker_model
+
+
+def _load_sqlcoder():
+    # sql_sqlcoder_init.py 에서 초기화 함수 임포트 (DB 연결 확인, SQLCODER_PRELOAD면 모델도 로드)
+    # 모델 참조는 상주 관리자만 보관하여 유휴 시 해제될 수 있도록 함
+    from app.sql_sqlcoder_init import initialize_sqlcoder
+
+    success, message = initialize_sqlcoder(load_model=SQLCODER_PRELOAD)
+    if not success:
+        print(f"SQLCoder 초기화 실패: {message}")
+        return None
+    print(f"SQLCoder 초기화 성공: {message}")
+    return message
+
+
+# 모델 서버 사용 시: 모델 서버에서 해당 모델이 준비되면 같은 인터페이스의 원격 프록시를 전역 변수에 설정
+model_server_client = ModelServerClient(MODEL_SERVER_URL, timeout=MODEL_SERVER_TIMEOUT) if MODEL_SERVER_URL else None
+
+
+def _connect_embedding():
+    global embedding_function
+    if not model_server_client.wait_until_ready("embedding", timeout=MODEL_SERVER_READY_TIMEOUT):
+        return None
+    # 워커 로컬 쿼리 임베딩 캐시 적중 시 모델 서버 호출 생략
+    query_cache = (
+        QueryEmbeddingCache(EMBEDDING_MODEL_NAME, local_max_entries=QUERY_EMBEDDING_CACHE_SIZE)
+        if QUERY_EMBEDDING_CACHE else None
+    )
+    embedding_function = RemoteEmbeddingFunction(model_server_client, query_cache=query_cache)
+    return embedding_function
+
+
+def _connect_llm():
+    global llm_model, tokenizer, llm_token_counter
+    if not model_server_client.wait_until_ready("llm", timeout=MODEL_SERVER_READY_TIMEOUT):
+        return None
+    # 프롬프트 템플릿 적용/토큰화/토큰 수 계산은 워커에서 수행하고 생성만 모델 서버에 요청
+    # (연속 배칭 엔진과 접두사 KV 캐시는 모델 서버 프로세스에서 동작)
+    tokenizer = get_llm_tokenizer()
+    llm_model = RemoteLLM(model_server_client)
+    llm_token_counter = make_token_counter(tokenizer)
+    # 로컬 생성 슬롯이 1개면 워커당 한 시퀀스만 보내 모델 서버 연속 배칭이 채워지지 않으므로
+    # 모델 서버의 동시 생성 수만큼 허용 (실제 배치 구성/대기는 모델 서버 스케줄러가 담당)
+    capacity = model_server_client.generation_capacity()
+    if capacity:
+        generation_scheduler.max_concurrent = max(LLM_MAX_CONCURRENT_GENERATIONS, capacity)
+    app.state.llm_model = llm_model
+    app.state.tokenizer = tokenizer
+    return llm_model
+
+
+def _connect_reranker():
+    global reranker_model
+    if not model_server_client.wait_until_ready("reranker", timeout=MODEL_SERVER_READY_TIMEOUT):
+        return None
+    # 동적 배칭은 모든 워커의 요청을 받는 모델 서버의 디스패처가 담당
+    reranker_model = RemoteReranker(model_server_client)
+    return reranker_model
+
+
+# 독립적인 모델은 동시에 로드하고, SQLCoder 초기화는 GPU 메모리 경합을 피하기 위해 LLM 로드 후 진행
+model_registry = ModelRegistry(max_workers=MODEL_LOAD_WORKERS)
+model_registry.register("elasticsearch", _load_elasticsearch)
+if model_server_client is not None:
+    model_registry.register("embedding", _connect_embedding)
+    model_registry.register("llm", _connect_llm)
+    model_registry.register("reranker", _connect_reranker)
+else:
+    model_registry.register("embedding", _load_embedding)
+    model_registry.register("llm", _load_llm)
+    model_registry.register("reranker", _load_reranker)
+model_registry.register("sqlcoder", _load_sqlcoder, depends_on=["llm"], required=False)
+
+
+def models_not_ready_response(*names: str) -> Optional[JSONResponse]:
+    """필요한 모델이 아직 로드되지 않았으면 503 응답 반환 (모두 준비되었으면 None)"""
+    missing = model_registry.not_ready(*names)
+    if not missing:
+        return None
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"message": MODELS_LOADING_MESSAGE, "not_ready": missing},
+        headers={"Retry-After": "10"},
+    )
+
+
+def llm_busy_response() -> JSONResponse:
+    """생성 대기열이 가득 찼을 때의 빠른 503 응답"""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"message": LLM_BUSY_MESSAGE},
+        headers={"Retry-After": "5"},
+    )
+
+
+async def acquire_generation_slot(priority: int, label: str) -> Optional[GenerationTicket]:
+    """
+    생성 스케줄러 대기열에 등록하고 실행 슬롯을 얻을 때까지 대기
+
+    Returns:
+        실행 슬롯을 가진 티켓 (대기열이 가득 찼거나 대기 시간 초과 시 None)
+    """
+    try:
+        ticket = generation_scheduler.enqueue(priority=priority, label=label)
+    except GenerationQueueFull as e:
+        logger.warning(f"[{label}] {e}")
+        return None
+    if not await generation_scheduler.wait_for_turn(ticket, timeout=LLM_QUEUE_TIMEOUT):
+        logger.warning(f"[{label}] 생성 대기 시간 초과 ({LLM_QUEUE_TIMEOUT}s)")
+        return None
+    if ticket.queue_wait > 0.05:
+        logger.info(f"[{label}] 생성 슬롯 획득 - 대기 {ticket.queue_wait:.2f}s")
+    return ticket
+
+
+def _start_llm_generation(ticket: GenerationTicket, generation_kwargs: Dict[str, Any]) -> Any:
+    """
+    실행 슬롯을 가진 티켓으로 LLM 생성 시작 (생성 종료 시 슬롯 반환)
+
+    Returns:
+        is_alive()/join()을 제공하는 핸들 (생성 스레드 또는 연속 배칭 요청)
+    """
+    if llm_engine is not None:
+        # 연속 배칭: 다음 디코딩 스텝 사이에 기존 배치에 합류
+        return llm_engine.submit_generation_kwargs(
+            generation_kwargs, on_finish=lambda: generation_scheduler.release(ticket)
+        )
+    return generation_scheduler.start_thread(ticket, llm_model.generate, generation_kwargs)
 
 
 class FeedbackRequest(BaseModel):
@@ -1323,7 +2202,7 @@ async def source_preview_endpoint(request: SourcePreviewRequest = Body(...)):
         )
 
         # ES 클라이언트 확인
-        if not es_client:
+        if not async_es_client:
             print("소스 프리뷰 오류: Elasticsearch 클라이언트가 초기화되지 않았습니다")
             return {
                 "status": "error",
@@ -1348,14 +2227,14 @@ async def source_preview_endpoint(request: SourcePreviewRequest = Body(...)):
         
         try:
             # 먼저 파일 존재 여부를 확인
-            verify_response = es_client.search(index=ES_INDEX_NAME, body=file_exists_query)
+            verify_response = await es_call(async_es_client).search(index=ES_INDEX_NAME, body=file_exists_query)
             doc_count = verify_response.get("aggregations", {}).get("path_exists", {}).get("value", 0)
             
             if doc_count == 0:
                 print(f"파일이 인덱스에 존재하지 않음: {request.path}")
                 
                 # 파일 목록 조회 및 유사한 파일 찾기
-                indexed_files_resp = es_client.search(
+                indexed_files_resp = await es_call(async_es_client).search(
                     index=ES_INDEX_NAME, 
                     body={"size": 0, "aggs": {"unique_files": {"terms": {"field": "source", "size": 30}}}}
                 )
@@ -1446,25 +2325,35 @@ async def source_preview_endpoint(request: SourcePreviewRequest = Body(...)):
             "size": 1
         })
         
-        # 시도 목록을 순회하며 검색 실행
+        # 모든 시도를 한 번의 msearch로 실행한 뒤 우선순위 순서대로 결과 확인
         doc = None
         failed_attempts = []
-        
-        for i, query in enumerate(search_attempts):
-            try:
-                response = es_client.search(index=ES_INDEX_NAME, body=query)
-                hits = response.get("hits", {}).get("hits", [])
-                
-                if hits:
-                    doc = hits[0]
-                    print(f"검색 시도 {i+1}번째 성공: {hits[0].get('_id')}")
-                    break
-                else:
-                    print(f"검색 시도 {i+1}번째 실패")
-                    failed_attempts.append({"query": query, "error": "결과 없음"})
-            except Exception as query_error:
-                print(f"검색 시도 {i+1}번째 오류: {str(query_error)}")
-                failed_attempts.append({"query": query, "error": str(query_error)})
+
+        searches = []
+        for query in search_attempts:
+            searches.extend([{"index": ES_INDEX_NAME}, query])
+
+        try:
+            msearch_response = await es_call(async_es_client).msearch(searches=searches)
+            attempt_responses = msearch_response.get("responses", [])
+        except Exception as msearch_error:
+            print(f"검색 시도 일괄 실행 오류: {str(msearch_error)}")
+            attempt_responses = [{"error": str(msearch_error)}] * len(search_attempts)
+
+        for i, (query, response) in enumerate(zip(search_attempts, attempt_responses)):
+            if "error" in response:
+                print(f"검색 시도 {i+1}번째 오류: {response['error']}")
+                failed_attempts.append({"query": query, "error": str(response["error"])})
+                continue
+
+            hits = response.get("hits", {}).get("hits", [])
+            if hits:
+                doc = hits[0]
+                print(f"검색 시도 {i+1}번째 성공: {hits[0].get('_id')}")
+                break
+            else:
+                print(f"검색 시도 {i+1}번째 실패")
+                failed_attempts.append({"query": query, "error": "결과 없음"})
         
         # 문서를 찾지 못한 경우
         if not doc:
@@ -1488,7 +2377,7 @@ async def source_preview_endpoint(request: SourcePreviewRequest = Body(...)):
                     "size": 1
                 }
                 
-                similar_response = es_client.search(index=ES_INDEX_NAME, body=similar_query)
+                similar_response = await es_call(async_es_client).search(index=ES_INDEX_NAME, body=similar_query)
                 similar_hits = similar_response.get("hits", {}).get("hits", [])
                 
                 if similar_hits:
@@ -1587,7 +2476,7 @@ async def source_preview_endpoint(request: SourcePreviewRequest = Body(...)):
 @app.get("/api/indexed-files")
 async def get_indexed_files():
     """Elasticsearch에 인덱싱된 고유한 파일명 목록을 반환합니다."""
-    if not es_client:
+    if not async_es_client:
         raise HTTPException(status_code=503, detail="Elasticsearch is not connected")
 
     try:
@@ -1605,7 +2494,7 @@ async def get_indexed_files():
             },
         }
 
-        response = es_client.search(index=ES_INDEX_NAME, body=query)
+        response = await es_call(async_es_client).search(index=ES_INDEX_NAME, body=query)
         # Aggregation 결과에서 파일명 추출
         buckets = (
             response.get("aggregations", {})
@@ -1729,33 +2618,70 @@ async def query_stats_endpoint(request: StatsQueryRequest = Body(...)):
 # 서버 시작 시 인덱스 확인
 @app.on_event("startup")
 async def startup_event():
+    # 이벤트 루프에서 사용할 공유 비동기 ES 클라이언트 초기화
+    global async_es_client
+    async_es_client = await get_async_elasticsearch_client()
+
+    # 모델 로드 시작 (ES 클라이언트만 필요한 엔드포인트는 로드 완료 전에도 응답)
+    model_registry.start()
+    # 색인 작업 워커 시작 (재시작 전 미완료 작업 재등록)
+    ingestion_jobs.start()
+    # 워밍업은 필요한 모델이 준비될 때까지 기다린 뒤 백그라운드에서 실행
+    # (워커마다 실행하면 워커 수만큼 생성이 사용자 요청과 슬롯을 다투므로 잠금을 얻은 워커만 실행)
+    if WARMUP_ON_STARTUP:
+        if warmup_lock.acquire():
+            warmup_runner.start(prepare_warmup_plan, trigger="startup")
+        else:
+            print("[워밍업] 다른 워커가 시작 워밍업을 실행 중이므로 건너뜀")
+    if not MODEL_BACKGROUND_LOADING:
+        for name in ("elasticsearch", "embedding", "llm", "reranker", "sqlcoder"):
+            await model_registry.wait_async(name)
+
     # 필수 리소스 확인
-    if not all([es_client, embedding_function, llm_model, tokenizer, reranker_model]):
+    if not MODEL_BACKGROUND_LOADING and not model_registry.ready:
         print("필수 리소스 로딩에 실패했습니다. 서버 로그를 확인하세요.")
-    
-    # SQLCoder 초기화
-    print("SQLCoder 모듈 초기화 중...")
-    try:
-        # sql_sqlcoder_init.py 에서 초기화 함수 임포트
-        from app.sql_sqlcoder_init import initialize_sqlcoder
-        
-        # SQLCoder 초기화
-        success, message = initialize_sqlcoder()
-        
-        if success:
-            print(f"SQLCoder 초기화 성공: {message}")
-            # 앱 상태에 모델 저장 (API에서 사용)
-            app.state.sqlcoder_model = sqlcoder_model
-            app.state.sqlcoder_tokenizer = sqlcoder_tokenizer
-        else:
-            print(f"SQLCoder 초기화 실패: {message}")
-    except Exception as e:
-        print(f"SQLCoder 초기화 중 예외 발생: {str(e)}")
-        traceback.print_exc()
-    
-    # 모델 상태 확인
-    app.state.llm_model = llm_model
-    app.state.tokenizer = tokenizer
+
+
+# 서버 종료 시 연결 정리
+@app.on_event("shutdown")
+async def shutdown_event():
+    global async_es_client
+    warmup_runner.cancel()
+    warmup_lock.release()
+    await ingestion_jobs.shutdown()
+    if async_es_client is not None:
+        await async_es_client.close()
+        async_es_client = None
+        print("Async Elasticsearch client closed.")
+    if es_client is not None:
+        es_client.close()
+    query_dispatcher = getattr(embedding_function, "query_dispatcher", None)
+    if query_dispatcher is not None:
+        query_dispatcher.shutdown()
+    if reranker_dispatcher is not None:
+        reranker_dispatcher.shutdown()
+    if llm_engine is not None:
+        llm_engine.shutdown()
+    model_registry.shutdown()
+    get_model_residency_manager().shutdown()
+    if model_server_client is not None:
+        model_server_client.close()
+
+
+@app.get("/health/live")
+async def health_live():
+    """프로세스 생존 여부 (모델 로드 상태와 무관)"""
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+async def health_ready():
+    """모델별 로드 상태 반환 (필수 모델이 모두 준비되지 않았으면 503)"""
+    registry_status = model_registry.status()
+    registry_status["async_elasticsearch"] = async_es_client is not None
+    if not registry_status["ready"]:
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content=registry_status)
+    return registry_status
 
 
 @app.get("/api/file-viewer/{filename}")
@@ -1792,11 +2718,61 @@ async def get_file_for_viewer(filename: str):
     return FileResponse(path=file_path, media_type=mime_type)
 
 
+async def get_file_categories(client: AsyncElasticsearch, filename: str) -> Optional[List[str]]:
+    """파일(source)이 인덱싱된 카테고리 목록 조회 (조회 실패 시 None)"""
+    try:
+        response = await es_call(client).search(
+            index=ES_INDEX_NAME,
+            body={
+                "size": 0,
+                "query": {"term": {"source": filename}},
+                "aggs": {"categories": {"terms": {"field": "category", "size": 100}}},
+            },
+        )
+        buckets = response.get("aggregations", {}).get("categories", {}).get("buckets", [])
+        return [bucket["key"] for bucket in buckets]
+    except Exception as e:
+        print(f"파일 카테고리 조회 중 오류: {e}")
+        return None
+
+
+# 공유 결과 캐시 통계 엔드포인트
+@app.get("/api/cache/stats")
+async def get_result_cache_stats():
+    """프로세스 전역 검색/리랭킹 결과 캐시와 쿼리 임베딩 캐시의 사용량 및 적중률 통계를 반환합니다."""
+    query_cache = getattr(embedding_function, "query_cache", None)
+    query_dispatcher = getattr(embedding_function, "query_dispatcher", None)
+    return {
+        "status": "success",
+        "result_cache": get_shared_result_cache().get_stats(),
+        "rerank_score_cache": get_rerank_score_cache().get_stats(),
+        "semantic_answer_cache": semantic_cache.get_stats() if semantic_cache else None,
+        "query_embedding_cache": query_cache.get_stats() if query_cache else None,
+        "query_embedding_batching": query_dispatcher.get_stats() if query_dispatcher else None,
+        "reranker_batching": reranker_dispatcher.get_stats() if reranker_dispatcher else None,
+    }
+
+
+@app.get("/api/generation/stats")
+async def get_generation_stats():
+    """LLM 생성 스케줄러의 실행/대기 현황과 대기 시간 통계를 반환합니다."""
+    return {
+        "status": "success",
+        "inference_mode": "continuous" if llm_engine else "generate",
+        "scheduler": generation_scheduler.get_stats(),
+        "continuous_batching": llm_engine.get_stats() if llm_engine else None,
+        "chat_single_flight": chat_flights.get_stats() if chat_flights else None,
+        "model_residency": get_model_residency_manager().get_stats(),
+        "prefix_kv_cache": prefix_kv_cache.get_stats() if prefix_kv_cache else None,
+        "model_server": model_server_client.get_stats() if model_server_client else None,
+    }
+
+
 # 파일 삭제 엔드포인트
 @app.delete("/api/delete-file")
 async def delete_file(filename: str):
     """특정 파일을 Elasticsearch와 디스크에서 삭제합니다."""
-    if not es_client:
+    if not async_es_client:
         raise HTTPException(status_code=503, detail="Elasticsearch is not connected")
     
     if not filename:
@@ -1808,15 +2784,27 @@ async def delete_file(filename: str):
         
     try:
         print(f"파일 삭제 요청: {filename}")
-        
-        # file_manager.py의 delete_indexed_file 함수 호출
-        result = delete_indexed_file(
-            es_client=es_client,
+
+        # 캐시 무효화를 위해 삭제 전에 파일이 속한 카테고리 조회
+        affected_categories = await get_file_categories(async_es_client, filename)
+
+        # file_manager.py의 delete_indexed_file_async 함수 호출
+        result = await delete_indexed_file_async(
+            es_client=es_call(async_es_client, ES_DELETE_TIMEOUT),
             filename=filename,
             index_name=ES_INDEX_NAME,
             uploads_dir=os.path.join(STATIC_DIR, "uploads")
         )
         
+        # ES 문서가 삭제되었으면 해당 카테고리의 공유 캐시 무효화 (카테고리 조회 실패 시 전체 무효화)
+        if result.get("es_docs_deleted", 0) > 0:
+            result_cache = get_shared_result_cache()
+            if affected_categories is None:
+                result_cache.invalidate_all()
+            else:
+                for affected_category in affected_categories:
+                    result_cache.invalidate_category(affected_category)
+
         if result["status"] == "success":
             print(f"파일 삭제 성공: {filename}")
             return {"status": "success", "message": result["message"]}
@@ -1840,9 +2828,8 @@ async def delete_all_files():
     start_time = time.time()
     logger.info("모든 파일 삭제 요청 수신")
 
-    es_client = get_elasticsearch_client()
-    if not es_client:
-        logger.error("Elasticsearch 클라이언트 초기화 실패. 모든 파일 삭제 작업을 중단합니다.")
+    if not async_es_client:
+        logger.error("Elasticsearch 클라이언트가 연결되지 않았습니다. 모든 파일 삭제 작업을 중단합니다.")
         raise HTTPException(status_code=500, detail="Elasticsearch 연결 실패")
 
     uploads_dir = os.path.join(STATIC_DIR, "uploads")
@@ -1855,7 +2842,7 @@ async def delete_all_files():
         logger.info(f"'{ES_INDEX_NAME}' 인덱스에서 모든 문서 삭제 시작...")
         try:
             # match_all 쿼리를 사용하여 모든 문서 삭제
-            delete_response = es_client.delete_by_query(
+            delete_response = await es_call(async_es_client, ES_DELETE_TIMEOUT).delete_by_query(
                 index=ES_INDEX_NAME,
                 body={
                     "query": {
@@ -1868,6 +2855,9 @@ async def delete_all_files():
             
             es_deleted_count = delete_response.get("deleted", 0)
             logger.info(f"Elasticsearch에서 총 {es_deleted_count}개 문서 삭제 완료")
+
+            # 모든 카테고리의 공유 검색/리랭킹 캐시 무효화
+            get_shared_result_cache().invalidate_all()
             
             if es_deleted_count == 0:
                 logger.warning("Elasticsearch에서 삭제할 문서가 없습니다.")
@@ -1944,34 +2934,155 @@ async def delete_all_files():
         )
 
 
+# 업로드 파일 색인 작업 처리 (색인 작업 대기열 워커에서 파일마다 호출)
+async def index_uploaded_file(
+    job: Dict[str, Any], file_result: Dict[str, Any], progress: Callable[[str, int], None]
+) -> Dict[str, Any]:
+    """
+    중복 확인 → 로드(OCR) → 분할 → 임베딩/색인
+
+    Returns:
+        파일 결과에 병합할 필드 (status, message 등)
+    """
+    filename = file_result["filename"]
+    file_path = file_result["file_path"]
+    category = job["category"]
+    is_ocr_candidate = file_result.get("file_info", {}).get("ocr_supported", False)
+
+    # 재시작 직후 등록된 작업은 색인에 필요한 모델이 준비될 때까지 대기
+    progress("waiting_for_models", 0)
+    for name in ("elasticsearch", "embedding"):
+        if not await model_registry.wait_async(name):
+            return {"status": "error", "message": f"'{name}' 모델이 준비되지 않아 파일을 처리할 수 없습니다."}
+
+    logger.info(f"파일 인덱싱 시작: {filename}, 카테고리: {category}")
+    if is_ocr_candidate:
+        logger.info(f"OCR 지원 파일 감지: {filename} - OCR 처리가 시도될 수 있습니다.")
+
+    # 재시작 전에 처리 도중 중단된 파일: 이미 일괄 색인된 일부 청크가 남아 있으면 중복 체크에서 건너뛰거나
+    # 같은 청크가 두 번 색인되므로, 이 업로드의 문서(source = 저장 파일명)를 먼저 삭제하고 처음부터 다시 처리
+    if file_result.pop("resumed", False):
+        progress("cleanup_partial_index", 1)
+        source_name = os.path.basename(file_path)
+        if async_es_client is not None:
+            cleaned, deleted_count, cleanup_message = await delete_file_from_es_async(
+                es_call(async_es_client, ES_DELETE_TIMEOUT), source_name, ES_INDEX_NAME
+            )
+        else:
+            cleaned, deleted_count, cleanup_message = await asyncio.to_thread(
+                delete_file_from_es, es_client, source_name, ES_INDEX_NAME
+            )
+        logger.info(f"중단된 색인 정리: {filename} - {cleanup_message}")
+        if deleted_count > 0:
+            get_shared_result_cache().invalidate_category(category)
+        if not cleaned:
+            return {"status": "error", "message": f"이전에 중단된 색인 정리 실패: {cleanup_message}"}
+
+    # 파일 중복 체크
+    progress("duplicate_check", 2)
+    duplicate_check_client = es_call(async_es_client) if async_es_client else es_client
+    file_exists, file_hash = await check_file_exists(duplicate_check_client, file_path)
+
+    # 해시값 저장
+    file_result["file_hash"] = file_hash[:8] + "..." if file_hash else None
+
+    if file_exists:
+        # 중복 파일인 경우
+        return {
+            "status": "skipped",
+            "message": f"파일 '{filename}'은(는) 이미 인덱싱되어 있습니다.",
+            "duplicate": True,
+        }
+
+    # 새 파일 처리 - 메모리 관리 강화
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+        pre_process_memory = torch.cuda.memory_allocated() / (1024 ** 2)
+        logger.info(f"파일 처리 전 GPU 메모리: {pre_process_memory:.2f} MB")
+
+    processing_start = time.time()
+    if is_ocr_candidate:
+        logger.info(f"OCR 처리 시작: {filename}")
+
+    success = await process_and_index_file(
+        es_client, embedding_function, file_path, category,
+        token_counter=llm_token_counter,
+        progress_callback=progress,
+    )
+
+    processing_time = time.time() - processing_start
+    logger.info(f"파일 처리 소요 시간: {processing_time:.2f}초")
+
+    # 메모리 사용량 확인
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+        post_process_memory = torch.cuda.memory_allocated() / (1024 ** 2)
+        memory_used = post_process_memory - pre_process_memory
+        logger.info(f"파일 처리 후 GPU 메모리: {post_process_memory:.2f} MB (변화: {memory_used:.2f} MB)")
+
+    if not success:
+        logger.error(f"파일 인덱싱 실패: {filename}")
+        return {"status": "error", "message": "파일 인덱싱 실패"}
+
+    logger.info(f"파일 인덱싱 성공: {filename}")
+    # 카테고리 문서가 바뀌었으므로 공유 검색/리랭킹/답변 캐시 무효화
+    get_shared_result_cache().invalidate_category(category)
+    # 성공 메시지에 OCR 정보 포함
+    if is_ocr_candidate:
+        success_message = f"파일 '{filename}' 인덱싱 완료 (OCR 처리 적용)"
+    else:
+        success_message = f"파일 '{filename}' 인덱싱 완료"
+    return {"status": "success", "message": success_message, "ocr_processed": is_ocr_candidate}
+
+
+ingestion_jobs = IngestionJobQueue(
+    index_uploaded_file,
+    store=JobStore(INGESTION_JOB_DIR),
+    workers=INGESTION_WORKERS,
+    retention_seconds=INGESTION_JOB_RETENTION_DAYS * 24 * 3600,
+)
+
+
+def upload_job_response(job_info: Dict[str, Any]) -> Dict[str, Any]:
+    """완료된 색인 작업을 기존 /api/upload 응답 형식으로 변환"""
+    summary = job_info["summary"]
+    return {
+        "status": "success" if summary["error_count"] == 0 else "partial_success",
+        "message": f"{summary['total_files']}개 파일 처리 완료. {summary['success_count']}개 성공, {summary['error_count']}개 실패, {summary['skipped_count']}개 건너뜀 (OCR 처리: {summary['ocr_processed_count']}개)",
+        "job_id": job_info["job_id"],
+        "results": job_info["results"],
+        "summary": summary,
+    }
+
+
 # 파일 업로드 및 인덱싱 엔드포인트
 @app.post("/api/upload")
 async def upload_files(
     files: List[UploadFile] = File(...),  # 다중 파일 지원
     category: str = Form("메뉴얼"),  # 기본값을 메뉴얼로 설정
+    wait: bool = Form(False),  # True면 색인 완료까지 기다린 뒤 기존 형식으로 응답
 ):
-    results = []
-    start_time = time.time()  # 전체 처리 시작 시간
+    """
+    업로드 파일을 저장하고 색인 작업을 등록합니다.
+
+    기본적으로 작업 ID를 즉시 반환(202)하며, 진행 상황은 /api/jobs/{job_id}로 조회합니다.
+    """
+    not_ready = models_not_ready_response("elasticsearch", "embedding")
+    if not_ready is not None:
+        return not_ready
 
     logger.info(f"파일 업로드 요청 수신: {len(files)}개 파일, 카테고리: {category}")
 
     # 지원하는 이미지 확장자 목록 (OCR 처리 가능)
     ocr_supported_extensions = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif', '.webp']
-    
-    # 메모리 정리 - 초기 상태
-    if torch.cuda.is_available():
-        torch.cuda.empty_cache()
-        initial_memory = torch.cuda.memory_allocated() / (1024 ** 2)
-        logger.info(f"업로드 처리 시작 - 초기 GPU 메모리 사용량: {initial_memory:.2f} MB")
 
+    file_results = []
     for file_index, file in enumerate(files):
-        logger.info(f"[{file_index+1}/{len(files)}] 파일 처리 중: {file.filename}, 카테고리: {category}")
-        
         # 파일 확장자 확인
         file_extension = Path(file.filename).suffix.lower()
         is_ocr_candidate = file_extension in ocr_supported_extensions or file_extension == '.pdf'
-        
-        # 임시 파일 저장
+
+        # 업로드 파일 저장 (색인 작업 워커가 이 경로의 파일을 처리)
         unique_id = uuid.uuid4()
         file_path = f"app/static/uploads/{unique_id}_{file.filename}"
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
@@ -1982,14 +3093,14 @@ async def upload_files(
 
             # 파일 정보 및 초기 상태
             file_size = os.path.getsize(file_path)
-            file_result = {
+            file_results.append({
                 "filename": file.filename,
                 "unique_id": str(unique_id),
-                "status": "processing",
-                "message": f"파일 '{file.filename}' 처리 중...",
+                "file_path": file_path,
+                "status": "queued",
+                "message": f"파일 '{file.filename}' 처리 대기 중...",
                 "size": file_size,
-                "start_time": time.time(),
-                "progress": 0,  # 진행률 추가
+                "progress": 0,
                 "file_info": {
                     "size_formatted": format_file_size(file_size),
                     "extension": file_extension,
@@ -1997,140 +3108,104 @@ async def upload_files(
                     "total": len(files),
                     "ocr_supported": is_ocr_candidate  # OCR 지원 여부 표시
                 }
-            }
-
-            # 파일 처리 및 인덱싱
-            try:
-                logger.info(f"파일 인덱싱 시작: {file.filename}")
-                
-                if is_ocr_candidate:
-                    logger.info(f"OCR 지원 파일 감지: {file.filename} - OCR 처리가 시도될 수 있습니다.")
-                
-                # 파일 중복 체크
-                file_exists, file_hash = await check_file_exists(es_client, file_path)
-
-                # 해시값 저장
-                file_result["file_hash"] = file_hash[:8] + "..." if file_hash else None
-
-                if file_exists:
-                    # 중복 파일인 경우
-                    file_result.update({
-                            "status": "skipped",
-                            "message": f"파일 '{file.filename}'은(는) 이미 인덱싱되어 있습니다.",
-                        "processing_time": round(time.time() - file_result["start_time"], 2),
-                            "duplicate": True,
-                        "progress": 100
-                    })
-                else:
-                    # 새 파일 처리 - 메모리 관리 강화
-                    if torch.cuda.is_available():
-                        torch.cuda.empty_cache()
-                        pre_process_memory = torch.cuda.memory_allocated() / (1024 ** 2)
-                        logger.info(f"파일 처리 전 GPU 메모리: {pre_process_memory:.2f} MB")
-
-                    # 파일 처리 진행률 업데이트 (실제로는 비동기 처리가 필요할 수 있음)
-                    file_result["progress"] = 30
-                    
-                    processing_start = time.time()
-                    if is_ocr_candidate:
-                        logger.info(f"OCR 처리 시작: {file.filename}")
-                    
-                    success = await process_and_index_file(
-                        es_client, embedding_function, file_path, category
-                    )
-                    
-                    processing_time = time.time() - processing_start
-                    logger.info(f"파일 처리 소요 시간: {processing_time:.2f}초")
-
-                    # 메모리 사용량 확인
-                    if torch.cuda.is_available():
-                        torch.cuda.empty_cache()
-                        post_process_memory = torch.cuda.memory_allocated() / (1024 ** 2)
-                        memory_used = post_process_memory - pre_process_memory
-                        logger.info(f"파일 처리 후 GPU 메모리: {post_process_memory:.2f} MB (변화: {memory_used:.2f} MB)")
-
-                    if success:
-                        logger.info(f"파일 인덱싱 성공: {file.filename}")
-                        # 성공 메시지에 OCR 정보 포함
-                        if is_ocr_candidate:
-                            success_message = f"파일 '{file.filename}' 인덱싱 완료 (OCR 처리 적용)"
-                        else:
-                            success_message = f"파일 '{file.filename}' 인덱싱 완료"
-                            
-                        file_result.update({
-                                "status": "success",
-                                "message": success_message,
-                            "processing_time": round(time.time() - file_result["start_time"], 2),
-                            "ocr_processed": is_ocr_candidate,
-                            "progress": 100
-                        })
-                    else:
-                        logger.error(f"파일 인덱싱 실패: {file.filename}")
-                        file_result.update({
-                                "status": "error",
-                                "message": "파일 인덱싱 실패",
-                            "processing_time": round(time.time() - file_result["start_time"], 2),
-                            "progress": 100
-                        })
-            except Exception as e:
-                logger.error(f"파일 처리 중 오류 발생: {file.filename}, 오류: {str(e)}")
-                traceback.print_exc()
-                file_result.update({
-                        "status": "error",
-                        "message": f"오류 발생: {str(e)}",
-                    "processing_time": round(time.time() - file_result["start_time"], 2),
-                        "error_details": str(e),
-                    "progress": 100
-                })
-
-            results.append(file_result)
+            })
         except Exception as e:
             logger.error(f"파일 저장 중 오류 발생: {file.filename}, 오류: {str(e)}")
             traceback.print_exc()
-            results.append({
-                    "filename": file.filename,
-                    "status": "error",
-                    "message": f"파일 저장 중 오류 발생: {str(e)}",
-                    "error_details": str(e),
+            file_results.append({
+                "filename": file.filename,
+                "status": "error",
+                "message": f"파일 저장 중 오류 발생: {str(e)}",
+                "error_details": str(e),
+                "size": 0,
                 "progress": 100
             })
 
-    # 최종 메모리 정리
-    if torch.cuda.is_available():
-        torch.cuda.empty_cache()
-        final_memory = torch.cuda.memory_allocated() / (1024 ** 2)
-        logger.info(f"전체 처리 완료 - 최종 GPU 메모리 사용량: {final_memory:.2f} MB")
+    job = ingestion_jobs.submit(file_results, category)
+    logger.info(f"색인 작업 등록: {job['job_id']} ({len(file_results)}개 파일)")
 
-    # 전체 요약 통계 추가
-    total_time = round(time.time() - start_time, 2)
-    ocr_files_count = sum(1 for r in results if r.get("file_info", {}).get("ocr_supported", False))
-    ocr_processed_count = sum(1 for r in results if r.get("ocr_processed", False) and r["status"] == "success")
-    
-    summary = {
-        "total_files": len(results),
-        "success_count": sum(1 for r in results if r["status"] == "success"),
-        "error_count": sum(1 for r in results if r["status"] == "error"),
-        "skipped_count": sum(1 for r in results if r["status"] == "skipped"),
-        "ocr_supported_count": ocr_files_count,
-        "ocr_processed_count": ocr_processed_count,
-        "total_size": sum(r["size"] for r in results),
-        "total_size_formatted": format_file_size(sum(r["size"] for r in results)),
-        "total_processing_time": total_time,
-        "average_file_time": round(total_time / len(results), 2) if results else 0
-    }
+    if wait:
+        await ingestion_jobs.wait(job["job_id"])
+        return JSONResponse(content=upload_job_response(ingestion_jobs.get(job["job_id"])))
 
+    job_info = ingestion_jobs.get(job["job_id"])
     return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
         content={
-            "status": "success" if summary["error_count"] == 0 else "partial_success",
-            "message": f"{summary['total_files']}개 파일 처리 완료. {summary['success_count']}개 성공, {summary['error_count']}개 실패, {summary['skipped_count']}개 건너뜀 (OCR 처리: {summary['ocr_processed_count']}개)",
-            "results": results,
-            "summary": summary,
-        }
+            "status": "queued",
+            "message": f"{len(file_results)}개 파일의 색인 작업이 등록되었습니다.",
+            "job_id": job["job_id"],
+            "status_url": f"/api/jobs/{job['job_id']}",
+            "results": job_info["results"],
+            "summary": job_info["summary"],
+        },
     )
 
+
+@app.get("/api/jobs")
+async def list_ingestion_jobs(limit: int = 20):
+    """최근 색인 작업 목록을 반환합니다."""
+    return {"status": "success", "jobs": ingestion_jobs.list_jobs(limit), "stats": ingestion_jobs.get_stats()}
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_ingestion_job(job_id: str):
+    """
+    색인 작업의 상태(queued/running/completed/failed), 전체 진행률,
+    파일별 처리 단계(stage)와 진행률을 반환합니다. 완료된 작업은 기존 업로드 응답 필드도 포함합니다.
+    """
+    job_info = ingestion_jobs.get(job_id)
+    if job_info is None:
+        raise HTTPException(status_code=404, detail=f"작업을 찾을 수 없습니다: {job_id}")
+    if job_info["status"] in ("completed", "failed"):
+        job_info["upload_result"] = upload_job_response(job_info)
+    return job_info
+
+
 # 질문-응답 엔드포인트
+SSE_HEADERS = {
+    "Content-Type": "text/event-stream",
+    "Cache-Control": "no-cache", # 클라이언트 및 프록시 캐싱 방지
+    "Connection": "keep-alive",  # 연결 유지
+    "X-Accel-Buffering": "no",   # Nginx 등 리버스 프록시 버퍼링 비활성화
+}
+
+
+def history_digest(history: Optional[List[Dict[str, Any]]]) -> str:
+    """대화 이력 해시 (같은 후속 질문이라도 대화가 다르면 다른 요청으로 구분)"""
+    if not history:
+        return ""
+    serialized = json.dumps(history, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
 @app.post("/api/chat")
 async def chat(fastapi_request: FastAPIRequest, request: QuestionRequest = Body(...)):
+    """
+    같은 질문(같은 카테고리, 같은 대화 이력)이 이미 처리 중이면 새로 검색/생성하지 않고 진행 중인 스트림을 구독합니다.
+    리더 요청이 스트림을 시작하지 못하고 끝나면(캐시 적중, 오류 등) 후속 요청은 직접 처리합니다.
+    """
+    if chat_flights is None:
+        return await run_chat_pipeline(fastapi_request, request)
+
+    flight, is_leader = chat_flights.join(
+        (normalize_query(request.question), request.category, history_digest(request.history))
+    )
+    if not is_leader:
+        logger.info(f"Joining in-flight chat request for '{request.question}' (category: {request.category})")
+        if await flight.wait_attached(timeout=LLM_QUEUE_TIMEOUT):
+            return StreamingResponse(flight.subscribe(), media_type="text/event-stream", headers=SSE_HEADERS)
+        return await run_chat_pipeline(fastapi_request, request)
+
+    try:
+        return await run_chat_pipeline(fastapi_request, request, flight)
+    finally:
+        if not flight.attached:
+            flight.abort()
+
+
+async def run_chat_pipeline(fastapi_request: FastAPIRequest, request: QuestionRequest, flight: Optional[Flight] = None):
+    """검색 → 리랭킹 → 스트리밍 생성 (flight가 있으면 스트림을 구독자들과 공유)"""
     logger.info(f"Received chat request: '{request.question}', Category: '{request.category}', History items: {len(request.history) if request.history else 0}")
     request_start_time = time.time()
 
@@ -2140,6 +3215,10 @@ async def chat(fastapi_request: FastAPIRequest, request: QuestionRequest = Body(
     # FastAPI 애플리케이션 시작 시 (예: @app.on_event("startup")) 이 변수들이 초기화되어야 합니다.
     global es_client, embedding_function, reranker_model, llm_model, tokenizer
 
+    not_ready = models_not_ready_response("elasticsearch", "embedding", "reranker", "llm")
+    if not_ready is not None:
+        return not_ready
+
     if not all([es_client, embedding_function, reranker_model, llm_model, tokenizer]):
         logger.error("Critical components (ES, models, tokenizer) not initialized.")
         return JSONResponse(
@@ -2147,6 +3226,31 @@ async def chat(fastapi_request: FastAPIRequest, request: QuestionRequest = Body(
             content={"message": "챗봇 시스템이 준비되지 않았습니다. 관리자에게 문의하세요."}
         )
 
+    # 의미 기반 답변 캐시 조회 (적중 시 검색/생성 없이 즉시 재생)
+    # 대화 이력이 있는 후속 질문은 이력에 따라 답이 달라지므로 조회/저장하지 않음
+    semantic_generation = get_shared_result_cache().generation(request.category)
+    question_embedding = None
+    if semantic_cache is not None and not request.history:
+        try:
+            question_embedding = await asyncio.to_thread(embedding_function.embed_query, request.question)
+            match = semantic_cache.lookup(request.question, request.category, question_embedding)
+        except Exception as e:
+            logger.warning(f"Semantic cache lookup failed: {e}")
+            match = None
+        if match is not None:
+            cached_payload, similarity, matched_question = match
+            logger.info(f"Semantic cache hit: '{request.question}' ≈ '{matched_question}' (similarity {similarity:.3f})")
+            return stream_cached_answer(
+                cached_payload,
+                {"cache_tier": "semantic", "similarity": round(similarity, 4), "matched_question": matched_question},
+            )
+
+    # 생성 대기열이 가득 찬 경우 검색을 수행하기 전에 즉시 거절
+    if not generation_scheduler.has_capacity():
+        generation_scheduler.reject()
+        logger.warning("LLM generation queue is full. Rejecting chat request.")
+        return llm_busy_response()
+
     try:
         # 1. Elasticsearch에서 문서 검색, 검색 결과 개선, 리랭킹
         search_pipeline_start_time = time.time()
@@ -2158,21 +3262,30 @@ async def chat(fastapi_request: FastAPIRequest, request: QuestionRequest = Body(
             category=request.category,
             k=10 # 초기 검색 문서 수 (search_and_combine 함수 참고)
         )
-        retrieved_docs_initial = await asyncio.to_thread(retriever.get_relevant_documents, request.question)
+        enhancer = EnhancedSearchPipeline() # 인자 없이 초기화
+        # 쿼리 확장을 검색 전에 수행하여 변형 쿼리들을 한 번의 msearch로 검색
+        query_info = enhancer.query_expander.expand_query(request.question)
+        if MULTI_VARIANT_RETRIEVAL:
+            retrieved_docs_initial = await asyncio.to_thread(
+                retriever.get_relevant_documents_multi, request.question, query_info.get("variants", [])
+            )
+        else:
+            retrieved_docs_initial = await asyncio.to_thread(retriever.get_relevant_documents, request.question)
         logger.info(f"Initial document retrieval completed in {time.time() - search_pipeline_start_time:.4f} seconds. Found {len(retrieved_docs_initial)} docs.")
 
         if not retrieved_docs_initial:
             logger.info("No relevant documents found for the query from initial retrieval.")
             async def empty_response_stream():
-                yield f"data: {json.dumps({'token': '관련 문서를 찾을 수 없습니다. 다른 질문을 시도해 주세요.'})}\n\n"
-                yield f"data: {json.dumps({'event': 'eos'})}\n\n"
+                yield format_sse({'token': '관련 문서를 찾을 수 없습니다. 다른 질문을 시도해 주세요.'})
+                yield format_sse({'event': 'eos'})
             return StreamingResponse(empty_response_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
         # 1b. EnhancedSearchPipeline을 사용하여 검색 결과 개선 (TypeError 수정)
         enhance_start_time = time.time()
-        enhancer = EnhancedSearchPipeline() # 인자 없이 초기화
-        # process 메소드는 (query, docs)를 인자로 받음
-        _query_info, enhanced_docs = await asyncio.to_thread(enhancer.process, request.question, retrieved_docs_initial)
+        # 검색 단계에서 확장한 query_info를 재사용
+        _query_info, enhanced_docs = await asyncio.to_thread(
+            enhancer.process, request.question, retrieved_docs_initial, query_info
+        )
         logger.info(f"Search enhancement completed in {time.time() - enhance_start_time:.4f} seconds.")
         
         # 개선된 문서가 있으면 사용, 없으면 초기 검색 결과 사용
@@ -2180,16 +3293,23 @@ async def chat(fastapi_request: FastAPIRequest, request: QuestionRequest = Body(
 
         # 1c. Reranking
         rerank_start_time = time.time()
-        local_reranker = EnhancedLocalReranker(reranker_model=reranker_model)
+        local_reranker = EnhancedLocalReranker(
+            reranker_model=reranker_model, category=request.category, dispatcher=reranker_dispatcher
+        )
         reranked_docs = await asyncio.to_thread(local_reranker.rerank, request.question, docs_for_reranking)
-        logger.info(f"Document reranking completed in {time.time() - rerank_start_time:.4f} seconds. Reranked to {len(reranked_docs)} docs.")
+        logger.info(f"Document reranking completed in {time.time() - rerank_start_time:.4f} seconds. Reranked to {len(reranked_docs)} docs. Stages: {local_reranker.last_timings}")
         
         # 실제 LLM에 전달할 문서 수 제한 (예: 상위 5-10개)
         # 너무 많은 문서는 컨텍스트 길이 초과 또는 노이즈 증가 유발 가능
         # 이 값은 실험을 통해 최적화 필요
-        NUM_DOCS_FOR_LLM = 7 # 예시 값
-        top_docs = reranked_docs[:NUM_DOCS_FOR_LLM]
-        logger.info(f"Using top {len(top_docs)} docs for LLM context.")
+        # 인덱싱 시 저장한 token_count로 토큰 예산 내에서 문서 선택 (prefill 길이 상한 보장)
+        top_docs, context_tokens = pack_documents(
+            reranked_docs,
+            max_tokens=LLM_CONTEXT_TOKEN_BUDGET,
+            max_docs=LLM_CONTEXT_MAX_DOCS,
+            token_counter=llm_token_counter,
+        )
+        logger.info(f"Using top {len(top_docs)} docs for LLM context ({context_tokens}/{LLM_CONTEXT_TOKEN_BUDGET} tokens).")
 
         # 2. LLM에 전달할 최종 프롬프트 생성
         prompt_generation_start_time = time.time()
@@ -2225,6 +3345,9 @@ async def chat(fastapi_request: FastAPIRequest, request: QuestionRequest = Body(
         generation_temperature = 0.1 # 예시: 약간의 창의성 허용, 너무 높으면 일관성 저하
         generation_max_new_tokens = 2048 # 답변 최대 길이
 
+        # 클라이언트 연결이 끊기면 생성을 즉시 중단하기 위한 요청별 취소 조건
+        cancel_criteria = CancellationStoppingCriteria()
+
         generation_kwargs = dict(
             **inputs,
             max_new_tokens=generation_max_new_tokens,
@@ -2232,7 +3355,13 @@ async def chat(fastapi_request: FastAPIRequest, request: QuestionRequest = Body(
             pad_token_id=tokenizer.eos_token_id, # 매우 중요
             #eos_token_id=tokenizer.eos_token_id, # 필요시 명시 (Qwen은 여러 eos_token_id를 가질 수 있음)
             streamer=streamer,
+            stopping_criteria=StoppingCriteriaList([cancel_criteria]),
         )
+        # 시스템 프롬프트 접두사가 일치하면 미리 계산한 KV 캐시 복사본을 전달하여 접두사 prefill 생략
+        if prefix_kv_cache is not None:
+            prefix_past = prefix_kv_cache.lookup(inputs["input_ids"])
+            if prefix_past is not None:
+                generation_kwargs["past_key_values"] = prefix_past
         # temperature > 0 이면 do_sample=True가 기본이나, 명시적으로 설정 가능
         if generation_temperature > 0.0:
              generation_kwargs["do_sample"] = True
@@ -2249,40 +3378,73 @@ async def chat(fastapi_request: FastAPIRequest, request: QuestionRequest = Body(
         logger.info(f"Starting LLM generation with params: temp={generation_temperature}, max_tokens={generation_max_new_tokens}")
         llm_generation_start_time = time.time()
 
-        # 별도 스레드에서 모델 생성 실행 (GPU 작업은 GIL의 영향을 덜 받지만, I/O 바운드 작업처럼 처리)
-        # autocast 컨텍스트는 generate 함수 내부에서 처리되거나, 스레드 타겟 함수를 래핑하여 적용 가능
-        # 현재 llm_model.generate가 autocast를 내부적으로 처리한다고 가정
-        thread = Thread(target=llm_model.generate, kwargs=generation_kwargs)
-        thread.start()
-
         # 인용 감지 및 소스 처리를 위한 변수
         accumulated_text = ""
         cited_sources = []
+        # 생성 스레드는 스케줄러에서 실행 슬롯을 얻은 뒤 시작
+        thread = None
+        generation_ticket = None
+
+        # 상위 문서 shingle 인덱스 (40자 조각 일치 또는 키워드 40% 초과 포함 시 인용)
+        citation_index = CitationIndex(
+            [doc.page_content for doc in top_docs_content], shingle_size=40, keyword_ratio=0.4
+        )
+
+        async def client_gone() -> bool:
+            # 공유 스트림이면 모든 구독자가 끊겼을 때만 생성 취소
+            if flight is not None:
+                return flight.abandoned
+            return await fastapi_request.is_disconnected()
 
         # 비동기 제너레이터 정의
         async def stream_generator():
-            nonlocal accumulated_text, cited_sources
+            nonlocal accumulated_text, cited_sources, thread, generation_ticket, llm_generation_start_time
             # logger.debug("Stream generator started.")
             generated_text_count = 0
             try:
-                for new_text in streamer:
+                # 생성 스케줄러에서 실행 슬롯 획득 (대기열 초과/시간 초과 시 busy 이벤트)
+                generation_ticket = await acquire_generation_slot(GENERATION_PRIORITY_CHAT, "chat")
+                if generation_ticket is None:
+                    yield format_sse({'token': LLM_BUSY_MESSAGE})
+                    yield format_sse({'event': 'busy', 'message': LLM_BUSY_MESSAGE})
+                    yield format_sse({'event': 'eos', 'message': 'Generation queue is full.'})
+                    return
+
+                # 별도 스레드에서 모델 생성 실행 (GPU 작업은 GIL의 영향을 덜 받지만, I/O 바운드 작업처럼 처리)
+                # 현재 llm_model.generate가 autocast를 내부적으로 처리한다고 가정
+                llm_generation_start_time = time.time()
+                thread = _start_llm_generation(generation_ticket, generation_kwargs)
+
+                # 토큰 조각을 시간 창/바이트 임계값 단위로 묶어 SSE 프레임 수를 줄임
+                coalescer = TokenCoalescer(SSE_COALESCE_WINDOW_MS, SSE_COALESCE_MAX_BYTES)
+                async for new_text in iterate_streamer(streamer):
                     # 클라이언트 연결 중단 확인
-                    if await fastapi_request.is_disconnected():
-                        logger.info("Client disconnected, stopping stream.")
-                        # 스레드가 아직 실행 중이면 종료 시도 (주의: 스레드를 강제로 종료하는 것은 위험할 수 있음)
-                        # 모델 생성 로직이 중단 신호를 받을 수 있도록 설계하는 것이 이상적
-                        if thread.is_alive():
-                            logger.warning("LLM generation thread is still alive. Attempting to manage resources.")
-                            # streamer.end = True # TextIteratorStreamer에 종료 플래그가 있다면 설정 (라이브러리 확인 필요)
-                            # 또는 모델 generate 함수가 중단될 수 있는 방법을 찾아야 함
+                    if await client_gone():
+                        logger.info("Client disconnected, cancelling LLM generation.")
+                        # 취소 플래그 설정 → 다음 디코딩 스텝에서 generate 종료, 실행 슬롯 반환
+                        cancel_criteria.cancel()
                         break # 스트리밍 루프 중단
 
                     if new_text:
                         generated_text_count += len(new_text)
                         accumulated_text += new_text
+                        citation_index.feed(new_text)
                         # logger.debug(f"Streaming token: {new_text}")
-                        yield f"data: {json.dumps({'token': new_text})}\n\n" # SSE 형식
+                        frame = coalescer.add(new_text)
+                        if frame:
+                            yield frame # SSE 형식
                     await asyncio.sleep(0.001) # 다른 비동기 작업 실행 기회 부여
+                else:
+                    # 스트림 정상 종료 시 남은 토큰 전송
+                    frame = coalescer.flush()
+                    if frame:
+                        yield frame
+
+                # 연결이 끊겨 생성을 취소한 경우: 닫힌 연결에 출처/종료 프레임을 보내지 않고,
+                # 잘린 답변이 다음 요청에 재생되지 않도록 캐시에도 저장하지 않음 (슬롯 정리는 finally에서 수행)
+                if cancel_criteria.cancelled:
+                    logger.info(f"LLM generation cancelled after {generated_text_count} chars; skipping sources and caching.")
+                    return
                 
                 # 스트림 종료 시 인용 소스 처리
                 if accumulated_text:
@@ -2319,49 +3481,9 @@ async def chat(fastapi_request: FastAPIRequest, request: QuestionRequest = Body(
                     # 응답 정제 적용
                     cleaned_text = clean_response(accumulated_text)
                     
-                    # 인용 소스 감지
-                    def extract_keywords(text, min_length=3, max_keywords=20):
-                        if text is None or not isinstance(text, str):
-                            return []
-                        words = re.findall(r'\b[가-힣a-zA-Z0-9]+\b', text)
-                        filtered_words = [w for w in words if len(w) >= min_length]
-                        unique_words = list(set(filtered_words))[:max_keywords]
-                        return unique_words
-                    
-                    # 응답에서 키워드 추출
-                    answer_keywords = extract_keywords(cleaned_text)
-                    
-                    # 인용 소스 감지
+                    # 인용 소스 감지 (스트리밍 중 증분 매칭 결과 사용)
                     for i, meta in enumerate(source_metadata):
-                        cited = False
-                        source_text = top_docs_content[i].page_content if i < len(top_docs_content) else ""
-                        
-                        # 1. 연속된 텍스트 일치 여부 확인 (최소 40자로 상향 조정)
-                        if len(source_text) > 50:
-                            # 더 긴 스니펫(40자)으로 일치 여부 확인하여 정확도 향상
-                            for j in range(0, len(source_text) - 40, 10):
-                                snippet = source_text[j:j+40]
-                                if snippet in cleaned_text:
-                                    cited = True
-                                    logger.debug(f"문서 인용 감지: 40자 스니펫 일치 - {snippet[:20]}...")
-                                    break
-                        
-                        # 2. 키워드 기반 매칭 (매칭 비율 임계값 0.3 → 0.4로 상향 조정)
-                        if not cited and source_text:
-                            source_keywords = extract_keywords(source_text)
-                            if source_keywords:
-                                matches = [k for k in source_keywords if k in cleaned_text]
-                                match_ratio = len(matches) / len(source_keywords)
-                                # 매칭 비율 임계값 상향 조정 (0.3 → 0.4)
-                                if match_ratio > 0.4:
-                                    cited = True
-                                    logger.debug(f"문서 인용 감지: 키워드 매칭 비율 {match_ratio:.2f} - 키워드: {matches[:5]}...")
-                        
-                        # 인용된 소스만 추가
-                        if cited:
-                            meta["is_cited"] = True
-                        else:
-                            meta["is_cited"] = False
+                        meta["is_cited"] = citation_index.is_cited(i) if i < len(top_docs_content) else False
                 
                 # 스트림 종료 알림 (모든 토큰 생성 완료) - 출처 정보 포함
                 logger.info(f"LLM generation stream finished. Total chars: {generated_text_count}. Time: {time.time() - llm_generation_start_time:.4f}s")
@@ -2371,10 +3493,10 @@ async def chat(fastapi_request: FastAPIRequest, request: QuestionRequest = Body(
                 logger.info(f"인용된 소스 수: {len(cited_sources)}/{len(source_metadata)}")
                 
                 # 최종 메시지에 출처 정보 포함
-                yield f"data: {json.dumps({'event': 'sources', 'sources': source_metadata, 'cited_sources': cited_sources})}\n\n"
+                yield format_sse({'event': 'sources', 'sources': source_metadata, 'cited_sources': cited_sources, 'processing_time': {'queue_wait': round(generation_ticket.queue_wait, 3)}})
                 
                 # 스트림 종료 이벤트
-                yield f"data: {json.dumps({'event': 'eos', 'message': 'Stream ended successfully.'})}\n\n"
+                yield format_sse({'event': 'eos', 'message': 'Stream ended successfully.'})
                 
                 # 스트리밍 응답 완료 후 캐싱 처리
                 try:
@@ -2394,24 +3516,40 @@ async def chat(fastapi_request: FastAPIRequest, request: QuestionRequest = Body(
                         "cited_sources": cited_sources,
                         "processing_time": {
                             "total": round(time.time() - request_start_time, 2),
+                            "queue_wait": round(generation_ticket.queue_wait, 3),
+                            "reranking_stages": local_reranker.last_timings,
                             "llm_generation": round(time.time() - llm_generation_start_time, 2)
                         }
                     }
                     
-                    # 결과 캐싱
-                    cache_success = RedisCache.set(cache_key, final_result, CACHE_TTL_CHAT)
-                    if cache_success:
-                        logger.info(f"스트리밍 응답 캐싱 완료: {cache_key}")
-                    else:
-                        logger.warning(f"스트리밍 응답 캐싱 실패: {cache_key}")
+                    # 의미 기반 캐시에도 저장 (취소된 부분 응답은 제외)
+                    if semantic_cache is not None and question_embedding is not None and not cancel_criteria.cancelled:
+                        semantic_cache.add(
+                            request.question, request.category, question_embedding, final_result,
+                            generation=semantic_generation,
+                        )
+
+                    # 결과 캐싱 (취소된 부분 응답은 제외)
+                    if not cancel_criteria.cancelled:
+                        cache_success = RedisCache.set(cache_key, final_result, CACHE_TTL_CHAT)
+                        if cache_success:
+                            logger.info(f"스트리밍 응답 캐싱 완료: {cache_key}")
+                        else:
+                            logger.warning(f"스트리밍 응답 캐싱 실패: {cache_key}")
                 except Exception as cache_error:
                     logger.error(f"스트리밍 응답 캐싱 중 오류 발생: {cache_error}")
 
             except Exception as e:
                 logger.error(f"Error during LLM streaming: {e}", exc_info=True)
-                yield f"data: {json.dumps({'error': '스트리밍 중 오류가 발생했습니다.', 'details': str(e)})}\n\n"
+                yield format_sse({'error': '스트리밍 중 오류가 발생했습니다.', 'details': str(e)})
             finally:
-                if thread.is_alive():
+                # 응답이 중간에 끊긴 경우(클라이언트 종료 등) 남은 생성 취소
+                if thread is not None and thread.is_alive():
+                    cancel_criteria.cancel()
+                # 슬롯을 얻었지만 생성을 시작하지 못한 경우 슬롯 반환
+                if generation_ticket is not None and thread is None:
+                    generation_scheduler.cancel(generation_ticket)
+                if thread is not None and thread.is_alive():
                     thread.join(timeout=5.0) # 스레드 종료 대기 (타임아웃 설정)
                     if thread.is_alive():
                         logger.warning("LLM generation thread did not terminate gracefully.")
@@ -2419,14 +3557,11 @@ async def chat(fastapi_request: FastAPIRequest, request: QuestionRequest = Body(
                 total_request_time = time.time() - request_start_time
                 logger.info(f"Total chat request processing time: {total_request_time:.4f} seconds.")
         
-        # StreamingResponse 반환
-        headers = {
-            "Content-Type": "text/event-stream",
-            "Cache-Control": "no-cache", # 클라이언트 및 프록시 캐싱 방지
-            "Connection": "keep-alive",  # 연결 유지
-            "X-Accel-Buffering": "no",   # Nginx 등 리버스 프록시 버퍼링 비활성화
-        }
-        return StreamingResponse(stream_generator(), media_type="text/event-stream", headers=headers)
+        # StreamingResponse 반환 (동일 질문 구독자가 있으면 같은 스트림을 공유)
+        if flight is not None:
+            flight.attach(stream_generator())
+            return StreamingResponse(flight.subscribe(), media_type="text/event-stream", headers=SSE_HEADERS)
+        return StreamingResponse(stream_generator(), media_type="text/event-stream", headers=SSE_HEADERS)
 
     except HTTPException: # FastAPI의 HTTPException은 그대로 전달
         raise
@@ -2438,16 +3573,66 @@ async def chat(fastapi_request: FastAPIRequest, request: QuestionRequest = Body(
         )
 
 
+class WarmupClientRequest:
+    """워밍업에서 FastAPI Request 대신 사용하는 요청 객체 (연결이 끊기지 않는 클라이언트)"""
+
+    async def is_disconnected(self) -> bool:
+        return False
+
+
+async def run_warmup_question(question: str, category: str):
+    # 단일 실행(single-flight) 없이 채팅 파이프라인을 직접 실행하여 캐시를 채움
+    return await run_chat_pipeline(
+        WarmupClientRequest(), QuestionRequest(question=question, category=category, history=[])
+    )
+
+
+async def prepare_warmup_plan() -> List[Tuple[str, str]]:
+    """채팅 경로의 모델 준비를 기다린 뒤 (질문, 카테고리) 워밍업 목록 생성"""
+    for name in ("elasticsearch", "embedding", "reranker", "llm"):
+        if not await model_registry.wait_async(name):
+            raise RuntimeError(f"'{name}' 모델이 준비되지 않아 워밍업을 진행할 수 없습니다.")
+    categories = WARMUP_CATEGORIES or (await get_categories())["categories"]
+    frequent_questions = await asyncio.to_thread(collect_frequent_questions, WARMUP_TOP_N)
+    logger.info(f"Warmup plan: {len(categories)} categories, {len(frequent_questions)} frequent questions")
+    return build_warmup_plan(
+        categories, [item["question"] for item in frequent_questions], max_runs=WARMUP_MAX_RUNS
+    )
+
+
+warmup_runner = WarmupRunner(run_warmup_question)
+warmup_lock = ProcessLock(WARMUP_LOCK_PATH)
+
+
+@app.post("/api/warmup")
+async def start_warmup():
+    """워밍업을 백그라운드로 시작합니다 (이미 실행 중이면 현재 상태 반환)."""
+    started = warmup_runner.start(prepare_warmup_plan, trigger="manual")
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED if started else status.HTTP_200_OK,
+        content={"status": "started" if started else "already_running", "warmup": warmup_runner.get_status()},
+    )
+
+
+@app.get("/api/warmup")
+async def get_warmup_status():
+    """마지막(또는 진행 중인) 워밍업의 질문별 결과와 소요 시간을 반환합니다."""
+    return {"status": "success", "warmup": warmup_runner.get_status()}
+
+
 # 카테고리 목록 조회 엔드포인트
 @app.get("/api/categories")
 async def get_categories():
+    if not async_es_client:
+        raise HTTPException(status_code=503, detail="Elasticsearch is not connected")
+
     try:
         query = {
             "size": 0,
             "aggs": {"categories": {"terms": {"field": "category", "size": 100}}},
         }
 
-        result = es_client.search(index=ES_INDEX_NAME, body=query)
+        result = await es_call(async_es_client).search(index=ES_INDEX_NAME, body=query)
         categories = [
             bucket["key"] for bucket in result["aggregations"]["categories"]["buckets"]
         ]
@@ -2694,6 +3879,10 @@ async def get_db_schema():
 @app.post("/api/sql-query")
 async def process_sql_query(request: SQLQueryRequest = Body(...)):
     """자연어 질문을 SQL로 변환하고 실행 결과를 반환합니다."""
+    not_ready = models_not_ready_response("sqlcoder")
+    if not_ready is not None:
+        return not_ready
+
     try:
         # SQLCoder 유틸 사용
         from app.utils.sqlcoder_utils import generate_sql_from_question, run_sql_query
@@ -2771,8 +3960,18 @@ async def process_sql_query(request: SQLQueryRequest = Body(...)):
         raise HTTPException(status_code=500, detail=f"SQL 쿼리 처리 중 오류 발생: {str(e)}")
 
 @app.post("/api/sql-and-llm")
-async def process_sql_and_llm(request: SQLAndLLMRequest = Body(...)):
+async def process_sql_and_llm(fastapi_request: FastAPIRequest, request: SQLAndLLMRequest = Body(...)):
     """자연어 질문을 SQL로 변환 실행하고, LLM으로 설명을 추가합니다. 스트리밍 방식으로 응답합니다."""
+    not_ready = models_not_ready_response("sqlcoder", "llm")
+    if not_ready is not None:
+        return not_ready
+
+    # 생성 대기열이 가득 찬 경우 SQL 생성 전에 즉시 거절
+    if not generation_scheduler.has_capacity():
+        generation_scheduler.reject()
+        print("[SQL+LLM] LLM 생성 대기열이 가득 차 요청을 거절합니다.")
+        return llm_busy_response()
+
     try:
         # SQLCoder 유틸 사용
         from app.utils.sqlcoder_utils import generate_sql_from_question, run_sql_query
@@ -2864,64 +4063,96 @@ async def process_sql_and_llm(request: SQLAndLLMRequest = Body(...)):
             })
         
         # 생성 파라미터 설정
+        cancel_criteria = CancellationStoppingCriteria()
         generation_kwargs = dict(
             **inputs,
             max_new_tokens=1024,
             temperature=0.1,
             pad_token_id=tokenizer.eos_token_id,
             streamer=streamer,
-            do_sample=False  # 결정적 생성
+            do_sample=False,  # 결정적 생성
+            # 클라이언트 연결이 끊기면 생성을 즉시 중단하기 위한 요청별 취소 조건
+            stopping_criteria=StoppingCriteriaList([cancel_criteria]),
         )
         
-        # 별도 스레드에서 모델 생성 실행
-        thread = Thread(target=llm_model.generate, kwargs=generation_kwargs)
-        thread.start()
-        
         # 스트리밍 응답을 위한 변수
         accumulated_text = ""
+        # 생성 스레드는 스케줄러에서 실행 슬롯을 얻은 뒤 시작
+        thread = None
         
         # 비동기 제너레이터 정의
         async def stream_generator():
-            nonlocal accumulated_text
+            nonlocal accumulated_text, thread
             
             # 먼저 SQL 및 결과 정보 전송
-            yield f"data: {json.dumps({'event': 'sql', 'sql': sql_query, 'results': results_markdown})}\n\n"
+            yield format_sse({'event': 'sql', 'sql': sql_query, 'results': results_markdown})
             
-            # LLM 응답 스트리밍
-            for new_text in streamer:
-                if new_text:
-                    accumulated_text += new_text
-                    yield f"data: {json.dumps({'token': new_text})}\n\n"
-                await asyncio.sleep(0.001)  # 다른 비동기 작업 실행 기회 부여
+            # 생성 스케줄러에서 실행 슬롯 획득 (대기열 초과/시간 초과 시 busy 이벤트)
+            generation_ticket = await acquire_generation_slot(GENERATION_PRIORITY_SQL, "sql-and-llm")
+            if generation_ticket is None:
+                yield format_sse({'event': 'busy', 'message': LLM_BUSY_MESSAGE})
+                yield format_sse({'event': 'eos'})
+                return
+
+            # 별도 스레드에서 모델 생성 실행
+            try:
+                thread = _start_llm_generation(generation_ticket, generation_kwargs)
+            except Exception:
+                generation_scheduler.cancel(generation_ticket)
+                raise
             
-            # 중복 제거 로직 적용
             try:
-                cleaned_text = deduplicate_markdown_sections_py(accumulated_text)
+                # LLM 응답 스트리밍 (토큰 조각을 묶어서 전송)
+                coalescer = TokenCoalescer(SSE_COALESCE_WINDOW_MS, SSE_COALESCE_MAX_BYTES)
+                async for new_text in iterate_streamer(streamer):
+                    # 클라이언트 연결 중단 시 생성 취소
+                    if await fastapi_request.is_disconnected():
+                        print("[SQL+LLM] 클라이언트 연결 종료 - LLM 생성 취소")
+                        cancel_criteria.cancel()
+                        break
+                    if new_text:
+                        accumulated_text += new_text
+                        frame = coalescer.add(new_text)
+                        if frame:
+                            yield frame
+                    await asyncio.sleep(0.001)  # 다른 비동기 작업 실행 기회 부여
+                else:
+                    frame = coalescer.flush()
+                    if frame:
+                        yield frame
+            
+                # 중복 제거 로직 적용
+                try:
+                    cleaned_text = deduplicate_markdown_sections_py(accumulated_text)
                 
-                # 응답이 비었거나 너무 짧은 경우 등의 후처리
-                if not cleaned_text.strip() or len(cleaned_text.strip()) < 10 or "오류" in cleaned_text:
-                    if is_empty:
-                        cleaned_text = "조건에 맞는 데이터가 없습니다. 검색 조건을 변경해 보시거나, 다른 질문을 시도해보세요."
-                    elif "오류" in accumulated_text and not cleaned_text.strip():
-                        cleaned_text = accumulated_text  # 원본 오류 메시지 사용
-                    else:
-                        cleaned_text = "SQL 쿼리 결과를 기반으로 한 설명입니다. 위 테이블에서 자세한 정보를 확인하세요."
+                    # 응답이 비었거나 너무 짧은 경우 등의 후처리
+                    if not cleaned_text.strip() or len(cleaned_text.strip()) < 10 or "오류" in cleaned_text:
+                        if is_empty:
+                            cleaned_text = "조건에 맞는 데이터가 없습니다. 검색 조건을 변경해 보시거나, 다른 질문을 시도해보세요."
+                        elif "오류" in accumulated_text and not cleaned_text.strip():
+                            cleaned_text = accumulated_text  # 원본 오류 메시지 사용
+                        else:
+                            cleaned_text = "SQL 쿼리 결과를 기반으로 한 설명입니다. 위 테이블에서 자세한 정보를 확인하세요."
                 
-                # 최종 정리된 응답 전송 (필요시)
-                if cleaned_text != accumulated_text:
-                    yield f"data: {json.dumps({'event': 'cleaned_explanation', 'explanation': cleaned_text})}\n\n"
-            except Exception as clean_error:
-                print(f"[SQL+LLM] 응답 정리 중 오류: {clean_error}")
-                # 오류 시 원본 텍스트 사용
+                    # 최종 정리된 응답 전송 (필요시)
+                    if cleaned_text != accumulated_text:
+                        yield format_sse({'event': 'cleaned_explanation', 'explanation': cleaned_text})
+                except Exception as clean_error:
+                    print(f"[SQL+LLM] 응답 정리 중 오류: {clean_error}")
+                    # 오류 시 원본 텍스트 사용
             
-            # 스트림 종료 알림
-            yield f"data: {json.dumps({'event': 'eos'})}\n\n"
+                # 스트림 종료 알림 (생성 대기 시간 포함)
+                yield format_sse({'event': 'eos', 'processing_time': {'queue_wait': round(generation_ticket.queue_wait, 3)}})
             
-            # 스레드 종료 대기
-            if thread.is_alive():
-                thread.join(timeout=5.0)
+                # 스레드 종료 대기
+                if thread.is_alive():
+                    thread.join(timeout=5.0)
+                    if thread.is_alive():
+                        print("[SQL+LLM] 생성 스레드가 정상적으로 종료되지 않았습니다.")
+            finally:
+                # 응답이 중간에 끊긴 경우(클라이언트 종료 등) 남은 생성 취소
                 if thread.is_alive():
-                    print("[SQL+LLM] 생성 스레드가 정상적으로 종료되지 않았습니다.")
+                    cancel_criteria.cancel()
         
         # StreamingResponse 반환
         headers = {
@@ -0,0 +1,229 @@
+"""
+모델 서버 (추론 전용 프로세스)
+- 임베딩/리랭커/LLM을 한 프로세스에만 로드하고 로컬 HTTP로 제공
+- API 서버는 MODEL_SERVER_URL을 설정하면 모델을 로드하지 않고 app.utils.model_client로 호출하므로
+  uvicorn --workers N 으로 API 워커를 늘려도 모델 사본은 하나만 유지
+- 여러 API 워커의 쿼리 임베딩/리랭크 요청은 이 프로세스의 배치 디스패처에서 함께 처리되고,
+  LLM 생성은 이 프로세스의 생성 스케줄러(또는 연속 배칭 엔진)가 전역으로 관리
+
+실행 (backend 디렉토리에서, 워커는 반드시 1개):
+    uvicorn app.model_server:app --host 127.0.0.1 --port 8001
+    MODEL_SERVER_URL=http://127.0.0.1:8001 uvicorn app.main:app --host 0.0.0.0 --port 8000 --workers 4
+"""
+
+import os
+import asyncio
+import traceback
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+import torch
+from transformers import TextIteratorStreamer, StoppingCriteriaList
+
+# 모델 로더/스케줄러는 API 서버 모듈의 것을 그대로 사용 (이 프로세스에서는 로컬 모델 로더가 등록됨)
+from app import main as api
+from app.utils.llm_utils import CancellationStoppingCriteria
+from app.utils.model_registry import ModelRegistry
+from app.utils.sse_utils import format_sse, iterate_streamer
+
+MODEL_SERVER_HOST = os.environ.get("MODEL_SERVER_HOST", "127.0.0.1")  # 로컬 호출 전용 (외부 노출 금지)
+MODEL_SERVER_PORT = int(os.environ.get("MODEL_SERVER_PORT", "8001"))
+
+app = FastAPI(title="RAG Chatbot Model Server")
+
+# 모델 서버가 담당하는 모델만 로드 (Elasticsearch/SQLCoder는 API 서버가 사용)
+model_registry = ModelRegistry(max_workers=api.MODEL_LOAD_WORKERS)
+model_registry.register("embedding", api._load_embedding)
+model_registry.register("llm", api._load_llm)
+model_registry.register("reranker", api._load_reranker)
+
+
+class EmbedRequest(BaseModel):
+    texts: List[str]
+    mode: str = "documents"  # "query", "documents", "bulk"
+
+
+class RerankRequest(BaseModel):
+    pairs: List[List[str]]
+
+
+class GenerateRequest(BaseModel):
+    input_ids: List[int]
+    max_new_tokens: int = 1024
+    temperature: float = 0.1
+    do_sample: Optional[bool] = None
+    top_p: Optional[float] = None
+    top_k: Optional[int] = None
+    repetition_penalty: Optional[float] = None
+    pad_token_id: Optional[int] = None
+    priority: int = api.GENERATION_PRIORITY_CHAT
+
+
+def not_ready_response(name: str) -> Optional[JSONResponse]:
+    if model_registry.is_ready(name):
+        return None
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"message": api.MODELS_LOADING_MESSAGE, "not_ready": [name]},
+        headers={"Retry-After": "10"},
+    )
+
+
+@app.on_event("startup")
+async def startup_event():
+    model_registry.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    query_dispatcher = getattr(api.embedding_function, "query_dispatcher", None)
+    if query_dispatcher is not None:
+        query_dispatcher.shutdown()
+    if api.reranker_dispatcher is not None:
+        api.reranker_dispatcher.shutdown()
+    if api.llm_engine is not None:
+        api.llm_engine.shutdown()
+    model_registry.shutdown()
+
+
+@app.get("/health/live")
+async def health_live():
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+async def health_ready():
+    """모델별 로드 상태와 동시 생성 가능 수 (API 워커가 모델 준비 여부 확인 및 생성 슬롯 설정에 사용)"""
+    registry_status = model_registry.status()
+    # 연속 배칭 모드면 _load_llm에서 엔진 배치 크기로 상향된 값
+    registry_status["generation_capacity"] = api.generation_scheduler.max_concurrent
+    if not registry_status["ready"]:
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content=registry_status)
+    return registry_status
+
+
+@app.get("/stats")
+async def get_stats():
+    return {
+        "inference_mode": "continuous" if api.llm_engine else "generate",
+        "scheduler": api.generation_scheduler.get_stats(),
+        "continuous_batching": api.llm_engine.get_stats() if api.llm_engine else None,
+        "prefix_kv_cache": api.prefix_kv_cache.get_stats() if api.prefix_kv_cache else None,
+        "reranker_batching": api.reranker_dispatcher.get_stats() if api.reranker_dispatcher else None,
+    }
+
+
+@app.post("/embed")
+async def embed(request: EmbedRequest):
+    not_ready = not_ready_response("embedding")
+    if not_ready is not None:
+        return not_ready
+
+    embedding_function = api.embedding_function
+    try:
+        if request.mode == "query":
+            # 쿼리 경로: 쿼리 임베딩 캐시 + 워커 간 마이크로 배칭 적용
+            embeddings = await asyncio.gather(
+                *(asyncio.to_thread(embedding_function.embed_query, text) for text in request.texts)
+            )
+        elif request.mode == "bulk":
+            embeddings = await asyncio.to_thread(embedding_function.encode_bulk, request.texts)
+        else:
+            embeddings = await asyncio.to_thread(embedding_function, request.texts)
+    except Exception as e:
+        traceback.print_exc()
+        return JSONResponse(status_code=500, content={"message": f"임베딩 생성 중 오류: {e}"})
+    return {"embeddings": [list(map(float, embedding)) for embedding in embeddings]}
+
+
+@app.post("/rerank")
+async def rerank(request: RerankRequest):
+    not_ready = not_ready_response("reranker")
+    if not_ready is not None:
+        return not_ready
+
+    pairs = [tuple(pair) for pair in request.pairs]
+    try:
+        if api.reranker_dispatcher is not None:
+            # 여러 API 워커의 (쿼리, 문서) 쌍을 공유 배치로 처리
+            scores = await asyncio.to_thread(api.reranker_dispatcher.call_many, pairs)
+        else:
+            scores = await asyncio.to_thread(api.reranker_model.predict, pairs)
+    except Exception as e:
+        traceback.print_exc()
+        return JSONResponse(status_code=500, content={"message": f"리랭크 중 오류: {e}"})
+    return {"scores": [float(score) for score in scores]}
+
+
+@app.post("/generate")
+async def generate(fastapi_request: Request, request: GenerateRequest):
+    """
+    토큰 ID 입력을 받아 생성 텍스트 조각을 SSE로 스트리밍
+
+    프레임: {"text": ...} 반복 후 {"event": "eos"} (오류 시 {"error": ...})
+    클라이언트 연결이 끊기면 다음 디코딩 스텝에서 생성을 중단합니다.
+    """
+    not_ready = not_ready_response("llm")
+    if not_ready is not None:
+        return not_ready
+
+    ticket = await api.acquire_generation_slot(request.priority, "model-server")
+    if ticket is None:
+        return api.llm_busy_response()
+
+    tokenizer = api.tokenizer
+    streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+    cancel_criteria = CancellationStoppingCriteria()
+    input_ids = torch.tensor([request.input_ids], dtype=torch.long, device=api.llm_model.device)
+    generation_kwargs: Dict[str, Any] = dict(
+        input_ids=input_ids,
+        attention_mask=torch.ones_like(input_ids),
+        max_new_tokens=request.max_new_tokens,
+        temperature=request.temperature,
+        do_sample=request.do_sample if request.do_sample is not None else request.temperature > 0.0,
+        pad_token_id=request.pad_token_id if request.pad_token_id is not None else tokenizer.eos_token_id,
+        streamer=streamer,
+        stopping_criteria=StoppingCriteriaList([cancel_criteria]),
+    )
+    for name in ("top_p", "top_k", "repetition_penalty"):
+        value = getattr(request, name)
+        if value is not None:
+            generation_kwargs[name] = value
+    # 시스템 프롬프트 접두사가 일치하면 미리 계산한 KV 캐시 사용
+    if api.prefix_kv_cache is not None:
+        prefix_past = api.prefix_kv_cache.lookup(input_ids)
+        if prefix_past is not None:
+            generation_kwargs["past_key_values"] = prefix_past
+
+    try:
+        api._start_llm_generation(ticket, generation_kwargs)
+    except Exception:
+        api.generation_scheduler.cancel(ticket)
+        raise
+
+    async def stream_generator():
+        try:
+            async for text in iterate_streamer(streamer):
+                if await fastapi_request.is_disconnected():
+                    print("모델 서버: 클라이언트 연결 종료, 생성 취소")
+                    return
+                if text:
+                    yield format_sse({"text": text})
+            yield format_sse({"event": "eos"})
+        except Exception as e:
+            traceback.print_exc()
+            yield format_sse({"error": str(e)})
+        finally:
+            # 정상 종료 시에는 효과 없음, 연결 종료/오류 시 다음 디코딩 스텝에서 생성 중단
+            cancel_criteria.cancel()
+
+    return StreamingResponse(stream_generator(), media_type="text/event-stream")
+
+
+if __name__ == "__main__":
+    import uvicorn
+    # 모델 사본을 하나만 유지하기 위해 워커 1개로 실행
+    uvicorn.run(app, host=MODEL_SERVER_HOST, port=MODEL_SERVER_PORT, workers=1)
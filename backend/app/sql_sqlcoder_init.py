@@ -6,10 +6,13 @@ import os
 import traceback
 from typing import Tuple
 
-def initialize_sqlcoder() -> Tuple[bool, str]:
+def initialize_sqlcoder(load_model: bool = True) -> Tuple[bool, str]:
     """
     SQLCoder 모델을 초기화합니다.
     
+    Args:
+        load_model: False이면 DB 연결만 확인하고 모델은 첫 요청 시 로드
+    
     Returns:
         Tuple[bool, str]: 초기화 성공 여부와 메시지
     """
@@ -27,6 +30,9 @@ def initialize_sqlcoder() -> Tuple[bool, str]:
             if not db_connected:
                 return False, "SQLCoder 데이터베이스 연결 실패"
             
+            if not load_model:
+                return True, "SQLCoder 초기화 성공 (모델은 첫 요청 시 로드)"
+            
             # SQLCoder 모델 설정 확인
             try:
                 # 모델과 토크나이저 로드
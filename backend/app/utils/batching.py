@@ -0,0 +1,193 @@
+"""
+요청 간 마이크로 배칭 모듈
+- 여러 요청에서 들어온 입력을 짧은 대기 시간(ms) 동안 모아 한 번의 모델 호출로 처리
+- 최대 배치 크기 도달 시 즉시 처리
+- 호출자별 Future로 결과 전달 (동기/비동기 모두 지원)
+"""
+
+import time
+import queue
+import asyncio
+import threading
+import traceback
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# 기본 배칭 설정
+DEFAULT_MAX_BATCH_SIZE = 32
+DEFAULT_MAX_WAIT_MS = 5.0
+
+
+class BatchDispatcher(Generic[T, R]):
+    """
+    백그라운드 스레드 하나가 대기 중인 입력을 모아 process_fn을 배치로 호출합니다.
+
+    process_fn은 입력 리스트를 받아 같은 길이·같은 순서의 결과 리스트를 반환해야 합니다.
+    """
+
+    def __init__(
+        self,
+        process_fn: Callable[[List[T]], List[R]],
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+        name: str = "batch",
+    ):
+        self.process_fn = process_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.name = name
+
+        self._queue: "queue.Queue[Optional[Tuple[T, Future]]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stopped = False
+
+        # 통계
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._errors = 0
+        self._max_batch_seen = 0
+        self._max_queue_depth = 0
+        self._queue_depth_sum = 0
+        self._total_process_time = 0.0
+        self._total_wait_time = 0.0
+
+    # --- 워커 관리 ---
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name=f"{self.name}-dispatcher", daemon=True
+                )
+                self._worker.start()
+
+    def shutdown(self) -> None:
+        """워커 스레드 종료 (남은 요청은 처리 후 종료)"""
+        self._stopped = True
+        self._queue.put(None)
+
+    def _collect_batch(self, first: Tuple[T, Future]) -> Tuple[List[Tuple[T, Future]], bool]:
+        """첫 요청 이후 max_wait 동안 또는 max_batch_size까지 요청을 모음"""
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is None:  # 종료 신호
+                return batch, True
+            batch.append(entry)
+        return batch, False
+
+    def _run(self) -> None:
+        while True:
+            entry = self._queue.get()
+            if entry is None:
+                break
+
+            batch, stop = self._collect_batch(entry)
+            # 호출자가 이미 취소한 요청은 제외
+            batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+            if batch:
+                self._process_batch(batch)
+            if stop:
+                break
+
+    def _process_batch(self, batch: List[Tuple[T, Future]]) -> None:
+        items = [item for item, _ in batch]
+        start_time = time.time()
+        try:
+            results = self.process_fn(items)
+            if len(results) != len(items):
+                raise RuntimeError(
+                    f"{self.name}: 배치 결과 수 불일치 (입력 {len(items)}개, 결과 {len(results)}개)"
+                )
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+        except Exception as e:
+            print(f"{self.name} 배치 처리 중 오류 발생 (배치 크기 {len(items)}): {e}")
+            traceback.print_exc()
+            with self._stats_lock:
+                self._errors += 1
+            for _, future in batch:
+                future.set_exception(e)
+        finally:
+            elapsed = time.time() - start_time
+            with self._stats_lock:
+                self._batches += 1
+                self._items += len(items)
+                self._max_batch_seen = max(self._max_batch_seen, len(items))
+                self._total_process_time += elapsed
+                self._total_wait_time += sum(
+                    start_time - future.submitted_at for _, future in batch
+                )
+
+    # --- 공개 API ---
+
+    def submit(self, item: T) -> Future:
+        """입력을 대기열에 추가하고 결과 Future 반환"""
+        if self._stopped:
+            raise RuntimeError(f"{self.name} 디스패처가 종료되었습니다.")
+        self._ensure_worker()
+        future: Future = Future()
+        future.submitted_at = time.time()
+        self._queue.put((item, future))
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            self._queue_depth_sum += depth
+            self._max_queue_depth = max(self._max_queue_depth, depth)
+        return future
+
+    def submit_many(self, items: List[T]) -> List[Future]:
+        """여러 입력을 대기열에 추가 (다른 요청의 입력과 함께 배치될 수 있음)"""
+        return [self.submit(item) for item in items]
+
+    def call(self, item: T, timeout: Optional[float] = None) -> R:
+        """동기 호출 (결과가 나올 때까지 대기)"""
+        return self.submit(item).result(timeout=timeout)
+
+    def call_many(self, items: List[T], timeout: Optional[float] = None) -> List[R]:
+        """여러 입력의 결과를 입력 순서대로 반환 (요청별 결과 슬라이스)"""
+        futures = self.submit_many(items)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        results = []
+        for future in futures:
+            remaining = max(0.0, deadline - time.monotonic()) if deadline is not None else None
+            results.append(future.result(timeout=remaining))
+        return results
+
+    async def call_async(self, item: T) -> R:
+        """이벤트 루프를 막지 않는 비동기 호출"""
+        return await asyncio.wrap_future(self.submit(item))
+
+    def queue_depth(self) -> int:
+        """현재 대기 중인 요청 수"""
+        return self._queue.qsize()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """배칭 통계 반환"""
+        with self._stats_lock:
+            return {
+                "name": self.name,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "batches": self._batches,
+                "items": self._items,
+                "errors": self._errors,
+                "avg_batch_size": round(self._items / self._batches, 2) if self._batches else 0.0,
+                "max_batch_seen": self._max_batch_seen,
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self._max_queue_depth,
+                "avg_queue_depth_at_submit": round(self._queue_depth_sum / self._items, 2) if self._items else 0.0,
+                "avg_process_ms": round(self._total_process_time / self._batches * 1000, 2) if self._batches else 0.0,
+                "avg_queue_wait_ms": round(self._total_wait_time / self._items * 1000, 2) if self._items else 0.0,
+            }
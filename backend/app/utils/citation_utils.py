@@ -0,0 +1,109 @@
+"""
+인용 감지 모듈
+- 요청마다 상위 문서의 고정 길이 shingle(문자 n-gram) 해시 인덱스를 한 번 생성
+- 스트리밍 중 답변 텍스트를 증분으로 입력받아 새로 생긴 위치만 조회
+- 키워드 일치율 기준도 증분으로 누적 (shingle이 일치하지 않은 문서용)
+- 생성이 끝나는 시점에 인용 여부가 이미 계산되어 있음
+"""
+
+import re
+from typing import Dict, List, Set
+
+# 기본 인용 감지 설정
+DEFAULT_SHINGLE_SIZE = 40
+DEFAULT_SHINGLE_STEP = 10
+DEFAULT_MIN_SOURCE_LENGTH = 50
+DEFAULT_KEYWORD_RATIO = 0.4
+DEFAULT_KEYWORD_MIN_LENGTH = 3
+DEFAULT_MAX_KEYWORDS = 20
+
+_WORD_PATTERN = re.compile(r'\b[가-힣a-zA-Z0-9]+\b')
+
+
+def extract_keywords(text: str, min_length: int = DEFAULT_KEYWORD_MIN_LENGTH, max_keywords: int = DEFAULT_MAX_KEYWORDS) -> List[str]:
+    """인용 감지용 키워드 추출 (등장 순서대로 중복 제거)"""
+    if not text or not isinstance(text, str):
+        return []
+    words = [w for w in _WORD_PATTERN.findall(text) if len(w) >= min_length]
+    return list(dict.fromkeys(words))[:max_keywords]
+
+
+class CitationIndex:
+    """
+    소스 문서 shingle 인덱스와 답변 스트림 증분 매칭
+
+    소스 문서에서 step 간격으로 뽑은 shingle_size 길이 조각을 해시 테이블에 넣고,
+    답변의 모든 위치에서 같은 길이 조각을 조회합니다 ("조각 in 답변" 검사와 동일한 결과).
+    """
+
+    def __init__(
+        self,
+        sources: List[str],
+        shingle_size: int = DEFAULT_SHINGLE_SIZE,
+        step: int = DEFAULT_SHINGLE_STEP,
+        keyword_ratio: float = DEFAULT_KEYWORD_RATIO,
+        min_source_length: int = DEFAULT_MIN_SOURCE_LENGTH,
+    ):
+        self.num_sources = len(sources)
+        self.shingle_size = max(1, shingle_size)
+        self.keyword_ratio = keyword_ratio
+
+        # shingle -> 해당 shingle을 가진 소스 번호
+        self._shingles: Dict[str, Set[int]] = {}
+        for source_id, text in enumerate(sources):
+            text = text or ""
+            if len(text) <= min_source_length:
+                continue
+            for start in range(0, len(text) - self.shingle_size, step):
+                self._shingles.setdefault(text[start:start + self.shingle_size], set()).add(source_id)
+
+        # 키워드 -> 해당 키워드를 가진 소스 번호, 소스별 키워드 수
+        self._keyword_sources: Dict[str, Set[int]] = {}
+        self._keyword_totals: List[int] = []
+        for source_id, text in enumerate(sources):
+            keywords = extract_keywords(text or "")
+            self._keyword_totals.append(len(keywords))
+            for keyword in keywords:
+                self._keyword_sources.setdefault(keyword, set()).add(source_id)
+        self._max_keyword_length = max((len(k) for k in self._keyword_sources), default=0)
+
+        self._text = ""
+        self._next_start = 0  # 아직 조회하지 않은 shingle 시작 위치
+        self._shingle_cited: Set[int] = set()
+        self._keyword_matches: List[int] = [0] * self.num_sources
+        self._pending_keywords: Set[str] = set(self._keyword_sources)
+
+    def feed(self, text: str) -> None:
+        """스트리밍된 답변 조각 추가 (새로 완성된 위치만 조회)"""
+        if not text:
+            return
+        previous_length = len(self._text)
+        self._text += text
+
+        # 1. shingle 조회
+        if self._shingles:
+            last_start = len(self._text) - self.shingle_size
+            for start in range(self._next_start, last_start + 1):
+                sources = self._shingles.get(self._text[start:start + self.shingle_size])
+                if sources:
+                    self._shingle_cited.update(sources)
+            self._next_start = max(self._next_start, last_start + 1)
+
+        # 2. 키워드 조회 (이전 텍스트와 걸치는 부분까지 포함한 새 영역에서만 검색)
+        if self._pending_keywords:
+            window = self._text[max(0, previous_length - self._max_keyword_length + 1):]
+            found = [keyword for keyword in self._pending_keywords if keyword in window]
+            for keyword in found:
+                self._pending_keywords.discard(keyword)
+                for source_id in self._keyword_sources[keyword]:
+                    self._keyword_matches[source_id] += 1
+
+    def is_cited(self, source_id: int) -> bool:
+        if source_id in self._shingle_cited:
+            return True
+        total = self._keyword_totals[source_id] if source_id < len(self._keyword_totals) else 0
+        return bool(total) and self._keyword_matches[source_id] / total > self.keyword_ratio
+
+    def cited_flags(self) -> List[bool]:
+        """소스 순서대로 인용 여부 반환"""
+        return [self.is_cited(source_id) for source_id in range(self.num_sources)]
@@ -0,0 +1,99 @@
+"""
+LLM 컨텍스트 패킹 모듈
+- 인덱싱 시 저장한 청크별 LLM 토큰 수(token_count)를 사용하여 토큰 예산 내로 문서 선택
+- 토큰 수가 없는 문서(이전에 인덱싱된 청크)만 토크나이저로 계산
+- 리랭킹 순서를 유지하며, 예산을 넘는 문서는 건너뛰고 다음 문서를 시도
+"""
+
+from typing import Any, Callable, List, Optional, Tuple
+
+from langchain.schema import Document
+
+# 기본 패킹 설정
+DEFAULT_CONTEXT_TOKEN_BUDGET = 3500
+DEFAULT_PER_DOC_OVERHEAD = 8  # "문서 N: " 접두어와 문서 간 구분자에 해당하는 토큰 수 (근사)
+TOKEN_COUNT_FIELD = "token_count"
+
+
+def make_token_counter(tokenizer: Any) -> Optional[Callable[[List[str]], List[int]]]:
+    """LLM 토크나이저로 텍스트 목록의 토큰 수를 계산하는 함수 생성"""
+    if tokenizer is None:
+        return None
+
+    def count_tokens(texts: List[str]) -> List[int]:
+        if not texts:
+            return []
+        encoded = tokenizer(list(texts), add_special_tokens=False)
+        return [len(ids) for ids in encoded["input_ids"]]
+
+    return count_tokens
+
+
+def get_token_count(doc: Document, token_counter: Optional[Callable[[List[str]], List[int]]] = None) -> Optional[int]:
+    """문서의 저장된 토큰 수 반환 (없으면 token_counter로 계산 후 메타데이터에 기록)"""
+    stored = doc.metadata.get(TOKEN_COUNT_FIELD)
+    if isinstance(stored, (int, float)) and stored > 0:
+        return int(stored)
+    if token_counter is None:
+        return None
+    try:
+        count = token_counter([doc.page_content])[0]
+    except Exception as e:
+        print(f"토큰 수 계산 실패: {e}")
+        return None
+    doc.metadata[TOKEN_COUNT_FIELD] = count
+    return count
+
+
+def pack_documents(
+    docs: List[Document],
+    max_tokens: int = DEFAULT_CONTEXT_TOKEN_BUDGET,
+    max_docs: Optional[int] = None,
+    token_counter: Optional[Callable[[List[str]], List[int]]] = None,
+    per_doc_overhead: int = DEFAULT_PER_DOC_OVERHEAD,
+) -> Tuple[List[Document], int]:
+    """
+    토큰 예산 내에서 리랭킹 순서대로 문서를 선택
+
+    Args:
+        docs: 리랭킹 순서로 정렬된 문서
+        max_tokens: 문서 컨텍스트 전체 토큰 예산
+        max_docs: 최대 문서 수 (None이면 제한 없음)
+        token_counter: token_count가 없는 문서에 사용할 토큰 수 계산 함수
+        per_doc_overhead: 문서마다 더해지는 서식 토큰 수
+
+    Returns:
+        (선택된 문서 목록, 사용한 토큰 수)
+    """
+    # token_count가 없는 문서는 한 번의 토크나이저 호출로 일괄 계산
+    missing = [
+        doc for doc in docs
+        if doc.page_content and not doc.metadata.get(TOKEN_COUNT_FIELD)
+    ]
+    if missing and token_counter is not None:
+        try:
+            for doc, count in zip(missing, token_counter([doc.page_content for doc in missing])):
+                doc.metadata[TOKEN_COUNT_FIELD] = count
+        except Exception as e:
+            print(f"토큰 수 일괄 계산 실패 (문자 수 근사치 사용): {e}")
+
+    selected: List[Document] = []
+    used_tokens = 0
+    for doc in docs:
+        if max_docs is not None and len(selected) >= max_docs:
+            break
+        if not doc.page_content:
+            continue
+
+        count = get_token_count(doc)
+        if count is None:
+            # 토크나이저도 없는 경우에만 문자 수 기반 근사치 사용
+            count = int(len(doc.page_content) / 3) + 1
+        cost = count + per_doc_overhead
+        if used_tokens + cost > max_tokens:
+            continue
+
+        selected.append(doc)
+        used_tokens += cost
+
+    return selected, used_tokens
@@ -0,0 +1,527 @@
+"""
+LLM 연속 배칭(continuous batching) 추론 엔진
+- 동시에 진행 중인 여러 생성 요청을 하나의 디코딩 배치로 병합
+- 새 요청은 디코딩 스텝 사이에 합류 (개별 prefill 후 KV 캐시를 왼쪽 패딩하여 병합)
+- 종료된 시퀀스는 배치에서 즉시 제거 (index_select), 나머지는 계속 디코딩
+- 요청별 스트리머(TextIteratorStreamer 등)에 put/end로 토큰 전달
+"""
+
+import time
+import threading
+import traceback
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+import torch
+from transformers import (
+    LogitsProcessorList,
+    RepetitionPenaltyLogitsProcessor,
+    TemperatureLogitsWarper,
+    TopKLogitsWarper,
+    TopPLogitsWarper,
+)
+
+try:
+    from transformers import DynamicCache
+except ImportError:  # 구버전 transformers
+    DynamicCache = None
+
+# 기본 엔진 설정
+DEFAULT_MAX_BATCH_SIZE = 8
+DEFAULT_MAX_PREFILLS_PER_STEP = 2  # 디코딩 스텝 사이에 합류시킬 최대 요청 수
+
+LegacyCache = Tuple[Tuple[torch.Tensor, torch.Tensor], ...]
+
+
+def build_logits_processor(
+    generation_config: Any,
+    do_sample: bool,
+    temperature: float,
+    top_k: Optional[int] = None,
+    top_p: Optional[float] = None,
+    repetition_penalty: Optional[float] = None,
+) -> LogitsProcessorList:
+    """
+    model.generate()와 같은 순서의 로짓 처리기 구성
+    - 요청 값이 없으면 모델 generation_config 기본값(Qwen2.5: top_p/top_k/repetition_penalty) 사용
+    - 반복 패널티는 항상, temperature/top_k/top_p는 샘플링할 때만 적용
+    """
+    def config_value(value: Any, name: str) -> Any:
+        return value if value is not None else getattr(generation_config, name, None)
+
+    top_k = config_value(top_k, "top_k")
+    top_p = config_value(top_p, "top_p")
+    repetition_penalty = config_value(repetition_penalty, "repetition_penalty")
+
+    processors = LogitsProcessorList()
+    if repetition_penalty is not None and repetition_penalty != 1.0:
+        processors.append(RepetitionPenaltyLogitsProcessor(penalty=repetition_penalty))
+    if do_sample:
+        if temperature != 1.0:
+            processors.append(TemperatureLogitsWarper(temperature))
+        if top_k is not None and top_k > 0:
+            processors.append(TopKLogitsWarper(top_k=top_k, min_tokens_to_keep=1))
+        if top_p is not None and top_p < 1.0:
+            processors.append(TopPLogitsWarper(top_p=top_p, min_tokens_to_keep=1))
+    return processors
+
+
+class BatchedGenerationRequest:
+    """연속 배칭 엔진에 제출된 생성 요청 하나 (스레드 핸들과 같은 is_alive/join 제공)"""
+
+    def __init__(
+        self,
+        request_id: int,
+        input_ids: torch.Tensor,
+        max_new_tokens: int,
+        temperature: float,
+        do_sample: bool,
+        streamer: Any = None,
+        on_finish: Optional[Callable[[], None]] = None,
+        cancel_event: Optional[threading.Event] = None,
+        logits_processor: Optional[LogitsProcessorList] = None,
+    ):
+        self.id = request_id
+        self.input_ids = input_ids
+        self.max_new_tokens = max_new_tokens
+        self.temperature = temperature
+        self.do_sample = do_sample and temperature > 0
+        self.logits_processor = logits_processor
+        self.streamer = streamer
+        self.on_finish = on_finish
+        # 설정되면 다음 디코딩 스텝에서 배치에서 제거
+        self.cancel_event = cancel_event
+
+        self.generated: List[int] = []
+        self.finish_reason: Optional[str] = None
+        self.error: Optional[BaseException] = None
+        self.submitted_at = time.time()
+        self.first_token_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._done = threading.Event()
+
+    # --- 스레드 호환 인터페이스 ---
+
+    def is_alive(self) -> bool:
+        return not self._done.is_set()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        self._done.wait(timeout)
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+    @property
+    def prompt_length(self) -> int:
+        return int(self.input_ids.shape[-1])
+
+    def sequence_ids(self, device: Any) -> torch.Tensor:
+        """프롬프트 + 지금까지 생성한 토큰 [1, L] (반복 패널티 계산용)"""
+        input_ids = self.input_ids.to(device)
+        if not self.generated:
+            return input_ids
+        generated = torch.tensor([self.generated], dtype=input_ids.dtype, device=device)
+        return torch.cat([input_ids, generated], dim=-1)
+
+
+class ContinuousBatchingEngine:
+    """
+    단일 모델 인스턴스에서 여러 요청을 한 배치로 디코딩하는 엔진
+
+    배치 상태:
+        - past: 레이어별 (key, value) 텐서 [B, heads, L, dim] (왼쪽 패딩)
+        - attention_mask: [B, L] (패딩 위치 0)
+        - active: 배치 행 순서와 같은 요청 목록
+    """
+
+    def __init__(
+        self,
+        model: Any,
+        tokenizer: Any,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        eos_token_ids: Optional[Sequence[int]] = None,
+        max_prefills_per_step: int = DEFAULT_MAX_PREFILLS_PER_STEP,
+    ):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_prefills_per_step = max(1, max_prefills_per_step)
+        self.device = getattr(model, "device", torch.device("cpu"))
+
+        if eos_token_ids is None:
+            eos_token_ids = [tokenizer.eos_token_id]
+            im_end_id = tokenizer.convert_tokens_to_ids("<|im_end|>") if hasattr(tokenizer, "convert_tokens_to_ids") else None
+            if isinstance(im_end_id, int) and im_end_id != getattr(tokenizer, "unk_token_id", None):
+                eos_token_ids.append(im_end_id)
+        self.eos_token_ids = {int(t) for t in eos_token_ids if t is not None}
+
+        self._pending: Deque[BatchedGenerationRequest] = deque()
+        self._condition = threading.Condition()
+        self._next_id = 0
+        self._stopped = False
+        self._worker: Optional[threading.Thread] = None
+
+        # 배치 상태 (워커 스레드에서만 접근)
+        self._active: List[BatchedGenerationRequest] = []
+        self._past: Optional[LegacyCache] = None
+        self._attention_mask: Optional[torch.Tensor] = None
+        self._last_tokens: Optional[torch.Tensor] = None
+
+        # 통계
+        self._decode_steps = 0
+        self._generated_tokens = 0
+        self._completed = 0
+        self._batch_size_sum = 0
+        self._decode_time = 0.0
+        self._prefill_time = 0.0
+
+    # --- 공개 API ---
+
+    def submit(
+        self,
+        input_ids: torch.Tensor,
+        max_new_tokens: int = 512,
+        temperature: float = 0.0,
+        do_sample: bool = False,
+        streamer: Any = None,
+        on_finish: Optional[Callable[[], None]] = None,
+        cancel_event: Optional[threading.Event] = None,
+        top_k: Optional[int] = None,
+        top_p: Optional[float] = None,
+        repetition_penalty: Optional[float] = None,
+    ) -> BatchedGenerationRequest:
+        """
+        생성 요청 제출 (다음 디코딩 스텝 사이에 배치에 합류)
+
+        top_k/top_p/repetition_penalty가 없으면 model.generate()처럼 모델 generation_config 기본값을 사용합니다.
+        """
+        if self._stopped:
+            raise RuntimeError("연속 배칭 엔진이 종료되었습니다.")
+        if input_ids.dim() == 1:
+            input_ids = input_ids.unsqueeze(0)
+        logits_processor = build_logits_processor(
+            getattr(self.model, "generation_config", None),
+            do_sample and temperature > 0,
+            temperature,
+            top_k=top_k,
+            top_p=top_p,
+            repetition_penalty=repetition_penalty,
+        )
+        with self._condition:
+            self._next_id += 1
+            request = BatchedGenerationRequest(
+                self._next_id, input_ids, max_new_tokens, temperature, do_sample, streamer, on_finish, cancel_event,
+                logits_processor=logits_processor,
+            )
+            self._pending.append(request)
+            self._condition.notify()
+        self._ensure_worker()
+        return request
+
+    def submit_generation_kwargs(self, generation_kwargs: Dict[str, Any], on_finish: Optional[Callable[[], None]] = None) -> BatchedGenerationRequest:
+        """model.generate()용 kwargs를 그대로 받아 제출 (단일 프롬프트만 지원)"""
+        # CancellationStoppingCriteria의 취소 플래그를 엔진 요청에 연결
+        cancel_event = None
+        for criteria in generation_kwargs.get("stopping_criteria") or []:
+            cancel_event = getattr(criteria, "cancel_event", None) or cancel_event
+        return self.submit(
+            generation_kwargs["input_ids"],
+            max_new_tokens=generation_kwargs.get("max_new_tokens", 512),
+            temperature=generation_kwargs.get("temperature") or 0.0,
+            do_sample=bool(generation_kwargs.get("do_sample", False)),
+            streamer=generation_kwargs.get("streamer"),
+            on_finish=on_finish,
+            cancel_event=cancel_event,
+            top_k=generation_kwargs.get("top_k"),
+            top_p=generation_kwargs.get("top_p"),
+            repetition_penalty=generation_kwargs.get("repetition_penalty"),
+        )
+
+    def shutdown(self) -> None:
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._condition:
+            pending = len(self._pending)
+        return {
+            "max_batch_size": self.max_batch_size,
+            "active": len(self._active),
+            "pending": pending,
+            "decode_steps": self._decode_steps,
+            "generated_tokens": self._generated_tokens,
+            "completed": self._completed,
+            "avg_batch_size": round(self._batch_size_sum / self._decode_steps, 2) if self._decode_steps else 0.0,
+            "decode_tokens_per_sec": round(self._generated_tokens / self._decode_time, 2) if self._decode_time else 0.0,
+            "prefill_time": round(self._prefill_time, 3),
+        }
+
+    # --- 워커 루프 ---
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._condition:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="llm-continuous-batching", daemon=True)
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._pending and not self._active and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    break
+                # 합류 전에 취소된 요청은 prefill 없이 종료
+                cancelled_pending = [request for request in self._pending if request.cancelled]
+                for request in cancelled_pending:
+                    self._pending.remove(request)
+                joining = []
+                while self._pending and len(self._active) + len(joining) < self.max_batch_size \
+                        and len(joining) < self.max_prefills_per_step:
+                    joining.append(self._pending.popleft())
+
+            for request in cancelled_pending:
+                self._finish(request, "cancelled")
+
+            # 취소된 활성 시퀀스는 다음 디코딩 스텝 전에 배치에서 제거
+            if any(request.cancelled for request in self._active):
+                for request in self._active:
+                    if request.cancelled and request.finish_reason is None:
+                        request.finish_reason = "cancelled"
+                self._retire_finished()
+
+            with torch.inference_mode():
+                for request in joining:
+                    try:
+                        self._prefill_and_join(request)
+                    except Exception as e:
+                        # prefill 실패는 해당 요청만 종료 (기존 배치는 영향 없음)
+                        print(f"연속 배칭 prefill 중 오류 발생 (요청 {request.id}): {e}")
+                        traceback.print_exc()
+                        request.error = e
+                        if request in self._active:
+                            # 이미 배치에 병합된 경우 배치 행도 함께 제거
+                            request.finish_reason = "error"
+                            self._retire_finished()
+                        else:
+                            self._finish(request, "error")
+
+            try:
+                with torch.inference_mode():
+                    if self._active:
+                        self._decode_step()
+            except Exception as e:
+                print(f"연속 배칭 디코딩 중 오류 발생 (활성 요청 {len(self._active)}개 종료): {e}")
+                traceback.print_exc()
+                for request in self._active:
+                    request.error = e
+                    self._finish(request, "error")
+                self._reset_batch()
+
+        # 종료 시 남은 요청 정리
+        for request in list(self._active) + list(self._pending):
+            self._finish(request, "shutdown")
+        self._reset_batch()
+
+    # --- prefill / 합류 ---
+
+    def _prefill_and_join(self, request: BatchedGenerationRequest) -> None:
+        start_time = time.time()
+        input_ids = request.input_ids.to(self.device)
+        attention_mask = torch.ones_like(input_ids)
+
+        if request.streamer is not None:
+            # TextIteratorStreamer(skip_prompt=True)는 첫 put을 프롬프트로 간주
+            request.streamer.put(input_ids.cpu())
+
+        outputs = self.model(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            past_key_values=DynamicCache() if DynamicCache is not None else None,
+            use_cache=True,
+        )
+        past = self._to_legacy(outputs.past_key_values)
+        next_token = self._sample(outputs.logits[:, -1, :], [request])
+        self._prefill_time += time.time() - start_time
+
+        self._merge_into_batch(request, past, attention_mask, next_token)
+        self._emit(request, int(next_token[0]))
+        self._retire_finished()
+
+    def _merge_into_batch(self, request: BatchedGenerationRequest, past: LegacyCache, attention_mask: torch.Tensor, next_token: torch.Tensor) -> None:
+        """새 시퀀스의 KV 캐시를 왼쪽 패딩으로 길이를 맞춰 기존 배치에 병합"""
+        if self._past is None:
+            self._past = past
+            self._attention_mask = attention_mask
+            self._last_tokens = next_token.view(1, 1)
+            self._active = [request]
+            return
+
+        batch_len = self._attention_mask.shape[1]
+        new_len = attention_mask.shape[1]
+        target_len = max(batch_len, new_len)
+
+        merged = []
+        for (batch_k, batch_v), (new_k, new_v) in zip(self._past, past):
+            merged.append((
+                torch.cat([self._left_pad(batch_k, target_len), self._left_pad(new_k, target_len)], dim=0),
+                torch.cat([self._left_pad(batch_v, target_len), self._left_pad(new_v, target_len)], dim=0),
+            ))
+        self._past = tuple(merged)
+        self._attention_mask = torch.cat(
+            [self._left_pad_mask(self._attention_mask, target_len), self._left_pad_mask(attention_mask, target_len)],
+            dim=0,
+        )
+        self._last_tokens = torch.cat([self._last_tokens, next_token.view(1, 1)], dim=0)
+        self._active.append(request)
+
+    @staticmethod
+    def _left_pad(tensor: torch.Tensor, target_len: int) -> torch.Tensor:
+        pad = target_len - tensor.shape[2]
+        if pad <= 0:
+            return tensor
+        zeros = tensor.new_zeros(tensor.shape[0], tensor.shape[1], pad, tensor.shape[3])
+        return torch.cat([zeros, tensor], dim=2)
+
+    @staticmethod
+    def _left_pad_mask(mask: torch.Tensor, target_len: int) -> torch.Tensor:
+        pad = target_len - mask.shape[1]
+        if pad <= 0:
+            return mask
+        return torch.cat([mask.new_zeros(mask.shape[0], pad), mask], dim=1)
+
+    # --- 디코딩 ---
+
+    def _decode_step(self) -> None:
+        start_time = time.time()
+        # 각 시퀀스의 새 토큰 위치 = 해당 시퀀스의 실제 토큰 수
+        position_ids = self._attention_mask.sum(dim=1, keepdim=True)
+        attention_mask = torch.cat(
+            [self._attention_mask, self._attention_mask.new_ones(self._attention_mask.shape[0], 1)], dim=1
+        )
+        outputs = self.model(
+            input_ids=self._last_tokens,
+            attention_mask=attention_mask,
+            position_ids=position_ids,
+            past_key_values=self._from_legacy(self._past),
+            use_cache=True,
+        )
+        self._past = self._to_legacy(outputs.past_key_values)
+        self._attention_mask = attention_mask
+        next_tokens = self._sample(outputs.logits[:, -1, :], self._active)
+        self._last_tokens = next_tokens.view(-1, 1)
+
+        for request, token in zip(self._active, next_tokens.tolist()):
+            self._emit(request, int(token))
+
+        self._decode_steps += 1
+        self._batch_size_sum += len(self._active)
+        self._decode_time += time.time() - start_time
+        self._retire_finished()
+
+    def _sample(self, logits: torch.Tensor, requests: List[BatchedGenerationRequest]) -> torch.Tensor:
+        """
+        요청별 로짓 처리기(반복 패널티, temperature/top_k/top_p) 적용 후 다음 토큰 선택
+
+        generate()와 같은 출력이 나오도록 행마다 해당 요청의 시퀀스로 처리기를 적용합니다.
+        """
+        next_tokens = torch.argmax(logits, dim=-1)
+        for row, request in enumerate(requests):
+            if not request.logits_processor and not request.do_sample:
+                continue
+            scores = logits[row:row + 1].float()
+            if request.logits_processor:
+                scores = request.logits_processor(request.sequence_ids(scores.device), scores)
+            if request.do_sample:
+                probs = torch.softmax(scores, dim=-1)
+                next_tokens[row] = torch.multinomial(probs, num_samples=1)[0, 0]
+            else:
+                next_tokens[row] = torch.argmax(scores, dim=-1)[0]
+        return next_tokens
+
+    def _emit(self, request: BatchedGenerationRequest, token: int) -> None:
+        """생성 토큰 기록 및 스트리머 전달, 종료 조건 확인"""
+        if request.first_token_at is None:
+            request.first_token_at = time.time()
+        self._generated_tokens += 1
+        if token in self.eos_token_ids:
+            request.finish_reason = "eos"
+            return
+        request.generated.append(token)
+        if request.streamer is not None:
+            request.streamer.put(torch.tensor([token]))
+        if len(request.generated) >= request.max_new_tokens:
+            request.finish_reason = "length"
+
+    # --- 배치 이탈 ---
+
+    def _retire_finished(self) -> None:
+        """종료된 시퀀스를 배치에서 제거하고 남은 시퀀스만 index_select"""
+        keep = [row for row, request in enumerate(self._active) if request.finish_reason is None]
+        if len(keep) == len(self._active):
+            return
+
+        for row, request in enumerate(self._active):
+            if request.finish_reason is not None:
+                self._finish(request, request.finish_reason)
+
+        if not keep:
+            self._reset_batch()
+            return
+
+        index = torch.tensor(keep, device=self._attention_mask.device)
+        mask = self._attention_mask.index_select(0, index)
+        # 남은 시퀀스 모두가 패딩인 앞쪽 열은 잘라냄
+        real_columns = mask.sum(dim=0).nonzero()
+        start = int(real_columns[0]) if real_columns.numel() else 0
+        self._attention_mask = mask[:, start:]
+        self._past = tuple(
+            (k.index_select(0, index.to(k.device))[:, :, start:, :], v.index_select(0, index.to(v.device))[:, :, start:, :])
+            for k, v in self._past
+        )
+        self._last_tokens = self._last_tokens.index_select(0, index.to(self._last_tokens.device))
+        self._active = [self._active[row] for row in keep]
+
+    def _finish(self, request: BatchedGenerationRequest, reason: str) -> None:
+        if request.finished_at is not None:
+            return
+        request.finish_reason = request.finish_reason or reason
+        request.finished_at = time.time()
+        self._completed += 1
+        if request.streamer is not None:
+            try:
+                request.streamer.end()
+            except Exception as e:
+                print(f"스트리머 종료 중 오류 (요청 {request.id}): {e}")
+        if request.on_finish is not None:
+            try:
+                request.on_finish()
+            except Exception as e:
+                print(f"생성 종료 콜백 오류 (요청 {request.id}): {e}")
+        request._done.set()
+
+    def _reset_batch(self) -> None:
+        self._active = []
+        self._past = None
+        self._attention_mask = None
+        self._last_tokens = None
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    # --- 캐시 형식 변환 ---
+
+    @staticmethod
+    def _to_legacy(past_key_values: Any) -> LegacyCache:
+        if hasattr(past_key_values, "to_legacy_cache"):
+            return past_key_values.to_legacy_cache()
+        return tuple(past_key_values)
+
+    @staticmethod
+    def _from_legacy(past: LegacyCache) -> Any:
+        if DynamicCache is not None:
+            return DynamicCache.from_legacy_cache(past)
+        return past
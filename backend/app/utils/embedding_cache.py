@@ -0,0 +1,199 @@
+"""
+쿼리 임베딩 캐시 모듈
+- 1단계: 프로세스 내 float32 벡터 LRU 캐시
+- 2단계: Redis 공유 캐시 (float32 바이너리로 저장, 워커/프로세스 간 공유)
+- 키: 모델 이름 + 정규화된 쿼리 텍스트
+"""
+
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from redis import Redis
+
+from app.utils.cache_utils import (
+    REDIS_HOST,
+    REDIS_PORT,
+    REDIS_DB,
+    REDIS_PASSWORD,
+    REDIS_TIMEOUT,
+    CACHE_TTL_FREQUENT,
+)
+from app.utils.result_cache import normalize_query
+
+# 기본 캐시 설정
+DEFAULT_LOCAL_MAX_ENTRIES = 4096
+DEFAULT_REDIS_TTL = CACHE_TTL_FREQUENT  # 2시간
+REDIS_RETRY_INTERVAL = 30  # Redis 연결 실패 후 재시도 간격 (초)
+EMBEDDING_KEY_PREFIX = "emb"
+
+
+class QueryEmbeddingCache:
+    """
+    2단계(프로세스 내 LRU + Redis) 쿼리 임베딩 캐시
+
+    Redis 계층은 벡터를 JSON이 아닌 float32 바이트열로 저장하므로
+    RedisCache(decode_responses=True)와 별도의 바이너리 클라이언트를 사용합니다.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        local_max_entries: int = DEFAULT_LOCAL_MAX_ENTRIES,
+        redis_ttl: int = DEFAULT_REDIS_TTL,
+        use_redis: bool = True,
+    ):
+        # 모델 경로의 마지막 부분을 키에 사용 (모델 교체 시 키 충돌 방지)
+        self.model_tag = os.path.basename(os.path.normpath(model_name)) or model_name
+        self.local_max_entries = local_max_entries
+        self.redis_ttl = redis_ttl
+        self.use_redis = use_redis
+
+        self._local: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._redis_client: Optional[Redis] = None
+        self._redis_retry_at = 0.0
+
+        # 통계
+        self._local_hits = 0
+        self._redis_hits = 0
+        self._misses = 0
+
+    def make_key(self, text: str) -> str:
+        """모델 이름 + 정규화 텍스트 기반 캐시 키 생성"""
+        digest = hashlib.md5(normalize_query(text).encode("utf-8")).hexdigest()
+        return f"{EMBEDDING_KEY_PREFIX}:{self.model_tag}:{digest}"
+
+    # --- Redis 계층 ---
+
+    def _get_redis(self) -> Optional[Redis]:
+        """바이너리 Redis 클라이언트 반환 (연결 실패 시 일정 시간 동안 재시도하지 않음)"""
+        if not self.use_redis:
+            return None
+        if self._redis_client is not None:
+            return self._redis_client
+        if time.time() < self._redis_retry_at:
+            return None
+
+        try:
+            client = Redis(
+                host=REDIS_HOST,
+                port=REDIS_PORT,
+                db=REDIS_DB,
+                password=REDIS_PASSWORD,
+                socket_timeout=REDIS_TIMEOUT,
+                decode_responses=False,  # 벡터는 바이트열 그대로 저장
+            )
+            client.ping()
+            self._redis_client = client
+            print(f"임베딩 캐시 Redis 연결 성공 ({REDIS_HOST}:{REDIS_PORT})")
+        except Exception as e:
+            print(f"임베딩 캐시 Redis 연결 실패 (로컬 캐시만 사용): {e}")
+            self._redis_retry_at = time.time() + REDIS_RETRY_INTERVAL
+        return self._redis_client
+
+    def _redis_get(self, key: str) -> Optional[np.ndarray]:
+        client = self._get_redis()
+        if client is None:
+            return None
+        try:
+            data = client.get(key)
+            if data:
+                return np.frombuffer(data, dtype=np.float32)
+        except Exception as e:
+            print(f"임베딩 캐시 Redis 조회 오류: {e}")
+            self._redis_client = None
+            self._redis_retry_at = time.time() + REDIS_RETRY_INTERVAL
+        return None
+
+    def _redis_set(self, key: str, vector: np.ndarray) -> None:
+        client = self._get_redis()
+        if client is None:
+            return
+        try:
+            client.setex(key, self.redis_ttl, vector.tobytes())
+        except Exception as e:
+            print(f"임베딩 캐시 Redis 저장 오류: {e}")
+            self._redis_client = None
+            self._redis_retry_at = time.time() + REDIS_RETRY_INTERVAL
+
+    # --- 로컬 계층 ---
+
+    def _local_get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._local.get(key)
+            if vector is not None:
+                self._local.move_to_end(key)
+            return vector
+
+    def _local_set(self, key: str, vector: np.ndarray) -> None:
+        with self._lock:
+            self._local[key] = vector
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_max_entries:
+                self._local.popitem(last=False)
+
+    # --- 공개 API ---
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        """로컬 → Redis 순으로 조회 (Redis 적중 시 로컬 캐시에 승격)"""
+        key = self.make_key(text)
+
+        vector = self._local_get(key)
+        if vector is not None:
+            self._local_hits += 1
+            return vector
+
+        vector = self._redis_get(key)
+        if vector is not None:
+            self._redis_hits += 1
+            self._local_set(key, vector)
+            return vector
+
+        self._misses += 1
+        return None
+
+    def set(self, text: str, embedding: Any) -> None:
+        """임베딩을 float32로 변환하여 두 계층에 저장"""
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        # 임베딩 실패 시 반환되는 0 벡터는 캐싱하지 않음
+        if vector.size == 0 or not np.any(vector):
+            return
+        key = self.make_key(text)
+        self._local_set(key, vector)
+        self._redis_set(key, vector)
+
+    def get_or_compute(self, text: str, compute_fn: Callable[[str], Any]) -> List[float]:
+        """캐시된 임베딩을 반환하거나, 없으면 계산 후 저장"""
+        vector = self.get(text)
+        if vector is None:
+            embedding = compute_fn(text)
+            self.set(text, embedding)
+            return list(embedding)
+        return vector.tolist()
+
+    def clear_local(self) -> None:
+        """프로세스 내 캐시 비우기"""
+        with self._lock:
+            self._local.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """캐시 적중 통계 반환"""
+        total = self._local_hits + self._redis_hits + self._misses
+        with self._lock:
+            local_entries = len(self._local)
+        return {
+            "model": self.model_tag,
+            "local_entries": local_entries,
+            "local_max_entries": self.local_max_entries,
+            "local_hits": self._local_hits,
+            "redis_hits": self._redis_hits,
+            "misses": self._misses,
+            "hit_rate": round((self._local_hits + self._redis_hits) / total, 4) if total else 0.0,
+            "redis_connected": self._redis_client is not None,
+        }
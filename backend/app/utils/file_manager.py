@@ -1,7 +1,8 @@
 import os
 import json
+import asyncio
 import traceback
-from elasticsearch import Elasticsearch
+from elasticsearch import Elasticsearch, AsyncElasticsearch
 from typing import Dict, List, Any, Optional, Tuple
 import uuid
 import shutil
@@ -83,6 +84,80 @@ def delete_file_from_es(
         traceback.print_exc()
         return False, 0, f"ES 문서 삭제 중 오류: {error_msg}"
 
+async def delete_file_from_es_async(
+    es_client: AsyncElasticsearch, filename: str, index_name: str
+) -> Tuple[bool, int, str]:
+    """
+    AsyncElasticsearch 클라이언트로 특정 파일명에 해당하는 모든 문서를 삭제합니다.
+    (반환 형식은 delete_file_from_es와 동일)
+    """
+    try:
+        query = {
+            "query": {
+                "term": {
+                    "source": filename
+                }
+            }
+        }
+        count_response = await es_client.count(index=index_name, body=query)
+        doc_count = count_response.get("count", 0)
+        
+        if doc_count == 0:
+            return True, 0, f"파일 '{filename}'에 해당하는 문서가 없습니다."
+        
+        delete_response = await es_client.delete_by_query(
+            index=index_name, 
+            body=query,
+            refresh=True  # 즉시 인덱스 갱신
+        )
+        
+        deleted_count = delete_response.get("deleted", 0)
+        return True, deleted_count, f"ES에서 {deleted_count}개 문서 삭제됨"
+    
+    except Exception as e:
+        error_msg = str(e)
+        traceback.print_exc()
+        return False, 0, f"ES 문서 삭제 중 오류: {error_msg}"
+
+def _delete_file_from_disk(result: Dict[str, Any], filename: str, uploads_dir: str) -> None:
+    """저장소에서 파일을 삭제하고 결과 딕셔너리를 갱신합니다."""
+    try:
+        file_path = find_file_by_name(filename, uploads_dir)
+        if file_path and os.path.exists(file_path):
+            os.remove(file_path)
+            result["disk_deleted"] = True
+            print(f"디스크에서 파일 삭제됨: {file_path}")
+        else:
+            result["message"] += f"디스크에서 파일을 찾을 수 없습니다. "
+    except Exception as e:
+        error_msg = str(e)
+        traceback.print_exc()
+        result["message"] += f"디스크 파일 삭제 중 오류: {error_msg} "
+
+def _finalize_delete_result(result: Dict[str, Any], filename: str) -> Dict[str, Any]:
+    """ES/디스크 삭제 결과를 종합하여 상태와 메시지를 설정합니다."""
+    if result["es_deleted"] and result["disk_deleted"]:
+        result["status"] = "success"
+        result["message"] = f"파일 '{filename}'이(가) 완전히 삭제되었습니다."
+    elif result["es_deleted"]:
+        result["status"] = "partial_success"
+        result["message"] = f"파일 '{filename}'의 인덱스는 삭제되었으나 디스크에서 파일을 삭제하지 못했습니다."
+    else:
+        result["status"] = "error"
+        result["message"] = f"파일 '{filename}' 삭제에 실패했습니다. " + result["message"]
+    
+    return result
+
+def _new_delete_result(filename: str) -> Dict[str, Any]:
+    return {
+        "status": "success",
+        "file": filename,
+        "es_deleted": False,
+        "disk_deleted": False,
+        "es_docs_deleted": 0,
+        "message": ""
+    }
+
 def delete_indexed_file(
     es_client: Elasticsearch, 
     filename: str, 
@@ -102,14 +177,7 @@ def delete_indexed_file(
     Returns:
         결과 정보를 담은 딕셔너리
     """
-    result = {
-        "status": "success",
-        "file": filename,
-        "es_deleted": False,
-        "disk_deleted": False,
-        "es_docs_deleted": 0,
-        "message": ""
-    }
+    result = _new_delete_result(filename)
     
     # 1. Elasticsearch에서 삭제
     es_success, deleted_count, es_message = delete_file_from_es(
@@ -120,28 +188,33 @@ def delete_indexed_file(
     result["es_docs_deleted"] = deleted_count
     
     # 2. 파일 시스템에서 삭제
-    try:
-        file_path = find_file_by_name(filename, uploads_dir)
-        if file_path and os.path.exists(file_path):
-            os.remove(file_path)
-            result["disk_deleted"] = True
-            print(f"디스크에서 파일 삭제됨: {file_path}")
-        else:
-            result["message"] += f"디스크에서 파일을 찾을 수 없습니다. "
-    except Exception as e:
-        error_msg = str(e)
-        traceback.print_exc()
-        result["message"] += f"디스크 파일 삭제 중 오류: {error_msg} "
+    _delete_file_from_disk(result, filename, uploads_dir)
     
     # 3. 종합 결과 메시지 생성
-    if result["es_deleted"] and result["disk_deleted"]:
-        result["status"] = "success"
-        result["message"] = f"파일 '{filename}'이(가) 완전히 삭제되었습니다."
-    elif result["es_deleted"]:
-        result["status"] = "partial_success"
-        result["message"] = f"파일 '{filename}'의 인덱스는 삭제되었으나 디스크에서 파일을 삭제하지 못했습니다."
-    else:
-        result["status"] = "error"
-        result["message"] = f"파일 '{filename}' 삭제에 실패했습니다. " + result["message"]
+    return _finalize_delete_result(result, filename)
+
+async def delete_indexed_file_async(
+    es_client: AsyncElasticsearch, 
+    filename: str, 
+    index_name: str,
+    uploads_dir: str = "app/static/uploads"
+) -> Dict[str, Any]:
+    """
+    delete_indexed_file의 비동기 버전 (AsyncElasticsearch 사용)
+    디스크 파일 탐색/삭제는 이벤트 루프를 막지 않도록 스레드에서 실행합니다.
+    """
+    result = _new_delete_result(filename)
+    
+    # 1. Elasticsearch에서 삭제
+    es_success, deleted_count, es_message = await delete_file_from_es_async(
+        es_client, filename, index_name
+    )
     
-    return result 
\ No newline at end of file
+    result["es_deleted"] = es_success
+    result["es_docs_deleted"] = deleted_count
+    
+    # 2. 파일 시스템에서 삭제
+    await asyncio.to_thread(_delete_file_from_disk, result, filename, uploads_dir)
+    
+    # 3. 종합 결과 메시지 생성
+    return _finalize_delete_result(result, filename) 
\ No newline at end of file
@@ -0,0 +1,253 @@
+"""
+LLM 생성 스케줄러 모듈
+- 공유 LLM 모델에 대한 동시 생성 수 제한
+- FIFO 또는 우선순위 대기열
+- 대기열 길이 제한 (가득 차면 즉시 거절)
+- 요청별 대기 시간 측정
+"""
+
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+import traceback
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# 기본 스케줄러 설정
+DEFAULT_MAX_CONCURRENT = 1
+DEFAULT_MAX_QUEUE = 16
+SCHEDULING_POLICIES = ("fifo", "priority")
+
+
+class GenerationQueueFull(Exception):
+    """생성 대기열이 가득 찬 경우"""
+
+
+class GenerationTicket:
+    """생성 요청 하나의 대기/실행 상태"""
+
+    def __init__(self, ticket_id: int, priority: int, label: str = ""):
+        self.id = ticket_id
+        self.priority = priority
+        self.label = label
+        self.enqueued_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.released = False
+        self._waiter: Optional[asyncio.Future] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def queue_wait(self) -> float:
+        """대기열에서 기다린 시간 (초)"""
+        end = self.started_at if self.started_at is not None else time.time()
+        return end - self.enqueued_at
+
+    @property
+    def run_time(self) -> float:
+        """실행 시간 (초)"""
+        if self.started_at is None:
+            return 0.0
+        end = self.finished_at if self.finished_at is not None else time.time()
+        return end - self.started_at
+
+
+class GenerationScheduler:
+    """
+    공유 LLM에 대한 생성 슬롯 관리자
+
+    사용 흐름:
+        ticket = scheduler.enqueue(priority)      # 대기열 가득 차면 GenerationQueueFull
+        await scheduler.wait_for_turn(ticket)     # 슬롯 획득까지 대기
+        scheduler.start_thread(ticket, target, kwargs)  # 종료 시 슬롯 자동 반환
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = DEFAULT_MAX_CONCURRENT,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        policy: str = "fifo",
+    ):
+        if policy not in SCHEDULING_POLICIES:
+            print(f"알 수 없는 스케줄링 정책 '{policy}', fifo 사용")
+            policy = "fifo"
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.policy = policy
+
+        self._lock = threading.Lock()
+        self._waiting: List[Tuple[int, int, GenerationTicket]] = []  # (우선순위, 순번, 티켓) 힙
+        self._running: Dict[int, GenerationTicket] = {}
+        self._counter = itertools.count(1)
+
+        # 통계
+        self._admitted = 0
+        self._rejected = 0
+        self._completed = 0
+        self._cancelled = 0
+        self._total_queue_wait = 0.0
+        self._max_queue_wait = 0.0
+
+    # --- 대기열 관리 ---
+
+    def enqueue(self, priority: int = 0, label: str = "") -> GenerationTicket:
+        """
+        생성 요청 등록 (실행 슬롯이 비어 있으면 바로 실행 상태가 됨)
+
+        Args:
+            priority: 낮을수록 먼저 처리 (priority 정책에서만 사용)
+        """
+        with self._lock:
+            ticket = GenerationTicket(next(self._counter), priority, label)
+            if len(self._running) < self.max_concurrent and not self._waiting:
+                self._mark_running(ticket)
+                return ticket
+
+            if len(self._waiting) >= self.max_queue:
+                self._rejected += 1
+                raise GenerationQueueFull(
+                    f"생성 대기열이 가득 찼습니다 (실행 {len(self._running)}, 대기 {len(self._waiting)})"
+                )
+
+            sort_priority = priority if self.policy == "priority" else 0
+            heapq.heappush(self._waiting, (sort_priority, ticket.id, ticket))
+            return ticket
+
+    def has_capacity(self) -> bool:
+        """새 요청을 받을 수 있는지 여부 (슬롯 또는 대기열 여유)"""
+        with self._lock:
+            return len(self._running) < self.max_concurrent or len(self._waiting) < self.max_queue
+
+    def reject(self) -> None:
+        """has_capacity 확인 단계에서 거절한 요청을 통계에 반영"""
+        with self._lock:
+            self._rejected += 1
+
+    def _mark_running(self, ticket: GenerationTicket) -> None:
+        ticket.started_at = time.time()
+        self._running[ticket.id] = ticket
+        self._admitted += 1
+        wait = ticket.queue_wait
+        self._total_queue_wait += wait
+        self._max_queue_wait = max(self._max_queue_wait, wait)
+        if ticket._waiter is not None and ticket._loop is not None:
+            ticket._loop.call_soon_threadsafe(self._resolve_waiter, ticket._waiter)
+
+    @staticmethod
+    def _resolve_waiter(waiter: asyncio.Future) -> None:
+        if not waiter.done():
+            waiter.set_result(True)
+
+    def _promote_waiting(self) -> None:
+        """빈 슬롯만큼 대기 요청을 실행 상태로 전환 (lock 보유 상태에서 호출)"""
+        while self._waiting and len(self._running) < self.max_concurrent:
+            _, _, ticket = heapq.heappop(self._waiting)
+            self._mark_running(ticket)
+
+    def position(self, ticket: GenerationTicket) -> int:
+        """대기열 내 순서 (0이면 실행 중)"""
+        with self._lock:
+            if ticket.id in self._running:
+                return 0
+            ordered = sorted(self._waiting)
+            for index, (_, _, waiting_ticket) in enumerate(ordered):
+                if waiting_ticket.id == ticket.id:
+                    return index + 1
+            return 0
+
+    async def wait_for_turn(self, ticket: GenerationTicket, timeout: Optional[float] = None) -> bool:
+        """
+        실행 슬롯을 얻을 때까지 대기
+
+        Returns:
+            True: 슬롯 획득 / False: 시간 초과 (티켓은 대기열에서 제거됨)
+        """
+        with self._lock:
+            if ticket.id in self._running:
+                return True
+            ticket._loop = asyncio.get_running_loop()
+            ticket._waiter = ticket._loop.create_future()
+            waiter = ticket._waiter
+
+        try:
+            if timeout is None:
+                await waiter
+            else:
+                await asyncio.wait_for(asyncio.shield(waiter), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            self.cancel(ticket)
+            return ticket.id in self._running
+        except asyncio.CancelledError:
+            self.cancel(ticket)
+            raise
+
+    def cancel(self, ticket: GenerationTicket) -> None:
+        """대기 중인 요청 취소 (이미 실행 중이면 슬롯 반환)"""
+        with self._lock:
+            if ticket.id in self._running:
+                running = True
+            else:
+                running = False
+                before = len(self._waiting)
+                self._waiting = [entry for entry in self._waiting if entry[2].id != ticket.id]
+                if len(self._waiting) != before:
+                    heapq.heapify(self._waiting)
+                    self._cancelled += 1
+        if running:
+            self.release(ticket)
+
+    def release(self, ticket: GenerationTicket) -> None:
+        """실행 슬롯 반환 (생성 스레드에서 호출 가능)"""
+        with self._lock:
+            if ticket.released:
+                return
+            ticket.released = True
+            ticket.finished_at = time.time()
+            if self._running.pop(ticket.id, None) is not None:
+                self._completed += 1
+            self._promote_waiting()
+
+    # --- 실행 ---
+
+    def start_thread(self, ticket: GenerationTicket, target: Callable[..., Any], kwargs: Dict[str, Any]) -> threading.Thread:
+        """실행 슬롯을 가진 티켓으로 생성 스레드 시작 (종료 시 슬롯 자동 반환)"""
+
+        def run():
+            try:
+                target(**kwargs)
+            except Exception as e:
+                print(f"LLM 생성 스레드 오류 (ticket {ticket.id}): {e}")
+                traceback.print_exc()
+                # 스트리머 소비자가 무한 대기하지 않도록 종료 신호 전달
+                streamer = kwargs.get("streamer")
+                if streamer is not None and hasattr(streamer, "end"):
+                    try:
+                        streamer.end()
+                    except Exception:
+                        pass
+            finally:
+                self.release(ticket)
+
+        thread = threading.Thread(target=run, name=f"llm-generate-{ticket.id}", daemon=True)
+        thread.start()
+        return thread
+
+    # --- 통계 ---
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "policy": self.policy,
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "running": len(self._running),
+                "waiting": len(self._waiting),
+                "admitted": self._admitted,
+                "rejected": self._rejected,
+                "completed": self._completed,
+                "cancelled": self._cancelled,
+                "avg_queue_wait": round(self._total_queue_wait / self._admitted, 3) if self._admitted else 0.0,
+                "max_queue_wait": round(self._max_queue_wait, 3),
+            }
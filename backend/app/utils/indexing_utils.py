@@ -5,9 +5,10 @@ import numpy as np  # 현재 코드에서는 직접 사용 안됨
 from PIL import Image  # 현재 코드에서는 직접 사용 안됨
 import io  # 현재 코드에서는 직접 사용 안됨
 import os, re, asyncio
+import inspect
 import hashlib  # 파일 중복 체크를 위한 해시 라이브러리 추가
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Callable
 from langchain_community.document_loaders import (
     UnstructuredFileLoader,
     # UnstructuredPDFLoader, # PyPDFLoader로 대체
@@ -17,6 +18,7 @@ from langchain_community.document_loaders import (
 )
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document
+from elasticsearch import AsyncElasticsearch
 from elasticsearch.helpers import bulk
 import traceback
 from datetime import datetime
@@ -455,9 +457,28 @@ def split_text(
         return []
 
 
+# 색인 진행 상황 콜백: (단계 이름, 진행률 0~100) - 이벤트 루프 스레드에서 호출됨
+ProgressCallback = Callable[[str, int], None]
+
+
+def _report_progress(progress_callback: Optional[ProgressCallback], stage: str, percent: float) -> None:
+    """진행 상황 콜백 호출 (콜백 오류는 색인에 영향을 주지 않도록 무시)"""
+    if progress_callback is None:
+        return
+    try:
+        progress_callback(stage, int(percent))
+    except Exception as e:
+        print(f"진행 상황 콜백 오류 (무시됨): {e}")
+
+
 # --- index_chunks_to_elasticsearch 함수 (페이지 번호 사용 명확화) ---
 async def index_chunks_to_elasticsearch(
-    es_client: Any, embedding_function: Any, chunks: List[Document], category: str
+    es_client: Any,
+    embedding_function: Any,
+    chunks: List[Document],
+    category: str,
+    token_counter: Optional[Callable[[List[str]], List[int]]] = None,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
 ):
     # (이전 답변에서 제공된 index_chunks_to_elasticsearch 함수 코드와 거의 동일하게 유지)
     # 핵심: page_number_to_index = int(chunk_doc.metadata.get("page", 1)) # page 메타데이터 사용
@@ -467,9 +488,11 @@ async def index_chunks_to_elasticsearch(
     batch_size = 500
     success_count = 0
     failure_count = 0
+    total_batches = (len(chunks) + batch_size - 1) // batch_size
+    completed_batches = 0
 
     async def process_batch(batch_chunks_input, batch_num_for_log):
-        nonlocal success_count, failure_count
+        nonlocal success_count, failure_count, completed_batches
         valid_chunks_in_batch = [
             chk
             for chk in batch_chunks_input
@@ -478,10 +501,21 @@ async def index_chunks_to_elasticsearch(
         if not valid_chunks_in_batch:
             return
         chunk_texts_for_embedding = [chk.page_content for chk in valid_chunks_in_batch]
+        # 벌크 인코딩(길이순 토큰 예산 배치)을 지원하면 우선 사용
+        encode_fn = getattr(embedding_function, "encode_bulk", embedding_function)
         try:
             embeddings = await asyncio.to_thread(
-                embedding_function, chunk_texts_for_embedding
+                encode_fn, chunk_texts_for_embedding
             )
+            # LLM 토크나이저 기준 토큰 수 (컨텍스트 패킹 시 재토큰화 없이 사용)
+            token_counts = None
+            if token_counter is not None:
+                try:
+                    token_counts = await asyncio.to_thread(
+                        token_counter, chunk_texts_for_embedding
+                    )
+                except Exception as e_count:
+                    print(f"배치 {batch_num_for_log} 토큰 수 계산 실패 (token_count 생략): {e_count}")
             actions_for_bulk = []
             for i, chunk_doc in enumerate(valid_chunks_in_batch):
                 page_number_to_index = chunk_doc.metadata.get("page")
@@ -508,6 +542,8 @@ async def index_chunks_to_elasticsearch(
                     "total_chunks": chunk_doc.metadata.get("total_chunks", len(chunks)),
                     "indexed_at": datetime.now().isoformat(),
                 }
+                if token_counts is not None:
+                    es_source_doc["token_count"] = int(token_counts[i])
                 actions_for_bulk.append(
                     {
                         "_index": ES_INDEX_NAME,
@@ -535,6 +571,10 @@ async def index_chunks_to_elasticsearch(
             print(f"배치 {batch_num_for_log} 처리 중 예외 발생: {e_batch}")
             failure_count += len(valid_chunks_in_batch)
             traceback.print_exc()
+        finally:
+            completed_batches += 1
+            if progress_callback is not None:
+                progress_callback(completed_batches, total_batches)
 
     tasks = [
         process_batch(chunks[i : i + batch_size], (i // batch_size) + 1)
@@ -547,27 +587,52 @@ async def index_chunks_to_elasticsearch(
     return success_count > 0
 
 
+async def _es_call(method: Any, **kwargs) -> Any:
+    """
+    ES 클라이언트 메서드 호출 헬퍼
+    - AsyncElasticsearch 메서드는 그대로 await
+    - 동기 Elasticsearch 메서드는 이벤트 루프를 막지 않도록 스레드에서 실행
+
+    elasticsearch-py 8.x의 API 메서드는 _rewrite_parameters가 일반 함수로 감싸므로
+    iscoroutinefunction으로는 비동기 여부를 알 수 없어, 메서드가 속한 클라이언트 종류로 판별합니다.
+    """
+    owner = getattr(method, "__self__", None)
+    # es_client.indices 같은 네임스페이스 클라이언트는 _client에 최상위 클라이언트를 보관
+    client = getattr(owner, "_client", owner)
+    if inspect.iscoroutinefunction(method) or isinstance(client, AsyncElasticsearch):
+        result = method(**kwargs)
+    else:
+        result = await asyncio.to_thread(method, **kwargs)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+def _compute_file_hash(file_path: str) -> str:
+    """파일 MD5 해시 계산 (큰 파일도 메모리 효율적으로 처리하기 위해 청크 단위로 읽음)"""
+    hash_md5 = hashlib.md5()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            hash_md5.update(chunk)
+    return hash_md5.hexdigest()
+
+
 # 파일 중복 체크를 위한 함수 개선
 async def check_file_exists(es_client: Any, file_path: str) -> Tuple[bool, str]:
     """
     파일의 해시값을 계산하고 ES에서 중복 여부를 확인합니다.
     
     Args:
-        es_client: Elasticsearch 클라이언트
+        es_client: Elasticsearch 또는 AsyncElasticsearch 클라이언트
         file_path: 파일 경로
         
     Returns:
         Tuple[bool, str]: (파일 존재 여부, 파일 해시값)
     """
-    # 파일 해시값 계산 - 메모리 효율적인 방식으로 업데이트
+    # 파일 해시값 계산 - 이벤트 루프를 막지 않도록 스레드에서 실행
     file_hash = ""
     try:
-        # 큰 파일을 처리할 때 메모리 사용량을 줄이기 위해 청크 단위로 읽음
-        hash_md5 = hashlib.md5()
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_md5.update(chunk)
-        file_hash = hash_md5.hexdigest()
+        file_hash = await asyncio.to_thread(_compute_file_hash, file_path)
         
         # 파일 크기도 로깅 (디버깅용)
         file_size = os.path.getsize(file_path)
@@ -577,7 +642,11 @@ async def check_file_exists(es_client: Any, file_path: str) -> Tuple[bool, str]:
         return False, ""
     
     # 인덱스 존재 확인
-    if not es_client.indices.exists(index=ES_INDEX_NAME):
+    try:
+        if not await _es_call(es_client.indices.exists, index=ES_INDEX_NAME):
+            return False, file_hash
+    except Exception as e:
+        print(f"ES 인덱스 존재 확인 중 오류: {e}")
         return False, file_hash
     
     # ES에서 해당 해시값을 가진 문서 검색
@@ -590,7 +659,7 @@ async def check_file_exists(es_client: Any, file_path: str) -> Tuple[bool, str]:
             },
             "size": 1
         }
-        response = es_client.search(index=ES_INDEX_NAME, body=query)
+        response = await _es_call(es_client.search, index=ES_INDEX_NAME, body=query)
         
         # 검색 결과 확인
         hits = response.get("hits", {}).get("hits", [])
@@ -623,13 +692,22 @@ async def process_and_index_file(
     embedding_function: Any,
     uploaded_file_path: str,
     category: str,
+    token_counter: Optional[Callable[[List[str]], List[int]]] = None,
+    progress_callback: Optional[ProgressCallback] = None,
 ) -> bool:
+    """
+    파일 로드(OCR 포함) → 분할 → 임베딩/벌크 색인
+
+    progress_callback이 있으면 단계(hashing, converting, loading, splitting, indexing)와
+    진행률(0~95, 완료 처리는 호출 측 담당)을 전달합니다.
+    """
     print(f"파일 처리 시작: '{uploaded_file_path}', 카테고리: '{category}'")
     if not es_client or not embedding_function:
         print("ES 클라이언트 또는 임베딩 함수 유효하지 않음.")
         return False
 
     # 파일 중복 체크
+    _report_progress(progress_callback, "hashing", 5)
     file_exists, file_hash = await check_file_exists(es_client, uploaded_file_path)
     if file_exists:
         print(f"이미 인덱싱된 파일입니다: {uploaded_file_path}")
@@ -642,6 +720,7 @@ async def process_and_index_file(
     temp_conversion_output_dir = None
 
     if extension_for_loader_selection == ".docx":
+        _report_progress(progress_callback, "converting", 10)
         temp_conversion_output_dir = os.path.join(
             os.path.dirname(uploaded_file_path), "temp_pdf_conversion"
         )
@@ -659,6 +738,7 @@ async def process_and_index_file(
             # extension_for_loader_selection은 .docx 그대로 유지 -> load_document에서 UnstructuredFileLoader 사용
 
     # 함수 시그니처 변경으로 인한 수정
+    _report_progress(progress_callback, "loading", 15)
     documents = await load_document(file_to_actually_load, extension_for_loader_selection)
     
     if not documents:
@@ -688,6 +768,7 @@ async def process_and_index_file(
     # 만약 process_and_index_file의 원래 인자(chunk_size, chunk_overlap)를 사용하고 싶다면,
     # split_text(documents, chunk_size=chunk_size, chunk_overlap=chunk_overlap, adaptive=False) 와 같이 호출.
     # 현재는 원본 indexing_utils.py의 split_text 기본값/adaptive 로직을 따르도록 함.
+    _report_progress(progress_callback, "splitting", 50)
     chunks = split_text(documents)  # adaptive=True가 기본으로 적용됨
 
     if not chunks:
@@ -704,8 +785,15 @@ async def process_and_index_file(
         return False
     print(f"텍스트 분할 완료: {len(chunks)} 청크 생성")
 
+    # 임베딩/색인 배치 완료마다 55~95% 구간 진행률 보고
+    _report_progress(progress_callback, "indexing", 55)
+
+    def on_batch_done(done: int, total: int) -> None:
+        _report_progress(progress_callback, "indexing", 55 + 40 * done / max(total, 1))
+
     success = await index_chunks_to_elasticsearch(
-        es_client, embedding_function, chunks, category
+        es_client, embedding_function, chunks, category, token_counter=token_counter,
+        progress_callback=on_batch_done if progress_callback is not None else None,
     )
 
     # ... (성공/실패 로깅 및 임시 파일 정리 로직)
@@ -0,0 +1,368 @@
+"""
+백그라운드 색인 작업 대기열 모듈
+- 업로드 요청은 파일 저장 후 작업 ID를 즉시 반환하고, asyncio 워커가 작업의 파일을 순서대로 처리
+- 작업/파일별 처리 단계(stage)와 진행률을 작업별 JSON 파일에 저장 (서버 재시작 후에도 조회 가능)
+- 재시작 시 끝나지 않은 작업은 저장된 업로드 파일 기준으로 대기열에 다시 등록
+- 작업별 잠금 파일(ProcessLock)로 소유 프로세스를 정하므로 API 워커가 여러 개여도 한 작업은 한 워커만 처리
+"""
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import traceback
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.utils.indexing_utils import format_file_size
+from app.utils.process_lock import ProcessLock
+
+# 작업/파일 상태
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+FILE_QUEUED = "queued"
+FILE_PROCESSING = "processing"
+FILE_FINISHED_STATUSES = ("success", "skipped", "error")
+
+# 기본 설정
+DEFAULT_JOB_DIR = "app/jobs"
+DEFAULT_WORKERS = 1  # 색인은 임베딩 모델(GPU)을 사용하므로 기본적으로 작업 하나씩 처리
+DEFAULT_RETENTION_SECONDS = 7 * 24 * 3600  # 완료된 작업 보관 기간
+PERSIST_INTERVAL = 0.5  # 같은 단계 내 진행률 변경의 최소 저장 간격 (초)
+
+# 파일 처리 함수: (작업, 파일 항목, 진행 상황 콜백(stage, percent)) -> 파일 결과로 병합할 필드
+FileProcessor = Callable[[Dict[str, Any], Dict[str, Any], Callable[[str, int], None]], Awaitable[Dict[str, Any]]]
+
+# 응답에 포함하지 않는 내부 필드
+_PRIVATE_FILE_FIELDS = ("file_path",)
+
+
+def summarize_files(files: List[Dict[str, Any]], total_time: float) -> Dict[str, Any]:
+    """파일 결과 목록 요약 (기존 /api/upload 응답의 summary 형식)"""
+    total_size = sum(f.get("size", 0) for f in files)
+    return {
+        "total_files": len(files),
+        "success_count": sum(1 for f in files if f.get("status") == "success"),
+        "error_count": sum(1 for f in files if f.get("status") == "error"),
+        "skipped_count": sum(1 for f in files if f.get("status") == "skipped"),
+        "pending_count": sum(1 for f in files if f.get("status") not in FILE_FINISHED_STATUSES),
+        "ocr_supported_count": sum(1 for f in files if f.get("file_info", {}).get("ocr_supported", False)),
+        "ocr_processed_count": sum(1 for f in files if f.get("ocr_processed", False) and f.get("status") == "success"),
+        "total_size": total_size,
+        "total_size_formatted": format_file_size(total_size),
+        "total_processing_time": round(total_time, 2),
+        "average_file_time": round(total_time / len(files), 2) if files else 0,
+    }
+
+
+class JobStore:
+    """작업별 JSON 파일 저장소 (임시 파일에 쓴 뒤 교체하여 중간 상태가 남지 않도록 함)"""
+
+    def __init__(self, job_dir: str = DEFAULT_JOB_DIR):
+        self.job_dir = job_dir
+        os.makedirs(job_dir, exist_ok=True)
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.job_dir, f"{job_id}.json")
+
+    def lock_path(self, job_id: str) -> str:
+        return os.path.join(self.job_dir, f"{job_id}.lock")
+
+    def save(self, job: Dict[str, Any]) -> None:
+        path = self._path(job["job_id"])
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(job, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"작업 상태 저장 중 오류 ({job['job_id']}): {e}")
+
+    def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(job_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def load_all(self) -> List[Dict[str, Any]]:
+        jobs = []
+        for filename in os.listdir(self.job_dir):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.job_dir, filename), "r", encoding="utf-8") as f:
+                    jobs.append(json.load(f))
+            except Exception as e:
+                print(f"작업 파일 로드 실패 ({filename}): {e}")
+        return jobs
+
+    def delete(self, job_id: str) -> None:
+        for path in (self._path(job_id), self.lock_path(job_id)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+class IngestionJobQueue:
+    """
+    업로드 파일 색인 작업 대기열 (이벤트 루프 스레드에서만 사용)
+
+    사용 흐름:
+        job = queue.submit(files, category)   # 즉시 반환, 워커가 백그라운드에서 처리
+        queue.get(job_id)                     # 작업/파일별 단계와 진행률 조회
+        await queue.wait(job_id)              # 완료까지 대기 (동기식 응답이 필요한 경우)
+    """
+
+    def __init__(
+        self,
+        process_file: FileProcessor,
+        store: Optional[JobStore] = None,
+        workers: int = DEFAULT_WORKERS,
+        retention_seconds: float = DEFAULT_RETENTION_SECONDS,
+    ):
+        self.process_file = process_file
+        self.store = store or JobStore()
+        self.workers = max(1, workers)
+        self.retention_seconds = retention_seconds
+
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._events: Dict[str, asyncio.Event] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._last_persist: Dict[str, float] = {}
+        self._locks: Dict[str, ProcessLock] = {}  # 이 프로세스가 소유한 미완료 작업의 잠금
+
+    # --- 시작 / 종료 ---
+
+    def start(self) -> None:
+        """저장된 작업을 불러오고 워커 시작 (startup 이벤트에서 호출)"""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        now = time.time()
+        requeued = 0
+        for job in sorted(self.store.load_all(), key=lambda j: j.get("created_at", 0)):
+            finished_at = job.get("finished_at")
+            if finished_at and now - finished_at > self.retention_seconds:
+                self.store.delete(job["job_id"])
+                continue
+            if job.get("status") in (JOB_QUEUED, JOB_RUNNING):
+                # 다른 워커 프로세스가 소유(처리 중이거나 먼저 재등록)한 작업은 건너뜀 (조회는 저장 파일로 가능)
+                if not self._claim(job["job_id"]):
+                    continue
+                # 목록을 읽은 뒤 다른 워커가 처리를 끝내고 잠금을 놓았을 수 있으므로 최신 상태로 다시 확인
+                job = self.store.load(job["job_id"]) or job
+                if job.get("status") not in (JOB_QUEUED, JOB_RUNNING):
+                    self._release(job["job_id"])
+                    self._jobs[job["job_id"]] = job
+                    continue
+                self._jobs[job["job_id"]] = job
+                # 재시작 전에 처리 중이던 파일은 처음부터 다시 처리
+                # (resumed 표시: 파일 처리 함수가 이미 색인된 일부 청크를 먼저 삭제하도록 함)
+                for file_entry in job.get("files", []):
+                    if file_entry.get("status") not in FILE_FINISHED_STATUSES:
+                        if file_entry.get("status") == FILE_PROCESSING:
+                            file_entry["resumed"] = True
+                        file_entry.update({"status": FILE_QUEUED, "stage": FILE_QUEUED, "progress": 0})
+                job["status"] = JOB_QUEUED
+                self._enqueue(job)
+                requeued += 1
+            else:
+                self._jobs[job["job_id"]] = job
+        if requeued:
+            print(f"[색인 작업] 미완료 작업 {requeued}개 재등록")
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"ingestion-worker-{i}") for i in range(self.workers)
+        ]
+
+    async def shutdown(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # 미완료 작업은 저장된 상태로 남고, 다음에 시작하는 워커가 잠금을 얻어 재처리
+        for job_id in list(self._locks):
+            self._release(job_id)
+
+    def _claim(self, job_id: str) -> bool:
+        """작업 소유권 획득 (소유 프로세스가 종료되면 잠금이 자동 해제되어 다른 프로세스가 획득 가능)"""
+        lock = ProcessLock(self.store.lock_path(job_id))
+        if not lock.acquire():
+            return False
+        self._locks[job_id] = lock
+        return True
+
+    def _release(self, job_id: str) -> None:
+        lock = self._locks.pop(job_id, None)
+        if lock is not None:
+            lock.release()
+
+    # --- 등록 / 조회 ---
+
+    def submit(self, files: List[Dict[str, Any]], category: str) -> Dict[str, Any]:
+        """
+        작업 등록
+
+        Args:
+            files: 저장된 업로드 파일 항목 (filename, file_path, size 등 포함)
+        """
+        job_id = uuid.uuid4().hex
+        for file_entry in files:
+            file_entry.setdefault("status", FILE_QUEUED)
+            file_entry.setdefault("stage", FILE_QUEUED)
+            file_entry.setdefault("progress", 0)
+        job = {
+            "job_id": job_id,
+            "status": JOB_QUEUED,
+            "category": category,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "progress": 0,
+            "files": files,
+        }
+        self._claim(job_id)  # 새 작업 ID이므로 항상 획득
+        self._jobs[job_id] = job
+        self.store.save(job)
+        self._enqueue(job)
+        return job
+
+    def _enqueue(self, job: Dict[str, Any]) -> None:
+        self._events.setdefault(job["job_id"], asyncio.Event())
+        if self._queue is None:
+            raise RuntimeError("색인 작업 대기열이 시작되지 않았습니다.")
+        self._queue.put_nowait(job["job_id"])
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """응답용 작업 정보 (대기 순서, 요약 포함)"""
+        if not job_id.isalnum():
+            return None
+        # 다른 API 워커 프로세스가 등록한 작업은 저장된 상태 파일에서 조회
+        job = self._jobs.get(job_id) or self.store.load(job_id)
+        if job is None:
+            return None
+        public = {key: value for key, value in job.items() if key != "files"}
+        public["results"] = [
+            {key: value for key, value in file_entry.items() if key not in _PRIVATE_FILE_FIELDS}
+            for file_entry in job["files"]
+        ]
+        end = job.get("finished_at") or time.time()
+        public["summary"] = summarize_files(job["files"], end - (job.get("started_at") or end))
+        if job["status"] == JOB_QUEUED and job_id in self._jobs:
+            queued = [j for j in self._jobs.values() if j["status"] == JOB_QUEUED]
+            public["queue_position"] = sorted(queued, key=lambda j: j["created_at"]).index(job) + 1
+        return public
+
+    def list_jobs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        jobs = sorted(self._jobs.values(), key=lambda j: j.get("created_at", 0), reverse=True)[:limit]
+        return [self.get(job["job_id"]) for job in jobs]
+
+    async def wait(self, job_id: str, timeout: Optional[float] = None) -> bool:
+        """작업이 끝날 때까지 대기 (시간 초과 시 False)"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return False
+        if job["status"] in (JOB_COMPLETED, JOB_FAILED):
+            return True
+        try:
+            await asyncio.wait_for(self._events[job_id].wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    # --- 처리 ---
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            job_id = await self._queue.get()
+            job = self._jobs.get(job_id)
+            try:
+                if job is not None and job["status"] == JOB_QUEUED:
+                    await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[색인 작업] 워커 {worker_id} 오류 ({job_id}): {e}")
+                traceback.print_exc()
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        job.update({"status": JOB_RUNNING, "started_at": job.get("started_at") or time.time()})
+        self.store.save(job)
+        files = job["files"]
+        print(f"[색인 작업] {job['job_id']} 시작: {len(files)}개 파일, 카테고리: {job['category']}")
+
+        try:
+            for index, file_entry in enumerate(files):
+                if file_entry.get("status") in FILE_FINISHED_STATUSES:
+                    continue
+                file_entry.update({"status": FILE_PROCESSING, "stage": "started", "start_time": time.time()})
+                self._update_job_progress(job, force=True)
+
+                def progress(stage: str, percent: int, entry: Dict[str, Any] = file_entry) -> None:
+                    changed = entry.get("stage") != stage
+                    entry["stage"] = stage
+                    entry["progress"] = max(entry.get("progress", 0), min(int(percent), 99))
+                    self._update_job_progress(job, force=changed)
+
+                try:
+                    result = await self.process_file(job, file_entry, progress)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    traceback.print_exc()
+                    result = {"status": "error", "message": f"오류 발생: {str(e)}", "error_details": str(e)}
+                file_entry.update(result)
+                file_entry.update({
+                    "stage": "done",
+                    "progress": 100,
+                    "processing_time": round(time.time() - file_entry["start_time"], 2),
+                })
+                self._update_job_progress(job, force=True)
+
+            job["status"] = JOB_COMPLETED
+        except asyncio.CancelledError:
+            # 서버 종료: 상태를 저장해 두고 재시작 시 다시 처리
+            self.store.save(job)
+            raise
+        except Exception as e:
+            traceback.print_exc()
+            job.update({"status": JOB_FAILED, "error": str(e)})
+
+        job["finished_at"] = time.time()
+        self.store.save(job)
+        self._release(job["job_id"])
+        self._last_persist.pop(job["job_id"], None)
+        summary = summarize_files(files, job["finished_at"] - job["started_at"])
+        print(
+            f"[색인 작업] {job['job_id']} 완료: {summary['success_count']}개 성공, "
+            f"{summary['error_count']}개 실패, {summary['skipped_count']}개 건너뜀 "
+            f"({summary['total_processing_time']}초)"
+        )
+        self._events[job["job_id"]].set()
+
+    def _update_job_progress(self, job: Dict[str, Any], force: bool = False) -> None:
+        """파일 진행률 평균으로 작업 진행률 갱신 후 (단계 변경 시 또는 일정 간격으로) 저장"""
+        files = job["files"]
+        job["progress"] = int(sum(f.get("progress", 0) for f in files) / len(files)) if files else 100
+        now = time.time()
+        if force or now - self._last_persist.get(job["job_id"], 0.0) >= PERSIST_INTERVAL:
+            self._last_persist[job["job_id"]] = now
+            self.store.save(job)
+
+    # --- 통계 ---
+
+    def get_stats(self) -> Dict[str, Any]:
+        statuses: Dict[str, int] = {}
+        for job in self._jobs.values():
+            statuses[job["status"]] = statuses.get(job["status"], 0) + 1
+        return {
+            "workers": self.workers,
+            "queue_size": self._queue.qsize() if self._queue is not None else 0,
+            "jobs": statuses,
+        }
@@ -1,9 +1,12 @@
 import asyncio
+import copy
 from functools import lru_cache
+import threading
 import torch
 import traceback
-from typing import Any
+from typing import Any, Optional
 import re
+from transformers import StoppingCriteria
 
 # 기존 함수들 유지하면서 아래 함수 개선
 
@@ -302,4 +305,113 @@ def generate_text_with_local_llm(
         print(f"[LLM_UTILS] 텍스트 생성 중 오류: {str(e)}")
         import traceback
         traceback.print_exc()
-        return f"응답 생성 중 오류가 발생했습니다: {str(e)}" 
\ No newline at end of file
+        return f"응답 생성 중 오류가 발생했습니다: {str(e)}" 
+
+
+class CancellationStoppingCriteria(StoppingCriteria):
+    """
+    요청별 취소 플래그와 연결된 생성 중단 조건
+
+    클라이언트 연결이 끊기면 cancel()을 호출하여 model.generate 루프를
+    다음 디코딩 스텝에서 즉시 종료시킵니다.
+    """
+
+    def __init__(self, cancel_event: Optional[threading.Event] = None):
+        self.cancel_event = cancel_event or threading.Event()
+
+    def cancel(self) -> None:
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs) -> torch.BoolTensor:
+        # 배치의 모든 시퀀스에 동일한 중단 여부 반환
+        return torch.full(
+            (input_ids.shape[0],), self.cancel_event.is_set(), dtype=torch.bool, device=input_ids.device
+        )
+
+
+class PrefixKVCache:
+    """
+    고정 프롬프트 접두사(시스템 지시문 헤더)의 KV 캐시 재사용
+
+    모델 로드 후 접두사를 한 번만 prefill하여 KV 상태를 보관하고, 요청마다
+    복사본을 generate(past_key_values=...)에 전달하여 접두사 prefill을 생략합니다.
+    """
+
+    def __init__(self, model: Any, tokenizer: Any, prefix_text: str):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.prefix_text = prefix_text
+        self._lock = threading.Lock()
+        self._prefix_ids: Optional[torch.Tensor] = None
+        self._cache: Any = None
+
+        # 통계
+        self.hits = 0
+        self.misses = 0
+        self.saved_tokens = 0
+
+    @property
+    def prefix_length(self) -> int:
+        return int(self._prefix_ids.shape[-1]) if self._prefix_ids is not None else 0
+
+    def build(self) -> bool:
+        """접두사 KV 상태 계산 (모델 로드 후 1회)"""
+        from transformers import DynamicCache
+
+        with self._lock:
+            if self._cache is not None:
+                return True
+            try:
+                prefix_ids = self.tokenizer(
+                    self.prefix_text, return_tensors="pt", add_special_tokens=False
+                )["input_ids"].to(self.model.device)
+                cache = DynamicCache()
+                with torch.no_grad():
+                    self.model(input_ids=prefix_ids, past_key_values=cache, use_cache=True)
+                self._prefix_ids = prefix_ids
+                self._cache = cache
+                print(f"프롬프트 접두사 KV 캐시 생성 완료 ({prefix_ids.shape[-1]} 토큰)")
+                return True
+            except Exception as e:
+                print(f"프롬프트 접두사 KV 캐시 생성 실패 (캐시 없이 진행): {e}")
+                traceback.print_exc()
+                return False
+
+    def lookup(self, input_ids: torch.Tensor) -> Optional[Any]:
+        """
+        입력이 캐시된 접두사로 시작하면 KV 캐시 복사본 반환
+
+        generate()는 past_key_values 길이 이후의 토큰만 prefill하므로 input_ids는
+        전체 프롬프트를 그대로 전달하면 됩니다.
+        """
+        if self._cache is None and not self.build():
+            return None
+
+        prefix_len = self.prefix_length
+        if (
+            input_ids.dim() != 2
+            or input_ids.shape[0] != 1
+            or input_ids.shape[1] <= prefix_len
+            or not torch.equal(input_ids[0, :prefix_len].to(self._prefix_ids.device), self._prefix_ids[0])
+        ):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.saved_tokens += prefix_len
+        # generate가 캐시를 확장하므로 요청마다 복사본 사용
+        return copy.deepcopy(self._cache)
+
+    def get_stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "prefix_tokens": self.prefix_length,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "saved_prefill_tokens": self.saved_tokens,
+        }
@@ -0,0 +1,243 @@
+"""
+모델 서버 클라이언트 모듈
+- 별도 프로세스(app.model_server)에 상주하는 임베딩/리랭커/LLM을 로컬 HTTP로 호출
+- 기존 모델 객체와 같은 인터페이스(embed_query/__call__/encode_bulk, predict, generate)를 제공하여
+  API 계층 코드는 그대로 두고 원격 모델을 사용
+- API 워커(uvicorn --workers N)는 모델을 로드하지 않으므로 모델 사본은 모델 서버에 하나만 존재
+"""
+
+import json
+import time
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# 기본 클라이언트 설정
+DEFAULT_TIMEOUT = 60.0  # 임베딩/리랭크 요청 타임아웃 (초)
+DEFAULT_STREAM_READ_TIMEOUT = 300.0  # 생성 스트림에서 다음 프레임까지 최대 대기 (모델 서버 대기열 포함)
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_POOL_SIZE = 32
+READY_POLL_INTERVAL = 2.0
+
+# generate()에서 모델 서버로 전달하는 생성 파라미터 (스트리머/중단 조건/KV 캐시는 로컬 객체이므로 제외)
+_FORWARDED_GENERATION_PARAMS = (
+    "max_new_tokens", "temperature", "do_sample", "top_p", "top_k", "repetition_penalty", "pad_token_id",
+)
+
+
+class ModelServerError(Exception):
+    """모델 서버 호출 실패 (연결 오류, 비정상 응답, 서버 측 오류 프레임)"""
+
+
+class ModelServerClient:
+    """모델 서버 HTTP 클라이언트 (커넥션 풀을 스레드 간 공유)"""
+
+    def __init__(self, base_url: str, timeout: float = DEFAULT_TIMEOUT, pool_size: int = DEFAULT_POOL_SIZE):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # 통계
+        self._stats_lock = threading.Lock()
+        self._requests = 0
+        self._errors = 0
+        self._total_latency = 0.0
+
+    def _post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        start_time = time.time()
+        self._count("_requests")
+        try:
+            response = self.session.post(
+                f"{self.base_url}{path}", json=payload, timeout=(DEFAULT_CONNECT_TIMEOUT, self.timeout)
+            )
+            if response.status_code != 200:
+                raise ModelServerError(f"{path} 응답 오류 ({response.status_code}): {response.text[:200]}")
+            return response.json()
+        except requests.RequestException as e:
+            self._count("_errors")
+            raise ModelServerError(f"{path} 호출 실패: {e}") from e
+        except ModelServerError:
+            self._count("_errors")
+            raise
+        finally:
+            self._count("_total_latency", time.time() - start_time)
+
+    def _count(self, name: str, amount: float = 1) -> None:
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    # --- 상태 ---
+
+    def health(self) -> Optional[Dict[str, Any]]:
+        """모델 서버의 모델별 로드 상태 (연결 실패 시 None)"""
+        try:
+            response = self.session.get(f"{self.base_url}/health/ready", timeout=DEFAULT_CONNECT_TIMEOUT)
+            return response.json()
+        except (requests.RequestException, ValueError):
+            return None
+
+    def wait_until_ready(self, name: str, timeout: Optional[float] = None) -> bool:
+        """
+        모델 서버에서 name 모델이 준비될 때까지 대기 (API 워커의 모델 레지스트리 로더에서 호출)
+
+        Returns:
+            준비 여부 (로드 실패 또는 시간 초과 시 False)
+        """
+        deadline = time.time() + timeout if timeout else None
+        while True:
+            status = self.health()
+            model_status = ((status or {}).get("models") or {}).get(name, {}).get("status")
+            if model_status == "ready":
+                return True
+            if model_status == "failed":
+                print(f"모델 서버에서 '{name}' 로드 실패: {status['models'][name].get('error')}")
+                return False
+            if deadline is not None and time.time() >= deadline:
+                print(f"모델 서버 '{name}' 준비 대기 시간 초과 ({timeout}초)")
+                return False
+            time.sleep(READY_POLL_INTERVAL)
+
+    def generation_capacity(self) -> Optional[int]:
+        """모델 서버가 동시에 처리하는 생성 수 (연결 실패 또는 구버전 서버면 None)"""
+        capacity = (self.health() or {}).get("generation_capacity")
+        return int(capacity) if capacity else None
+
+    # --- 추론 ---
+
+    def embed(self, texts: List[str], mode: str = "documents") -> List[List[float]]:
+        """mode: "query"(쿼리 캐시/마이크로 배칭 경로), "documents", "bulk"(색인용 길이순 배치)"""
+        if not texts:
+            return []
+        return self._post("/embed", {"texts": texts, "mode": mode})["embeddings"]
+
+    def rerank(self, pairs: Sequence[Tuple[str, str]]) -> List[float]:
+        if not pairs:
+            return []
+        return self._post("/rerank", {"pairs": [list(pair) for pair in pairs]})["scores"]
+
+    def stream_generate(self, payload: Dict[str, Any], should_stop: Callable[[], bool]) -> Iterator[str]:
+        """
+        생성 텍스트 조각 스트림
+
+        should_stop()이 True가 되면 연결을 닫아 모델 서버가 생성을 취소하도록 합니다.
+        """
+        self._count("_requests")
+        try:
+            response = self.session.post(
+                f"{self.base_url}/generate",
+                json=payload,
+                stream=True,
+                timeout=(DEFAULT_CONNECT_TIMEOUT, DEFAULT_STREAM_READ_TIMEOUT),
+            )
+        except requests.RequestException as e:
+            self._count("_errors")
+            raise ModelServerError(f"/generate 호출 실패: {e}") from e
+
+        with response:
+            if response.status_code != 200:
+                self._count("_errors")
+                raise ModelServerError(f"/generate 응답 오류 ({response.status_code}): {response.text[:200]}")
+            try:
+                for line in response.iter_lines(decode_unicode=True):
+                    if should_stop():
+                        return
+                    if not line or not line.startswith("data: "):
+                        continue
+                    frame = json.loads(line[len("data: "):])
+                    if "error" in frame:
+                        raise ModelServerError(f"모델 서버 생성 오류: {frame['error']}")
+                    if frame.get("event") == "eos":
+                        return
+                    text = frame.get("text")
+                    if text:
+                        yield text
+            except requests.RequestException as e:
+                self._count("_errors")
+                raise ModelServerError(f"/generate 스트림 중단: {e}") from e
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "base_url": self.base_url,
+            "requests": self._requests,
+            "errors": self._errors,
+            "avg_latency": round(self._total_latency / self._requests, 4) if self._requests else 0.0,
+        }
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class RemoteEmbeddingFunction:
+    """LangchainEmbeddingFunction과 같은 인터페이스의 원격 임베딩 함수"""
+
+    def __init__(self, client: ModelServerClient, query_cache: Any = None):
+        self.client = client
+        # 쿼리 캐시는 워커 로컬 LRU에서 적중하면 모델 서버 왕복을 생략
+        self.query_cache = query_cache
+        # 마이크로 배칭은 모든 워커의 요청을 받는 모델 서버에서 수행
+        self.query_dispatcher = None
+
+    def _embed_single(self, text: str) -> List[float]:
+        return self.client.embed([text], mode="query")[0]
+
+    def embed_query(self, text: str) -> List[float]:
+        if self.query_cache is None:
+            return self._embed_single(text)
+        return self.query_cache.get_or_compute(text, self._embed_single)
+
+    def encode_bulk(self, texts: List[str]) -> List[List[float]]:
+        return self.client.embed([t if isinstance(t, str) else str(t) for t in texts], mode="bulk")
+
+    def __call__(self, texts: List[str]) -> List[List[float]]:
+        if isinstance(texts, str):
+            texts = [texts]
+        return self.client.embed([t if isinstance(t, str) else str(t) for t in texts], mode="documents")
+
+
+class RemoteReranker:
+    """CrossEncoder.predict와 같은 인터페이스의 원격 리랭커"""
+
+    def __init__(self, client: ModelServerClient):
+        self.client = client
+
+    def predict(self, pairs: Sequence[Tuple[str, str]], batch_size: Optional[int] = None, **kwargs) -> List[float]:
+        # 배치 구성은 모델 서버의 리랭커 디스패처가 담당
+        return self.client.rerank(pairs)
+
+
+class RemoteLLM:
+    """
+    model.generate(streamer=...) 호출을 모델 서버 스트림으로 대체하는 원격 LLM
+
+    토큰 디코딩은 모델 서버에서 수행하고, 받은 텍스트 조각을 로컬 TextIteratorStreamer에 그대로 넣습니다.
+    stopping_criteria의 취소 플래그(CancellationStoppingCriteria)가 설정되면 스트림 연결을 닫습니다.
+    """
+
+    device = "cpu"  # 토큰화 결과를 둘 장치 (입력은 목록으로 변환하여 전송)
+
+    def __init__(self, client: ModelServerClient):
+        self.client = client
+
+    def generate(self, input_ids: Any, streamer: Any = None, stopping_criteria: Any = None, **kwargs) -> None:
+        if streamer is None:
+            raise ValueError("RemoteLLM.generate는 streamer를 통한 스트리밍 생성만 지원합니다.")
+
+        payload: Dict[str, Any] = {"input_ids": input_ids[0].tolist()}
+        for name in _FORWARDED_GENERATION_PARAMS:
+            if kwargs.get(name) is not None:
+                payload[name] = kwargs[name]
+
+        cancel_flags = [c for c in (stopping_criteria or []) if hasattr(c, "cancelled")]
+
+        def should_stop() -> bool:
+            return any(c.cancelled for c in cancel_flags)
+
+        # 오류 시 스트리머 종료는 생성 스케줄러(start_thread)가 처리
+        for text in self.client.stream_generate(payload, should_stop):
+            streamer.on_finalized_text(text)
+        streamer.end()
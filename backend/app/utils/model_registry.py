@@ -0,0 +1,201 @@
+"""
+모델 레지스트리 모듈
+- 서로 독립적인 모델/클라이언트를 백그라운드 스레드에서 동시에 로드
+- 의존 관계가 있는 항목은 의존 대상이 준비된 뒤 로드
+- 항목별 상태(pending/loading/ready/failed)와 로드 시간 제공 (/health/ready 용)
+"""
+
+import time
+import asyncio
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+# 항목 상태
+STATUS_PENDING = "pending"
+STATUS_LOADING = "loading"
+STATUS_READY = "ready"
+STATUS_FAILED = "failed"
+
+DEFAULT_MAX_WORKERS = 3
+
+
+class ModelEntry:
+    """레지스트리에 등록된 모델 하나의 로더와 상태"""
+
+    def __init__(
+        self,
+        name: str,
+        loader: Callable[[], Any],
+        depends_on: Optional[List[str]] = None,
+        required: bool = True,
+    ):
+        self.name = name
+        self.loader = loader
+        self.depends_on = list(depends_on or [])
+        self.required = required
+
+        self.status = STATUS_PENDING
+        self.value: Any = None
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.ready_event = threading.Event()  # 준비 완료 또는 실패 시 설정
+
+    @property
+    def load_time(self) -> Optional[float]:
+        if self.started_at is None:
+            return None
+        end = self.finished_at if self.finished_at is not None else time.time()
+        return round(end - self.started_at, 2)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "required": self.required,
+            "depends_on": self.depends_on,
+            "load_time": self.load_time,
+            "error": self.error,
+        }
+
+
+class ModelRegistry:
+    """
+    백그라운드 병렬 모델 로더
+
+    loader가 None을 반환하면 로드 실패로 간주합니다 (기존 get_* 함수들의 실패 규약).
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS):
+        self.max_workers = max(1, max_workers)
+        self._entries: Dict[str, ModelEntry] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._started_at: Optional[float] = None
+
+    def register(
+        self,
+        name: str,
+        loader: Callable[[], Any],
+        depends_on: Optional[List[str]] = None,
+        required: bool = True,
+    ) -> None:
+        """
+        모델 등록
+
+        Args:
+            depends_on: 먼저 준비되어야 하는 항목 이름 (실패 시 이 항목도 실패 처리)
+            required: False이면 /health/ready 판단에서 제외 (예: 보조 모델)
+        """
+        with self._lock:
+            self._entries[name] = ModelEntry(name, loader, depends_on, required)
+
+    # --- 로드 ---
+
+    def start(self) -> None:
+        """등록된 모든 항목을 백그라운드에서 로드 시작 (즉시 반환)"""
+        with self._lock:
+            if self._executor is not None:
+                return
+            self._started_at = time.time()
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="model-loader")
+            entries = self._dependency_order()
+        # 의존 대상을 먼저 제출하여, 의존 항목을 기다리는 워커가 대기열의 의존 대상을 막지 않도록 함
+        for entry in entries:
+            self._executor.submit(self._load, entry)
+
+    def _dependency_order(self) -> List[ModelEntry]:
+        ordered: List[ModelEntry] = []
+        visited = set()
+
+        def visit(name: str) -> None:
+            if name in visited or name not in self._entries:
+                return
+            visited.add(name)
+            for dependency in self._entries[name].depends_on:
+                visit(dependency)
+            ordered.append(self._entries[name])
+
+        for name in self._entries:
+            visit(name)
+        return ordered
+
+    def _load(self, entry: ModelEntry) -> None:
+        # 의존 항목 대기 (의존 항목을 로드하는 작업이 다른 워커에서 진행됨)
+        for dependency in entry.depends_on:
+            dep_entry = self._entries.get(dependency)
+            if dep_entry is None:
+                continue
+            dep_entry.ready_event.wait()
+            if dep_entry.status != STATUS_READY:
+                self._finish(entry, STATUS_FAILED, error=f"의존 항목 '{dependency}' 로드 실패")
+                return
+
+        entry.status = STATUS_LOADING
+        entry.started_at = time.time()
+        print(f"[모델 레지스트리] '{entry.name}' 로드 시작")
+        try:
+            value = entry.loader()
+        except Exception as e:
+            traceback.print_exc()
+            self._finish(entry, STATUS_FAILED, error=str(e))
+            return
+
+        if value is None:
+            self._finish(entry, STATUS_FAILED, error="로더가 None을 반환했습니다.")
+        else:
+            entry.value = value
+            self._finish(entry, STATUS_READY)
+
+    def _finish(self, entry: ModelEntry, status: str, error: Optional[str] = None) -> None:
+        entry.status = status
+        entry.error = error
+        entry.finished_at = time.time()
+        entry.ready_event.set()
+        if status == STATUS_READY:
+            print(f"[모델 레지스트리] '{entry.name}' 준비 완료 ({entry.load_time}초)")
+        else:
+            print(f"[모델 레지스트리] '{entry.name}' 로드 실패: {error}")
+
+    # --- 조회 ---
+
+    def is_ready(self, *names: str) -> bool:
+        return all(self._entries[name].status == STATUS_READY for name in names if name in self._entries)
+
+    def not_ready(self, *names: str) -> List[str]:
+        """준비되지 않은 항목 이름 목록"""
+        return [name for name in names if name in self._entries and self._entries[name].status != STATUS_READY]
+
+    def get(self, name: str) -> Any:
+        entry = self._entries.get(name)
+        return entry.value if entry is not None else None
+
+    def wait(self, name: str, timeout: Optional[float] = None) -> bool:
+        """항목 로드가 끝날 때까지 대기 (스레드용)"""
+        entry = self._entries.get(name)
+        if entry is None:
+            return False
+        entry.ready_event.wait(timeout)
+        return entry.status == STATUS_READY
+
+    async def wait_async(self, name: str, timeout: Optional[float] = None) -> bool:
+        """항목 로드가 끝날 때까지 대기 (이벤트 루프를 막지 않음)"""
+        return await asyncio.to_thread(self.wait, name, timeout)
+
+    @property
+    def ready(self) -> bool:
+        """필수 항목이 모두 준비되었는지 여부"""
+        return all(entry.status == STATUS_READY for entry in self._entries.values() if entry.required)
+
+    def status(self) -> Dict[str, Any]:
+        entries = list(self._entries.values())
+        return {
+            "ready": self.ready,
+            "uptime": round(time.time() - self._started_at, 2) if self._started_at else 0.0,
+            "models": {entry.name: entry.to_dict() for entry in entries},
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,266 @@
+"""
+모델 상주(residency) 관리 모듈
+- 보조 모델을 처음 사용할 때 로드 (on-demand)
+- 상주 모델의 메모리 사용량을 설정된 예산과 비교하여, 초과 시 유휴 모델부터 LRU 순으로 해제
+- 일정 시간 사용되지 않은 모델은 백그라운드 스레드가 자동 해제
+- 로드/해제/적중 횟수 통계 제공
+"""
+
+import gc
+import os
+import time
+import threading
+import traceback
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import torch
+
+# 기본 상주 관리 설정 (환경 변수로 조정)
+MODEL_MEMORY_BUDGET_GB = float(os.environ.get("MODEL_MEMORY_BUDGET_GB", "8"))  # 관리 대상 모델 전체 메모리 예산
+MODEL_IDLE_UNLOAD_SECONDS = float(os.environ.get("MODEL_IDLE_UNLOAD_SECONDS", "900"))  # 0이면 유휴 해제 안 함
+IDLE_CHECK_INTERVAL = 30  # 유휴 모델 확인 주기 (초)
+
+GB = 1024 ** 3
+
+
+class ModelResidencyError(Exception):
+    """메모리 예산 부족 등으로 모델을 상주시킬 수 없는 경우"""
+
+
+class _ResidentModel:
+    """관리 대상 모델 하나의 로더와 상주 상태"""
+
+    def __init__(self, name: str, loader: Callable[[], Any], estimated_bytes: int):
+        self.name = name
+        self.loader = loader
+        self.estimated_bytes = estimated_bytes
+
+        self.value: Any = None
+        self.size_bytes = 0
+        self.in_use = 0
+        self.last_used = 0.0
+        self.load_lock = threading.Lock()  # 같은 모델의 중복 로드 방지
+
+        # 통계
+        self.loads = 0
+        self.unloads = 0
+        self.hits = 0
+        self.total_load_time = 0.0
+
+    @property
+    def resident(self) -> bool:
+        return self.value is not None
+
+
+def _measure_bytes(value: Any) -> int:
+    """로드된 모델의 메모리 사용량 (HF 모델은 get_memory_footprint 사용)"""
+    items = value if isinstance(value, (tuple, list)) else (value,)
+    total = 0
+    for item in items:
+        footprint = getattr(item, "get_memory_footprint", None)
+        if callable(footprint):
+            try:
+                total += int(footprint())
+            except Exception:
+                pass
+    return total
+
+
+class ModelResidencyManager:
+    """
+    메모리 예산 기반 on-demand 모델 상주 관리자
+
+    사용 중(in_use > 0)인 모델은 해제 대상에서 제외됩니다.
+    """
+
+    def __init__(
+        self,
+        memory_budget_bytes: int,
+        idle_timeout: float = MODEL_IDLE_UNLOAD_SECONDS,
+        check_interval: float = IDLE_CHECK_INTERVAL,
+    ):
+        self.memory_budget_bytes = memory_budget_bytes
+        self.idle_timeout = idle_timeout
+        self.check_interval = check_interval
+
+        self._models: "OrderedDict[str, _ResidentModel]" = OrderedDict()  # LRU 순서 (앞쪽이 오래된 항목)
+        self._lock = threading.RLock()
+        self._reaper: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+        # 통계
+        self._evictions = 0
+        self._idle_unloads = 0
+
+    def register(self, name: str, loader: Callable[[], Any], estimated_bytes: int = 0) -> None:
+        """
+        모델 등록 (로드는 첫 acquire 시점)
+
+        Args:
+            loader: 모델(또는 (모델, 토크나이저))을 반환하는 함수 (실패 시 None 또는 예외)
+            estimated_bytes: 로드 전 예산 확인에 사용할 예상 메모리 (첫 로드 후 실측값으로 대체)
+        """
+        with self._lock:
+            if name not in self._models:
+                self._models[name] = _ResidentModel(name, loader, estimated_bytes)
+        self._ensure_reaper()
+
+    # --- 사용 ---
+
+    @contextmanager
+    def use(self, name: str) -> Iterator[Any]:
+        """모델을 상주시키고 사용하는 동안 해제되지 않도록 고정"""
+        value = self.acquire(name)
+        try:
+            yield value
+        finally:
+            self.release(name)
+
+    def acquire(self, name: str) -> Any:
+        """모델 반환 (상주하지 않으면 로드). 반환 후 반드시 release 호출"""
+        entry = self._models.get(name)
+        if entry is None:
+            raise KeyError(f"등록되지 않은 모델: {name}")
+
+        with entry.load_lock:
+            with self._lock:
+                if entry.resident:
+                    entry.hits += 1
+                    entry.in_use += 1
+                    entry.last_used = time.time()
+                    self._models.move_to_end(name)
+                    return entry.value
+                required = entry.size_bytes or entry.estimated_bytes
+                self._make_room(required, exclude=name)
+
+            # 로드는 lock 밖에서 수행 (다른 모델 사용을 막지 않음)
+            start_time = time.time()
+            print(f"[모델 상주 관리] '{name}' 로드 시작")
+            value = entry.loader()
+            if value is None or (isinstance(value, (tuple, list)) and any(v is None for v in value)):
+                raise ModelResidencyError(f"'{name}' 모델 로드 실패")
+
+            with self._lock:
+                entry.value = value
+                entry.size_bytes = _measure_bytes(value) or entry.estimated_bytes
+                entry.loads += 1
+                entry.total_load_time += time.time() - start_time
+                entry.in_use += 1
+                entry.last_used = time.time()
+                self._models.move_to_end(name)
+                print(
+                    f"[모델 상주 관리] '{name}' 로드 완료 ({time.time() - start_time:.1f}초, "
+                    f"{entry.size_bytes / GB:.2f} GB / 예산 {self.memory_budget_bytes / GB:.2f} GB)"
+                )
+                return value
+
+    def release(self, name: str) -> None:
+        with self._lock:
+            entry = self._models.get(name)
+            if entry is not None and entry.in_use > 0:
+                entry.in_use -= 1
+                entry.last_used = time.time()
+
+    # --- 해제 ---
+
+    def _resident_bytes(self) -> int:
+        return sum(entry.size_bytes for entry in self._models.values() if entry.resident)
+
+    def _make_room(self, required: int, exclude: str) -> None:
+        """예산 내에 required 바이트가 들어가도록 유휴 모델을 LRU 순으로 해제 (lock 보유 상태에서 호출)"""
+        for name, entry in list(self._models.items()):
+            if self._resident_bytes() + required <= self.memory_budget_bytes:
+                return
+            if name == exclude or not entry.resident or entry.in_use > 0:
+                continue
+            self._unload(entry)
+            self._evictions += 1
+
+        if self._resident_bytes() + required > self.memory_budget_bytes:
+            raise ModelResidencyError(
+                f"'{exclude}' 로드에 필요한 메모리({required / GB:.2f} GB)가 예산을 초과합니다 "
+                f"(상주 {self._resident_bytes() / GB:.2f} GB / 예산 {self.memory_budget_bytes / GB:.2f} GB)"
+            )
+
+    def _unload(self, entry: _ResidentModel) -> None:
+        print(f"[모델 상주 관리] '{entry.name}' 해제 ({entry.size_bytes / GB:.2f} GB)")
+        entry.value = None
+        entry.unloads += 1
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def unload(self, name: str) -> bool:
+        """사용 중이 아니면 모델 해제"""
+        with self._lock:
+            entry = self._models.get(name)
+            if entry is None or not entry.resident or entry.in_use > 0:
+                return False
+            self._unload(entry)
+            return True
+
+    def _ensure_reaper(self) -> None:
+        if self.idle_timeout <= 0 or (self._reaper is not None and self._reaper.is_alive()):
+            return
+        self._reaper = threading.Thread(target=self._reap_idle, name="model-residency-reaper", daemon=True)
+        self._reaper.start()
+
+    def _reap_idle(self) -> None:
+        while not self._stopped.wait(self.check_interval):
+            try:
+                now = time.time()
+                with self._lock:
+                    for entry in list(self._models.values()):
+                        if entry.resident and entry.in_use == 0 and now - entry.last_used >= self.idle_timeout:
+                            print(f"[모델 상주 관리] '{entry.name}' {self.idle_timeout:.0f}초 이상 미사용")
+                            self._unload(entry)
+                            self._idle_unloads += 1
+            except Exception as e:
+                print(f"유휴 모델 해제 중 오류: {e}")
+                traceback.print_exc()
+
+    def shutdown(self) -> None:
+        self._stopped.set()
+
+    # --- 통계 ---
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.time()
+            return {
+                "memory_budget_gb": round(self.memory_budget_bytes / GB, 2),
+                "resident_gb": round(self._resident_bytes() / GB, 2),
+                "idle_timeout": self.idle_timeout,
+                "evictions": self._evictions,
+                "idle_unloads": self._idle_unloads,
+                "models": {
+                    entry.name: {
+                        "resident": entry.resident,
+                        "size_gb": round(entry.size_bytes / GB, 2),
+                        "in_use": entry.in_use,
+                        "idle_seconds": round(now - entry.last_used, 1) if entry.last_used else None,
+                        "loads": entry.loads,
+                        "unloads": entry.unloads,
+                        "hits": entry.hits,
+                        "avg_load_time": round(entry.total_load_time / entry.loads, 2) if entry.loads else 0.0,
+                    }
+                    for entry in self._models.values()
+                },
+            }
+
+
+_residency_manager: Optional[ModelResidencyManager] = None
+_residency_manager_lock = threading.Lock()
+
+
+def get_model_residency_manager() -> ModelResidencyManager:
+    """프로세스 전역 ModelResidencyManager 인스턴스 반환"""
+    global _residency_manager
+
+    if _residency_manager is None:
+        with _residency_manager_lock:
+            if _residency_manager is None:
+                _residency_manager = ModelResidencyManager(int(MODEL_MEMORY_BUDGET_GB * GB))
+    return _residency_manager
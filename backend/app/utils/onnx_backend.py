@@ -0,0 +1,330 @@
+"""
+ONNX Runtime 기반 CPU 추론 백엔드
+- SentenceTransformer 임베딩 모델 / CrossEncoder 리랭커를 ONNX 그래프로 내보내기 및 로드
+- 선택적 동적 int8 양자화 (onnxruntime.quantization)
+- 기존 PyTorch 모델과 동일한 호출 인터페이스 제공 (embed_documents / encode / predict)
+- PyTorch 출력과의 일치도(parity) 검사
+"""
+
+import os
+import time
+import traceback
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 기본 설정
+ONNX_CACHE_DIR = "./.cache/onnx"
+ONNX_OPSET = 17
+DEFAULT_ONNX_BATCH_SIZE = 32
+
+try:
+    import onnxruntime as ort
+    ONNX_AVAILABLE = True
+except ImportError:
+    ort = None
+    ONNX_AVAILABLE = False
+
+
+def _model_tag(model_name: str) -> str:
+    return os.path.basename(os.path.normpath(model_name)) or "model"
+
+
+def _onnx_paths(model_name: str, kind: str) -> Tuple[str, str]:
+    """(fp32 그래프 경로, int8 그래프 경로) 반환"""
+    model_dir = os.path.join(ONNX_CACHE_DIR, f"{_model_tag(model_name)}-{kind}")
+    return os.path.join(model_dir, "model.onnx"), os.path.join(model_dir, "model.int8.onnx")
+
+
+def _create_session(onnx_path: str, num_threads: Optional[int] = None) -> "ort.InferenceSession":
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if num_threads:
+        options.intra_op_num_threads = num_threads
+    return ort.InferenceSession(onnx_path, sess_options=options, providers=["CPUExecutionProvider"])
+
+
+def export_transformer_to_onnx(model: Any, tokenizer: Any, output_path: str, output_name: str) -> str:
+    """
+    HuggingFace 트랜스포머 모델을 동적 배치/시퀀스 축을 가진 ONNX 그래프로 내보내기
+
+    Args:
+        model: AutoModel 또는 AutoModelForSequenceClassification 인스턴스
+        tokenizer: 해당 모델의 토크나이저 (입력 이름 결정에 사용)
+        output_path: 저장할 .onnx 경로
+        output_name: 그래프 출력 이름 ("last_hidden_state" 또는 "logits")
+    """
+    import torch
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    sample = tokenizer(["onnx export sample"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+
+    class _Wrapper(torch.nn.Module):
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, *args):
+            outputs = self.inner(**dict(zip(input_names, args)))
+            return outputs[0]
+
+    wrapper = _Wrapper(model).eval().to("cpu")
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes[output_name] = {0: "batch"}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            wrapper,
+            tuple(sample[name] for name in input_names),
+            output_path,
+            input_names=input_names,
+            output_names=[output_name],
+            dynamic_axes=dynamic_axes,
+            opset_version=ONNX_OPSET,
+            do_constant_folding=True,
+        )
+    print(f"ONNX 내보내기 완료: {output_path}")
+    return output_path
+
+
+def quantize_onnx_model(fp32_path: str, int8_path: str) -> str:
+    """가중치 동적 int8 양자화"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    print(f"ONNX int8 동적 양자화 완료: {int8_path}")
+    return int8_path
+
+
+def _prepare_onnx_graph(model_name: str, kind: str, quantize: bool, export_fn: Callable[[str], None]) -> str:
+    """캐시된 그래프가 없으면 내보내기/양자화 후 사용할 그래프 경로 반환"""
+    fp32_path, int8_path = _onnx_paths(model_name, kind)
+    if not os.path.exists(fp32_path):
+        export_fn(fp32_path)
+    if quantize:
+        if not os.path.exists(int8_path):
+            quantize_onnx_model(fp32_path, int8_path)
+        return int8_path
+    return fp32_path
+
+
+class OnnxSentenceEmbedder:
+    """
+    ONNX Runtime 기반 SentenceTransformer 대체 구현
+
+    HuggingFaceEmbeddings(embed_documents / embed_query)와 SentenceTransformer(encode,
+    tokenizer, max_seq_length) 인터페이스를 함께 제공합니다. client 속성은 자기 자신을
+    가리키므로 기존 embeddings_model.client 접근 코드를 그대로 사용할 수 있습니다.
+    """
+
+    def __init__(self, model_name: str, quantize: bool = False, num_threads: Optional[int] = None):
+        from sentence_transformers import SentenceTransformer
+
+        st_model = SentenceTransformer(model_name, device="cpu")
+        transformer = st_model[0]
+        pooling_config = st_model[1].get_config_dict() if len(st_model) > 1 else {}
+
+        self.model_name = model_name
+        self.tokenizer = transformer.tokenizer
+        self.max_seq_length = st_model.max_seq_length or 512
+        self.pooling_mode = "cls" if pooling_config.get("pooling_mode_cls_token") else "mean"
+        self.quantized = quantize
+
+        onnx_path = _prepare_onnx_graph(
+            model_name,
+            "embedding",
+            quantize,
+            lambda path: export_transformer_to_onnx(
+                transformer.auto_model, self.tokenizer, path, "last_hidden_state"
+            ),
+        )
+        self.session = _create_session(onnx_path, num_threads)
+        self._input_names = {inp.name for inp in self.session.get_inputs()}
+        self.client = self
+        del st_model
+        print(f"ONNX 임베딩 모델 로드 완료: {onnx_path} (pooling={self.pooling_mode})")
+
+    def _run(self, texts: List[str]) -> np.ndarray:
+        encoded = self.tokenizer(
+            texts, padding=True, truncation=True, max_length=self.max_seq_length, return_tensors="np"
+        )
+        feeds = {name: encoded[name].astype(np.int64) for name in self._input_names if name in encoded}
+        hidden = self.session.run(None, feeds)[0]
+        if self.pooling_mode == "cls":
+            return hidden[:, 0]
+        mask = encoded["attention_mask"][..., None].astype(np.float32)
+        return (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+    def encode(
+        self,
+        sentences: Sequence[str],
+        batch_size: int = DEFAULT_ONNX_BATCH_SIZE,
+        normalize_embeddings: bool = False,
+        show_progress_bar: bool = False,
+        **kwargs,
+    ) -> np.ndarray:
+        """SentenceTransformer.encode 호환 (numpy 배열 반환)"""
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        outputs = []
+        for i in range(0, len(sentences), batch_size):
+            outputs.append(self._run(list(sentences[i:i + batch_size])))
+        embeddings = np.concatenate(outputs, axis=0) if outputs else np.zeros((0, 0), dtype=np.float32)
+        if normalize_embeddings and embeddings.size:
+            embeddings = embeddings / np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings.astype(np.float32)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """HuggingFaceEmbeddings.embed_documents 호환 (정규화된 임베딩)"""
+        return self.encode(texts, normalize_embeddings=True).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class OnnxCrossEncoder:
+    """ONNX Runtime 기반 CrossEncoder.predict 호환 리랭커"""
+
+    def __init__(self, model_name: str, quantize: bool = False, num_threads: Optional[int] = None, max_length: int = 512):
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+        self.model_name = model_name
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.max_length = max_length
+        self.quantized = quantize
+
+        model = None
+        fp32_path, _ = _onnx_paths(model_name, "reranker")
+        if not os.path.exists(fp32_path):
+            model = AutoModelForSequenceClassification.from_pretrained(model_name)
+            num_labels = model.config.num_labels
+        else:
+            from transformers import AutoConfig
+            num_labels = AutoConfig.from_pretrained(model_name).num_labels
+        # CrossEncoder 기본 활성화 함수와 동일 (레이블 1개면 sigmoid)
+        self.apply_sigmoid = num_labels == 1
+
+        onnx_path = _prepare_onnx_graph(
+            model_name,
+            "reranker",
+            quantize,
+            lambda path: export_transformer_to_onnx(model, self.tokenizer, path, "logits"),
+        )
+        self.session = _create_session(onnx_path, num_threads)
+        self._input_names = {inp.name for inp in self.session.get_inputs()}
+        del model
+        print(f"ONNX 리랭커 모델 로드 완료: {onnx_path}")
+
+    def predict(self, sentences: Sequence[Tuple[str, str]], batch_size: int = DEFAULT_ONNX_BATCH_SIZE, **kwargs) -> np.ndarray:
+        """(쿼리, 문서) 쌍 점수 계산"""
+        if not sentences:
+            return np.zeros((0,), dtype=np.float32)
+        scores = []
+        for i in range(0, len(sentences), batch_size):
+            batch = sentences[i:i + batch_size]
+            encoded = self.tokenizer(
+                [pair[0] for pair in batch],
+                [pair[1] for pair in batch],
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="np",
+            )
+            feeds = {name: encoded[name].astype(np.int64) for name in self._input_names if name in encoded}
+            logits = self.session.run(None, feeds)[0]
+            if logits.ndim == 2 and logits.shape[1] == 1:
+                logits = logits[:, 0]
+            if self.apply_sigmoid:
+                logits = 1.0 / (1.0 + np.exp(-logits))
+            scores.append(logits)
+        return np.concatenate(scores, axis=0).astype(np.float32)
+
+
+# --- PyTorch 출력과의 일치도 검사 ---
+
+PARITY_SAMPLE_TEXTS = [
+    "문서 검색 시스템의 성능을 개선하는 방법",
+    "휴가 신청 절차와 승인 기준은 어떻게 되나요?",
+    "The quarterly report summarizes revenue and operating costs.",
+]
+
+
+def check_embedding_parity(reference: Any, candidate: Any, texts: Optional[List[str]] = None, min_cosine: float = 0.99) -> Dict[str, Any]:
+    """PyTorch 임베딩과 ONNX 임베딩의 코사인 유사도 비교"""
+    texts = texts or PARITY_SAMPLE_TEXTS
+    ref = np.asarray(reference.embed_documents(texts), dtype=np.float32)
+    cand = np.asarray(candidate.embed_documents(texts), dtype=np.float32)
+    cosines = (ref * cand).sum(axis=1) / (
+        np.linalg.norm(ref, axis=1) * np.linalg.norm(cand, axis=1) + 1e-12
+    )
+    result = {
+        "min_cosine": float(cosines.min()),
+        "max_abs_diff": float(np.abs(ref - cand).max()),
+        "passed": bool(cosines.min() >= min_cosine),
+    }
+    print(f"임베딩 ONNX parity 검사: {result}")
+    return result
+
+
+def check_reranker_parity(reference: Any, candidate: Any, query: Optional[str] = None, texts: Optional[List[str]] = None, max_abs_diff: float = 0.05) -> Dict[str, Any]:
+    """PyTorch 리랭커와 ONNX 리랭커의 점수 차이 및 순위 일치 여부 비교"""
+    texts = texts or PARITY_SAMPLE_TEXTS
+    query = query or texts[0]
+    pairs = [(query, text) for text in texts]
+    ref = np.asarray(reference.predict(pairs), dtype=np.float32)
+    cand = np.asarray(candidate.predict(pairs), dtype=np.float32)
+    diff = float(np.abs(ref - cand).max())
+    same_order = bool((np.argsort(-ref) == np.argsort(-cand)).all())
+    result = {
+        "max_abs_diff": diff,
+        "same_ranking": same_order,
+        "passed": bool(diff <= max_abs_diff and same_order),
+    }
+    print(f"리랭커 ONNX parity 검사: {result}")
+    return result
+
+
+def load_onnx_backend(
+    kind: str,
+    model_name: str,
+    quantize: bool = False,
+    reference: Any = None,
+    parity_check: bool = True,
+    num_threads: Optional[int] = None,
+) -> Optional[Any]:
+    """
+    ONNX 백엔드 로드 (실패하거나 parity 검사를 통과하지 못하면 None 반환)
+
+    Args:
+        kind: "embedding" 또는 "reranker"
+        reference: parity 검사 기준이 되는 PyTorch 모델 (None이면 검사 생략)
+    """
+    if not ONNX_AVAILABLE:
+        print("onnxruntime이 설치되어 있지 않아 PyTorch 백엔드를 사용합니다.")
+        return None
+
+    start_time = time.time()
+    try:
+        if kind == "embedding":
+            backend = OnnxSentenceEmbedder(model_name, quantize=quantize, num_threads=num_threads)
+            checker = check_embedding_parity
+        else:
+            backend = OnnxCrossEncoder(model_name, quantize=quantize, num_threads=num_threads)
+            checker = check_reranker_parity
+    except Exception as e:
+        print(f"ONNX {kind} 백엔드 로드 실패, PyTorch 백엔드 사용: {e}")
+        traceback.print_exc()
+        return None
+
+    if parity_check and reference is not None:
+        try:
+            if not checker(reference, backend)["passed"]:
+                print(f"ONNX {kind} 백엔드가 parity 검사를 통과하지 못해 PyTorch 백엔드를 사용합니다.")
+                return None
+        except Exception as e:
+            print(f"ONNX {kind} parity 검사 중 오류 (PyTorch 백엔드 사용): {e}")
+            return None
+
+    print(f"ONNX {kind} 백엔드 준비 완료 ({time.time() - start_time:.2f}초, int8={quantize})")
+    return backend
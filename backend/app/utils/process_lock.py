@@ -0,0 +1,65 @@
+"""
+프로세스 간 소유권 잠금 모듈
+- uvicorn --workers N 처럼 같은 호스트의 여러 API 워커 중 하나만 특정 작업(시작 워밍업, 색인 작업 재처리 등)을 맡도록 선출
+- 잠금 파일에 대한 flock(LOCK_EX | LOCK_NB) 사용: 소유 프로세스가 종료되면 운영체제가 잠금을 자동 해제하므로
+  재시작 후 남은 잠금 파일 때문에 작업이 멈추지 않음
+"""
+
+import os
+from typing import Optional, TextIO
+
+try:
+    import fcntl
+except ImportError:  # Windows: 단일 프로세스 실행으로 간주하고 항상 획득
+    fcntl = None
+
+
+class ProcessLock:
+    """잠금 파일 하나에 대한 비차단 배타 잠금 (획득한 프로세스가 release 또는 종료할 때까지 유지)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file: Optional[TextIO] = None
+
+    @property
+    def held(self) -> bool:
+        return self._file is not None
+
+    def acquire(self) -> bool:
+        """
+        잠금 시도 (대기하지 않음)
+
+        Returns:
+            이 프로세스가 소유하게 되었으면 True (이미 소유 중이어도 True)
+        """
+        if self._file is not None:
+            return True
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        lock_file = open(self.path, "a+", encoding="utf-8")
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+        # 디버깅용 소유 프로세스 기록 (잠금 판단에는 사용하지 않음)
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+        self._file = lock_file
+        return True
+
+    def release(self) -> None:
+        """잠금 해제 (잠금 파일은 남겨 두어 다른 프로세스가 같은 파일로 계속 경쟁하도록 함)"""
+        if self._file is None:
+            return
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            except OSError:
+                pass
+        self._file.close()
+        self._file = None
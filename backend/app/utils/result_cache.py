@@ -0,0 +1,351 @@
+"""
+요청 간에 공유되는 프로세스 전역 검색/리랭킹 결과 캐시 모듈
+- (정규화된 쿼리, 카테고리, 인덱스 세대) 기반 캐시 키
+- OrderedDict 기반 O(1) LRU 제거
+- 항목 수 및 바이트 크기 제한
+- 적중/미스 통계
+- 인덱스 세대를 Redis에 공유하여 여러 API 워커 프로세스(uvicorn --workers N)가 함께 무효화
+"""
+
+import re
+import sys
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+# 기본 캐시 설정
+DEFAULT_MAX_ENTRIES = 2000
+DEFAULT_MAX_BYTES = 128 * 1024 * 1024  # 128MB
+DEFAULT_TTL = 7200  # 2시간
+GENERATION_SYNC_INTERVAL = 1.0  # 다른 워커의 무효화를 확인하는 최소 간격 (초)
+GENERATION_STORE_RETRY_SECONDS = 30.0  # Redis 연결 실패 후 재시도까지 대기 (그동안 프로세스 로컬 세대만 사용)
+
+
+def normalize_query(query: str) -> str:
+    """캐시 키용 쿼리 정규화 (소문자 변환 및 공백 압축)"""
+    if not query:
+        return ""
+    return re.sub(r"\s+", " ", query.lower()).strip()
+
+
+def estimate_size(value: Any, _depth: int = 0) -> int:
+    """캐시 값의 대략적인 메모리 크기(바이트) 추정"""
+    if _depth > 6:
+        return sys.getsizeof(value)
+    if isinstance(value, str):
+        return len(value.encode("utf-8")) + 49
+    if isinstance(value, (bytes, bytearray)):
+        return len(value) + 33
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            estimate_size(k, _depth + 1) + estimate_size(v, _depth + 1) for k, v in value.items()
+        )
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(estimate_size(v, _depth + 1) for v in value)
+    if hasattr(value, "nbytes"):  # numpy 배열
+        return int(value.nbytes) + 112
+    if hasattr(value, "page_content") and hasattr(value, "metadata"):  # langchain Document
+        return estimate_size(value.page_content, _depth + 1) + estimate_size(value.metadata, _depth + 1) + 64
+    return sys.getsizeof(value)
+
+
+class RedisGenerationStore:
+    """
+    프로세스 간 인덱스 세대 저장소 (Redis 해시 하나에 전체/카테고리별 세대 저장)
+
+    무효화한 워커는 HINCRBY로 세대를 올리고, 다른 워커는 캐시 조회 시 HGETALL로 읽어
+    자신의 세대보다 크면 같은 무효화를 로컬에 적용합니다.
+    """
+
+    KEY = "result_cache:generations"
+    GLOBAL_FIELD = "__all__"
+
+    def __init__(self, retry_seconds: float = GENERATION_STORE_RETRY_SECONDS):
+        self.retry_seconds = retry_seconds
+        self._unavailable_until = 0.0
+
+    def _client(self) -> Any:
+        if time.time() < self._unavailable_until:
+            return None
+        from app.utils.cache_utils import RedisCache
+
+        client = RedisCache.get_client()
+        if client is None:
+            self._unavailable_until = time.time() + self.retry_seconds
+        return client
+
+    def _failed(self, e: Exception) -> None:
+        print(f"캐시 세대 공유 저장소(Redis) 오류 - {self.retry_seconds:.0f}초 동안 로컬 세대만 사용: {e}")
+        self._unavailable_until = time.time() + self.retry_seconds
+
+    def incr(self, category: Optional[str]) -> Optional[int]:
+        """세대 증가 후 새 값 반환 (category=None이면 전체 세대, 실패 시 None)"""
+        client = self._client()
+        if client is None:
+            return None
+        try:
+            return int(client.hincrby(self.KEY, category or self.GLOBAL_FIELD, 1))
+        except Exception as e:
+            self._failed(e)
+            return None
+
+    def read(self) -> Optional[Tuple[int, Dict[str, int]]]:
+        """(전체 세대, 카테고리별 세대) 반환 (실패 시 None)"""
+        client = self._client()
+        if client is None:
+            return None
+        try:
+            values = {field: int(value) for field, value in (client.hgetall(self.KEY) or {}).items()}
+        except Exception as e:
+            self._failed(e)
+            return None
+        return values.pop(self.GLOBAL_FIELD, 0), values
+
+
+class SharedResultCache:
+    """
+    프로세스 전역에서 공유되는 LRU 결과 캐시
+
+    카테고리마다 인덱스 세대(generation) 번호를 관리하며, 문서 업로드/삭제 시
+    세대를 올려 이전 결과가 더 이상 조회되지 않도록 합니다.
+    generation_store가 있으면 세대를 프로세스 간에 공유하여 다른 워커의 무효화도 반영합니다.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttl: int = DEFAULT_TTL,
+        generation_store: Optional[RedisGenerationStore] = None,
+        sync_interval: float = GENERATION_SYNC_INTERVAL,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.generation_store = generation_store
+        self.sync_interval = sync_interval
+        self._last_sync = 0.0
+
+        # key -> (value, size_bytes, timestamp, category)
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int, float, Optional[str]]]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.RLock()
+
+        # 인덱스 세대 정보 (전체 세대 + 카테고리별 세대)
+        self._global_generation = 0
+        self._category_generations: Dict[str, int] = {}
+
+        # 무효화 시 호출할 리스너 (category 또는 None=전체)
+        self._invalidation_listeners: List[Callable[[Optional[str]], None]] = []
+
+        # 통계
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    # --- 세대 및 키 관리 ---
+
+    def generation(self, category: Optional[str] = None) -> Tuple[int, int]:
+        """현재 인덱스 세대 반환 (전체 세대, 카테고리 세대)"""
+        self._sync_generations()
+        with self._lock:
+            return self._global_generation, self._category_generations.get(category or "", 0)
+
+    def make_key(self, namespace: str, query: str, category: Optional[str], *extra: Hashable) -> Tuple:
+        """(네임스페이스, 정규화 쿼리, 카테고리, 세대, 추가 식별자) 형태의 캐시 키 생성"""
+        return (namespace, normalize_query(query), category, self.generation(category)) + tuple(extra)
+
+    # --- 조회 / 저장 ---
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """캐시 조회 (적중 시 LRU 위치 갱신)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            value, size, timestamp, _category = entry
+            if time.time() - timestamp >= self.ttl:
+                self._remove(key)
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, category: Optional[str] = None, size_bytes: Optional[int] = None) -> bool:
+        """캐시 저장 (크기 제한 초과 시 가장 오래 사용되지 않은 항목부터 제거)"""
+        size = size_bytes if size_bytes is not None else estimate_size(value)
+        if size > self.max_bytes:
+            return False
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (value, size, time.time(), category)
+            self._total_bytes += size
+
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes
+            ):
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self._evictions += 1
+        return True
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry[1]
+
+    # --- 무효화 ---
+
+    def add_invalidation_listener(self, listener: Callable[[Optional[str]], None]) -> None:
+        """카테고리 무효화 시 함께 호출될 콜백 등록 (다른 캐시 계층 연동용)"""
+        with self._lock:
+            self._invalidation_listeners.append(listener)
+
+    def _sync_generations(self) -> None:
+        """
+        공유 저장소의 세대가 로컬과 다르면 다른 워커가 수행한 무효화를 로컬에 적용
+
+        크기 비교가 아닌 불일치로 판단하므로 Redis가 초기화되어 세대가 되돌아간 경우에도 무효화 후 공유 값을 따릅니다.
+        """
+        now = time.time()
+        if self.generation_store is None or now - self._last_sync < self.sync_interval:
+            return
+        self._last_sync = now
+        shared = self.generation_store.read()
+        if shared is None:
+            return
+        global_generation, category_generations = shared
+        if global_generation != self._global_generation:
+            self._invalidate_all_local(global_generation)
+        for category in set(category_generations) | set(self._category_generations):
+            generation = category_generations.get(category, 0)
+            if generation != self._category_generations.get(category, 0):
+                self._invalidate_category_local(category, generation)
+
+    def invalidate_category(self, category: str) -> int:
+        """카테고리의 인덱스 세대를 올리고 해당 카테고리 항목을 제거 (공유 저장소가 있으면 다른 워커에도 전파)"""
+        generation = self.generation_store.incr(category) if self.generation_store else None
+        if generation is None:
+            with self._lock:
+                generation = self._category_generations.get(category, 0) + 1
+        return self._invalidate_category_local(category, generation)
+
+    def _invalidate_category_local(self, category: str, generation: int) -> int:
+        with self._lock:
+            self._category_generations[category] = generation
+            stale_keys = [k for k, entry in self._entries.items() if entry[3] == category]
+            for key in stale_keys:
+                self._remove(key)
+            self._invalidations += 1
+            listeners = list(self._invalidation_listeners)
+
+        self._notify_listeners(listeners, category)
+        print(f"공유 결과 캐시 무효화: 카테고리 '{category}', 제거 {len(stale_keys)}개")
+        return len(stale_keys)
+
+    def invalidate_all(self) -> int:
+        """전체 세대를 올리고 모든 항목 제거 (공유 저장소가 있으면 다른 워커에도 전파)"""
+        generation = self.generation_store.incr(None) if self.generation_store else None
+        if generation is None:
+            with self._lock:
+                generation = self._global_generation + 1
+        return self._invalidate_all_local(generation)
+
+    def _invalidate_all_local(self, generation: int) -> int:
+        with self._lock:
+            removed = len(self._entries)
+            self._global_generation = generation
+            self._entries.clear()
+            self._total_bytes = 0
+            self._invalidations += 1
+            listeners = list(self._invalidation_listeners)
+
+        self._notify_listeners(listeners, None)
+        print(f"공유 결과 캐시 전체 무효화: 제거 {removed}개")
+        return removed
+
+    @staticmethod
+    def _notify_listeners(listeners: List[Callable[[Optional[str]], None]], category: Optional[str]) -> None:
+        for listener in listeners:
+            try:
+                listener(category)
+            except Exception as e:
+                print(f"캐시 무효화 리스너 실행 중 오류 (무시됨): {e}")
+
+    # --- 통계 ---
+
+    def get_stats(self) -> Dict[str, Any]:
+        """캐시 사용량 및 적중률 통계 반환"""
+        with self._lock:
+            total_requests = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "size_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / total_requests, 4) if total_requests else 0.0,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+                "global_generation": self._global_generation,
+                "category_generations": dict(self._category_generations),
+            }
+
+
+_shared_result_cache: Optional[SharedResultCache] = None
+_shared_result_cache_lock = threading.Lock()
+
+
+def get_shared_result_cache() -> SharedResultCache:
+    """
+    프로세스 전역 SharedResultCache 인스턴스 반환
+
+    인덱스 세대는 Redis로 워커 간에 공유되며, 리랭크 점수 캐시와 의미 기반 답변 캐시는
+    이 캐시의 무효화 리스너이므로 다른 워커의 무효화가 함께 전파됩니다.
+    """
+    global _shared_result_cache
+
+    if _shared_result_cache is None:
+        with _shared_result_cache_lock:
+            if _shared_result_cache is None:
+                _shared_result_cache = SharedResultCache(generation_store=RedisGenerationStore())
+    return _shared_result_cache
+
+
+# 리랭커 (쿼리, 청크) 쌍 점수 캐시 설정 - 항목이 작고 많으므로 결과 캐시와 별도로 제한
+RERANK_SCORE_MAX_ENTRIES = 50000
+RERANK_SCORE_MAX_BYTES = 32 * 1024 * 1024  # 32MB
+
+_rerank_score_cache: Optional[SharedResultCache] = None
+
+
+def get_rerank_score_cache() -> SharedResultCache:
+    """
+    리랭커 쌍 점수 캐시 인스턴스 반환
+
+    공유 결과 캐시의 무효화 리스너로 등록되어 문서 업로드/삭제 시 함께 무효화됩니다.
+    """
+    global _rerank_score_cache
+
+    if _rerank_score_cache is None:
+        shared = get_shared_result_cache()
+        with _shared_result_cache_lock:
+            if _rerank_score_cache is None:
+                cache = SharedResultCache(
+                    max_entries=RERANK_SCORE_MAX_ENTRIES, max_bytes=RERANK_SCORE_MAX_BYTES
+                )
+                shared.add_invalidation_listener(
+                    lambda category: cache.invalidate_category(category) if category else cache.invalidate_all()
+                )
+                _rerank_score_cache = cache
+    return _rerank_score_cache
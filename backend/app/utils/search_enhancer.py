@@ -111,8 +111,8 @@ class SearchScoreEnhancer:
         
         # 결과 점수 보정
         for doc in documents:
-            # 기본 관련성 점수 (기존 ES 또는 리랭커 점수)
-            base_score = doc.metadata.get("relevance_score", 0)
+            # 기본 관련성 점수 (기존 ES 또는 리랭커 점수, kNN 모드는 RRF 융합 점수)
+            base_score = doc.metadata.get("relevance_score", doc.metadata.get("fusion_score", 0))
             
             # 텍스트 컨텐츠
             content = doc.page_content
@@ -244,6 +244,65 @@ class ContextualReranker:
         return ranked_docs
 
 
+def reciprocal_rank_fusion(
+    ranked_lists: List[List[str]],
+    k: int = 60,
+    weights: Optional[List[float]] = None,
+) -> List[Tuple[str, float]]:
+    """
+    RRF(Reciprocal Rank Fusion)로 여러 순위 목록을 하나로 결합
+
+    Args:
+        ranked_lists: 문서 ID 목록들 (각 목록은 순위 순서)
+        k: 순위 평활 상수 (기본 60)
+        weights: 목록별 가중치 (None이면 모두 1.0)
+
+    Returns:
+        (문서 ID, 결합 점수) 목록 (점수 내림차순)
+    """
+    if weights is None:
+        weights = [1.0] * len(ranked_lists)
+
+    fused_scores: Dict[str, float] = {}
+    for ranked_ids, weight in zip(ranked_lists, weights):
+        for rank, doc_id in enumerate(ranked_ids, start=1):
+            fused_scores[doc_id] = fused_scores.get(doc_id, 0.0) + weight / (k + rank)
+
+    return sorted(fused_scores.items(), key=lambda x: x[1], reverse=True)
+
+
+def weighted_linear_fusion(
+    scored_lists: List[Dict[str, float]],
+    weights: Optional[List[float]] = None,
+) -> List[Tuple[str, float]]:
+    """
+    목록별 점수를 min-max 정규화한 뒤 가중합으로 결합
+
+    Args:
+        scored_lists: {문서 ID: 원본 점수} 딕셔너리 목록
+        weights: 목록별 가중치 (None이면 균등 가중치)
+
+    Returns:
+        (문서 ID, 결합 점수) 목록 (점수 내림차순)
+    """
+    if weights is None:
+        weights = [1.0 / len(scored_lists)] * len(scored_lists) if scored_lists else []
+
+    fused_scores: Dict[str, float] = {}
+    for scores, weight in zip(scored_lists, weights):
+        if not scores:
+            continue
+        max_score = max(scores.values())
+        min_score = min(scores.values())
+        score_range = max_score - min_score
+        for doc_id, score in scores.items():
+            # 점수가 모두 같으면 1.0으로 간주 (해당 목록에 포함된 것 자체가 신호)
+            normalized = (score - min_score) / score_range if score_range > 0 else 1.0
+            fused_scores[doc_id] = fused_scores.get(doc_id, 0.0) + weight * normalized
+
+    return sorted(fused_scores.items(), key=lambda x: x[1], reverse=True)
+
+
 class EnhancedSearchPipeline:
     """
     개선된 검색 파이프라인 클래스
@@ -259,12 +318,16 @@ class EnhancedSearchPipeline:
         
     def process(self, 
                 query: str, 
-                search_results: List[Document]) -> Tuple[Dict[str, Any], List[Document]]:
+                search_results: List[Document],
+                query_info: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, Any], List[Document]]:
         """
         검색 결과 개선 파이프라인 실행
+
+        query_info: 검색 전에 이미 확장한 쿼리 정보 (없으면 여기서 확장)
         """
-        # 1. 쿼리 확장 및 변형
-        query_info = self.query_expander.expand_query(query)
+        # 1. 쿼리 확장 및 변형 (다중 변형 검색에서 이미 확장한 경우 재사용)
+        if query_info is None:
+            query_info = self.query_expander.expand_query(query)
         
         # 2. 검색 결과 점수 보정
         enhanced_results = self.score_enhancer.enhance_scores(search_results, query_info)
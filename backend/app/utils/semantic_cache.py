@@ -0,0 +1,228 @@
+"""
+의미 기반 답변 캐시 모듈
+- 카테고리별 질문 임베딩 인덱스 (정규화 float32 행렬, 내적 = 코사인 유사도)
+- 유사도가 임계값 이상이면 캐시된 답변 반환 (표현만 다른 질문 재사용)
+- 정규화 질문이 같으면 임베딩 비교 없이 바로 적중
+- 공유 결과 캐시의 무효화 리스너로 등록되어 문서 업로드/삭제 시 해당 카테고리 제거
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.utils.result_cache import get_shared_result_cache, normalize_query
+
+# 기본 캐시 설정
+DEFAULT_SIMILARITY_THRESHOLD = 0.95
+DEFAULT_MAX_ENTRIES_PER_CATEGORY = 1000
+DEFAULT_TTL = 7200  # 2시간 (CACHE_TTL_CHAT과 동일)
+
+
+class _CategoryIndex:
+    """카테고리 하나의 질문 임베딩 행렬과 답변 목록"""
+
+    def __init__(self, dim: int, capacity: int):
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.entries: List[Optional[Dict[str, Any]]] = [None] * capacity
+        self.exact: Dict[str, int] = {}  # 정규화 질문 -> 행 번호
+        self.order: "OrderedDict[int, None]" = OrderedDict()  # LRU 순서 (행 번호)
+        self.free: List[int] = list(range(capacity - 1, -1, -1))
+
+    def remove(self, row: int) -> None:
+        entry = self.entries[row]
+        if entry is None:
+            return
+        self.exact.pop(entry["normalized"], None)
+        self.entries[row] = None
+        self.vectors[row] = 0.0
+        self.order.pop(row, None)
+        self.free.append(row)
+
+
+class SemanticAnswerCache:
+    """
+    카테고리별 의미 기반 답변 캐시
+
+    카테고리당 항목 수가 작으므로(기본 1000개) 전체 행렬 내적으로 최근접 질문을 찾습니다.
+    """
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+        max_entries_per_category: int = DEFAULT_MAX_ENTRIES_PER_CATEGORY,
+        ttl: int = DEFAULT_TTL,
+    ):
+        self.threshold = threshold
+        self.max_entries = max(1, max_entries_per_category)
+        self.ttl = ttl
+
+        self._indexes: Dict[str, _CategoryIndex] = {}
+        self._lock = threading.Lock()
+
+        # 통계
+        self._exact_hits = 0
+        self._semantic_hits = 0
+        self._misses = 0
+        self._stale_skips = 0
+        self._invalidations = 0
+
+    @staticmethod
+    def _normalize_vector(embedding: Any) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vector))
+        if vector.size == 0 or norm == 0.0:
+            return None
+        return vector / norm
+
+    def _expired(self, entry: Dict[str, Any]) -> bool:
+        return time.time() - entry["timestamp"] >= self.ttl
+
+    # --- 조회 / 저장 ---
+
+    def lookup(self, question: str, category: Optional[str], embedding: Any = None) -> Optional[Tuple[Dict[str, Any], float, str]]:
+        """
+        캐시된 답변 조회
+
+        Args:
+            embedding: 질문 임베딩 (None이면 정규화 질문 일치만 확인)
+
+        Returns:
+            (답변 데이터, 유사도, 일치한 원래 질문) 또는 None
+        """
+        normalized = normalize_query(question)
+        with self._lock:
+            index = self._indexes.get(category or "")
+            if index is None:
+                self._misses += 1
+                return None
+
+            row = index.exact.get(normalized)
+            if row is not None:
+                entry = index.entries[row]
+                if not self._expired(entry):
+                    index.order.move_to_end(row)
+                    self._exact_hits += 1
+                    return entry["payload"], 1.0, entry["question"]
+                index.remove(row)
+
+            vector = self._normalize_vector(embedding) if embedding is not None else None
+            if vector is None or not index.order or vector.shape[0] != index.vectors.shape[1]:
+                self._misses += 1
+                return None
+
+            similarities = index.vectors @ vector
+            row = int(np.argmax(similarities))
+            similarity = float(similarities[row])
+            entry = index.entries[row]
+            if entry is None or similarity < self.threshold:
+                self._misses += 1
+                return None
+            if self._expired(entry):
+                index.remove(row)
+                self._misses += 1
+                return None
+
+            index.order.move_to_end(row)
+            self._semantic_hits += 1
+            return entry["payload"], similarity, entry["question"]
+
+    def add(
+        self,
+        question: str,
+        category: Optional[str],
+        embedding: Any,
+        payload: Dict[str, Any],
+        generation: Optional[Tuple[int, int]] = None,
+    ) -> bool:
+        """
+        답변 저장
+
+        Args:
+            generation: 답변 생성을 시작할 때의 인덱스 세대 (그 사이 문서가 바뀌었으면 저장하지 않음)
+        """
+        vector = self._normalize_vector(embedding)
+        if vector is None:
+            return False
+        if generation is not None and generation != get_shared_result_cache().generation(category):
+            with self._lock:
+                self._stale_skips += 1
+            return False
+
+        normalized = normalize_query(question)
+        key = category or ""
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is None or index.vectors.shape[1] != vector.shape[0]:
+                index = _CategoryIndex(vector.shape[0], self.max_entries)
+                self._indexes[key] = index
+
+            existing = index.exact.get(normalized)
+            if existing is not None:
+                index.remove(existing)
+            if not index.free:
+                # 가장 오래 사용되지 않은 항목 제거
+                index.remove(next(iter(index.order)))
+
+            row = index.free.pop()
+            index.vectors[row] = vector
+            index.entries[row] = {
+                "question": question,
+                "normalized": normalized,
+                "payload": payload,
+                "timestamp": time.time(),
+            }
+            index.exact[normalized] = row
+            index.order[row] = None
+            return True
+
+    # --- 무효화 ---
+
+    def invalidate(self, category: Optional[str] = None) -> None:
+        """카테고리 (None이면 전체) 항목 제거"""
+        with self._lock:
+            if category is None:
+                self._indexes.clear()
+            else:
+                self._indexes.pop(category, None)
+            self._invalidations += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self._exact_hits + self._semantic_hits
+            total = hits + self._misses
+            return {
+                "threshold": self.threshold,
+                "categories": {key: len(index.order) for key, index in self._indexes.items()},
+                "max_entries_per_category": self.max_entries,
+                "exact_hits": self._exact_hits,
+                "semantic_hits": self._semantic_hits,
+                "misses": self._misses,
+                "hit_rate": round(hits / total, 4) if total else 0.0,
+                "stale_skips": self._stale_skips,
+                "invalidations": self._invalidations,
+            }
+
+
+_semantic_cache: Optional[SemanticAnswerCache] = None
+_semantic_cache_lock = threading.Lock()
+
+
+def get_semantic_cache(threshold: float = DEFAULT_SIMILARITY_THRESHOLD) -> SemanticAnswerCache:
+    """
+    프로세스 전역 SemanticAnswerCache 인스턴스 반환
+
+    공유 결과 캐시의 무효화 리스너로 등록되어 문서 업로드/삭제 시 함께 무효화됩니다.
+    """
+    global _semantic_cache
+
+    if _semantic_cache is None:
+        shared = get_shared_result_cache()
+        with _semantic_cache_lock:
+            if _semantic_cache is None:
+                cache = SemanticAnswerCache(threshold=threshold)
+                shared.add_invalidation_listener(cache.invalidate)
+                _semantic_cache = cache
+    return _semantic_cache
@@ -0,0 +1,160 @@
+"""
+동일 요청 단일 실행(single-flight) 모듈
+- 같은 키의 요청이 처리 중이면 새 작업을 시작하지 않고 진행 중인 스트림을 구독
+- 리더 요청의 SSE 프레임을 모든 구독자에게 전달 (늦게 합류한 구독자는 이전 프레임부터 재생)
+- 구독자가 모두 연결을 끊으면 abandoned 상태가 되어 리더가 생성을 취소할 수 있음
+"""
+
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, Hashable, List, Optional, Set, Tuple
+
+
+class Flight:
+    """진행 중인 요청 하나의 프레임 버퍼와 구독자 목록 (이벤트 루프 스레드에서만 사용)"""
+
+    def __init__(self, key: Hashable, group: "SingleFlightGroup"):
+        self.key = key
+        self.group = group
+        self.created_at = time.time()
+        self.followers = 0
+
+        self._frames: List[str] = []
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._source: Optional[AsyncIterator[str]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._attached = asyncio.Event()
+        self._subscribed_once = False
+        self._done = False
+
+    @property
+    def attached(self) -> bool:
+        """리더가 스트림을 연결했는지 여부"""
+        return self._attached.is_set()
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    @property
+    def abandoned(self) -> bool:
+        """구독자가 한 번 이상 있었고 지금은 모두 연결을 끊은 상태"""
+        return self._subscribed_once and not self._subscribers
+
+    # --- 리더 측 ---
+
+    def attach(self, source: AsyncIterator[str]) -> None:
+        """리더의 SSE 제너레이터 연결 (첫 구독 시 실행 시작)"""
+        self._source = source
+        self._attached.set()
+
+    def abort(self) -> None:
+        """스트림을 연결하지 못한 채 종료 (대기 중인 후속 요청은 직접 처리)"""
+        self._finish()
+
+    async def _pump(self) -> None:
+        try:
+            async for frame in self._source:
+                self._publish(frame)
+        except Exception as e:
+            print(f"single-flight 스트림 처리 중 오류 ({self.key}): {e}")
+        finally:
+            self._finish()
+
+    def _publish(self, frame: str) -> None:
+        self._frames.append(frame)
+        for queue in self._subscribers:
+            queue.put_nowait(frame)
+
+    def _finish(self) -> None:
+        if self._done:
+            return
+        self._done = True
+        # 다음 요청은 새 flight로 처리 (완료된 답변은 응답 캐시가 담당)
+        self.group._remove(self)
+        self._attached.set()
+        for queue in self._subscribers:
+            queue.put_nowait(None)
+
+    # --- 구독자 측 ---
+
+    async def wait_attached(self, timeout: Optional[float] = None) -> bool:
+        """
+        리더가 스트림을 연결할 때까지 대기
+
+        Returns:
+            True: 구독 가능 / False: 리더가 스트림 없이 종료되었거나 시간 초과
+        """
+        try:
+            await asyncio.wait_for(self._attached.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        return self._source is not None
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        """지금까지의 프레임을 재생한 뒤 새 프레임을 순서대로 전달"""
+        queue: asyncio.Queue = asyncio.Queue()
+        replay = list(self._frames)
+        finished = self._done
+        if not finished:
+            self._subscribers.add(queue)
+            self._subscribed_once = True
+            if self._task is None and self._source is not None:
+                self._task = asyncio.create_task(self._pump())
+
+        try:
+            for frame in replay:
+                yield frame
+            if finished:
+                return
+            while True:
+                frame = await queue.get()
+                if frame is None:
+                    return
+                yield frame
+        finally:
+            self._subscribers.discard(queue)
+
+
+class SingleFlightGroup:
+    """키별 진행 중 요청(Flight) 관리"""
+
+    def __init__(self, name: str = "single-flight"):
+        self.name = name
+        self._flights: Dict[Hashable, Flight] = {}
+
+        # 통계
+        self._leaders = 0
+        self._followers = 0
+
+    def join(self, key: Hashable) -> Tuple[Flight, bool]:
+        """
+        키에 해당하는 진행 중 요청에 합류하거나 새로 시작
+
+        Returns:
+            (flight, 리더 여부)
+        """
+        flight = self._flights.get(key)
+        if flight is not None and not flight.done:
+            flight.followers += 1
+            self._followers += 1
+            return flight, False
+
+        flight = Flight(key, self)
+        self._flights[key] = flight
+        self._leaders += 1
+        return flight, True
+
+    def _remove(self, flight: Flight) -> None:
+        if self._flights.get(flight.key) is flight:
+            del self._flights[flight.key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "in_flight": len(self._flights),
+            "leaders": self._leaders,
+            "followers": self._followers,
+            "coalesced_rate": round(self._followers / (self._leaders + self._followers), 4)
+            if (self._leaders + self._followers) else 0.0,
+        }
@@ -7,6 +7,8 @@ from typing import Dict, List, Optional, Any, Union, Tuple
 from transformers import AutoTokenizer, AutoModelForCausalLM, BitsAndBytesConfig
 import datetime
 
+from app.utils.model_residency import GB, get_model_residency_manager
+
 # MariaDB 연결 설정
 DB_CONFIG = {
     "host": "localhost",
@@ -21,6 +23,10 @@ DB_CONFIG = {
 # SQLCoder 모델 경로
 SQLCODER_MODEL_PATH = "/home/root/llama-3-sqlcoder-8b"
 
+# SQLCoder 상주 관리 (처음 사용할 때 로드, 유휴 시간 초과 시 해제)
+SQLCODER_RESIDENCY_NAME = "sqlcoder"
+SQLCODER_ESTIMATED_GB = float(os.environ.get("SQLCODER_ESTIMATED_GB", "6"))  # 첫 로드 전 예산 확인용 예상 메모리 (8B 4bit)
+
 # SQLCoder 시스템 프롬프트
 SQLCODER_SYSTEM_PROMPT = """
 너는 MariaDB 8.0 SQL 전문가입니다. 주어진 스키마 정보를 바탕으로 사용자의 자연어 질문을 SQL 쿼리로 변환해주세요.
@@ -102,22 +108,11 @@ TABLE_KR_MAPPING = {
     "inquiry_responses": ["답변", "응답", "문의응답", "문의답변"]
 }
 
-# 로컬 변수로 모델과 토크나이저 저장
-_sqlcoder_model = None
-_sqlcoder_tokenizer = None
-
-
-def load_sqlcoder_model():
+def _load_sqlcoder_weights():
     """
-    SQLCoder 모델과 토크나이저를 로드합니다.
-    처음 호출시에만 로드하고, 이후에는 캐시된 모델을 반환합니다.
+    SQLCoder 모델과 토크나이저를 디스크에서 로드합니다.
+    (상주 관리자가 호출하며, 모델 참조는 상주 관리자만 보관)
     """
-    global _sqlcoder_model, _sqlcoder_tokenizer
-    
-    # 이미 로드된 모델이 있으면 재사용
-    if _sqlcoder_model is not None and _sqlcoder_tokenizer is not None:
-        return _sqlcoder_model, _sqlcoder_tokenizer
-    
     try:
         print(f"SQLCoder 모델 로드 시작: {SQLCODER_MODEL_PATH}")
         
@@ -156,9 +151,6 @@ def load_sqlcoder_model():
         if torch.cuda.is_available():
             print(f"GPU 메모리 사용량: {torch.cuda.memory_allocated() / 1024**3:.2f} GB")
         
-        _sqlcoder_model = model
-        _sqlcoder_tokenizer = tokenizer
-        
         print("SQLCoder 모델 로드 완료")
         return model, tokenizer
     
@@ -168,6 +160,26 @@ def load_sqlcoder_model():
         return None, None
 
 
+get_model_residency_manager().register(
+    SQLCODER_RESIDENCY_NAME, _load_sqlcoder_weights, estimated_bytes=int(SQLCODER_ESTIMATED_GB * GB)
+)
+
+
+def load_sqlcoder_model():
+    """
+    SQLCoder 모델과 토크나이저를 반환합니다.
+    상주하지 않으면 로드하며, 반환된 참조를 오래 보관하면 유휴 해제가 되지 않으므로
+    생성 중에는 get_model_residency_manager().use(SQLCODER_RESIDENCY_NAME)를 사용하세요.
+    """
+    residency = get_model_residency_manager()
+    try:
+        with residency.use(SQLCODER_RESIDENCY_NAME) as (model, tokenizer):
+            return model, tokenizer
+    except Exception as e:
+        print(f"SQLCoder 모델 로드 실패: {e}")
+        return None, None
+
+
 def preprocess_korean_query(question: str) -> str:
     """
     한국어 질문을 전처리하여 SQL 생성에 유리한 형태로 변환합니다.
@@ -414,15 +426,17 @@ def generate_sql_with_sqlcoder(question: str, schema: str = None) -> str:
                 print(f"스키마 정보 로드 오류: {schema}")
                 schema = "# 데이터베이스 스키마 로드 실패\n기본 테이블 정보를 바탕으로 SQL을 생성합니다."
         
-        # 모델과 토크나이저 로드
-        model, tokenizer = load_sqlcoder_model()
-        
-        if model is None or tokenizer is None:
-            print("SQLCoder 모델 로드 실패")
+        # 모델과 토크나이저 로드 (생성이 끝날 때까지 해제되지 않도록 고정)
+        residency = get_model_residency_manager()
+        try:
+            model, tokenizer = residency.acquire(SQLCODER_RESIDENCY_NAME)
+        except Exception as load_error:
+            print(f"SQLCoder 모델 로드 실패: {load_error}")
             return "-- SQLCoder 모델 로드 실패"
         
-        # SQLCoder 프롬프트 생성
-        prompt = f"""### 마리아디비(MariaDB) 스키마:
+        try:
+            # SQLCoder 프롬프트 생성
+            prompt = f"""### 마리아디비(MariaDB) 스키마:
 {schema}
 
 ### 사용자 질문:
@@ -431,48 +445,50 @@ def generate_sql_with_sqlcoder(question: str, schema: str = None) -> str:
 ### 마리아디비(MariaDB) SQL 쿼리:
 """
         
-        print(f"SQLCoder 프롬프트 생성 완료 (길이: {len(prompt)} 문자)")
-        
-        # 모델 입력 토큰화 및 생성
-        inputs = tokenizer(prompt, return_tensors="pt").to(model.device)
-        
-        # 생성 설정
-        with torch.no_grad():
-            generation_config = {
-                "max_new_tokens": 1024,
-                "temperature": 0.0,  # 온도 0으로 설정 (결정적인 출력)
-                "repetition_penalty": 1.1,
-                "num_return_sequences": 1,
-                "pad_token_id": tokenizer.eos_token_id,
-                "do_sample": False  # 샘플링 비활성화
-            }
+            print(f"SQLCoder 프롬프트 생성 완료 (길이: {len(prompt)} 문자)")
+        
+            # 모델 입력 토큰화 및 생성
+            inputs = tokenizer(prompt, return_tensors="pt").to(model.device)
+        
+            # 생성 설정
+            with torch.no_grad():
+                generation_config = {
+                    "max_new_tokens": 1024,
+                    "temperature": 0.0,  # 온도 0으로 설정 (결정적인 출력)
+                    "repetition_penalty": 1.1,
+                    "num_return_sequences": 1,
+                    "pad_token_id": tokenizer.eos_token_id,
+                    "do_sample": False  # 샘플링 비활성화
+                }
             
-            try:
-                # SQL 생성
-                outputs = model.generate(**inputs, **generation_config)
+                try:
+                    # SQL 생성
+                    outputs = model.generate(**inputs, **generation_config)
                 
-                # 생성된 텍스트 디코딩
-                sql = tokenizer.decode(outputs[0], skip_special_tokens=True)[len(prompt):]
+                    # 생성된 텍스트 디코딩
+                    sql = tokenizer.decode(outputs[0], skip_special_tokens=True)[len(prompt):]
                 
-                # 결과 정리 (주석, 여러 쿼리 등 제거)
-                sql = sql.strip()
+                    # 결과 정리 (주석, 여러 쿼리 등 제거)
+                    sql = sql.strip()
                 
-                # 추가 쿼리나 주석 제거 (첫 번째 '--;' 또는 ';' 이후 텍스트 제거)
-                for delimiter in ["--;", ";"]:
-                    pos = sql.find(delimiter)
-                    if pos > 0:
-                        # 첫 번째 구분자 위치에서 자르기
-                        sql = sql[:pos + 1]
-                        break
+                    # 추가 쿼리나 주석 제거 (첫 번째 '--;' 또는 ';' 이후 텍스트 제거)
+                    for delimiter in ["--;", ";"]:
+                        pos = sql.find(delimiter)
+                        if pos > 0:
+                            # 첫 번째 구분자 위치에서 자르기
+                            sql = sql[:pos + 1]
+                            break
                 
-                # 마지막에 세미콜론 추가되어 있지 않으면 추가
-                if not sql.endswith(";"):
-                    sql += ";"
+                    # 마지막에 세미콜론 추가되어 있지 않으면 추가
+                    if not sql.endswith(";"):
+                        sql += ";"
                 
-                return sql
-            except Exception as gen_error:
-                print(f"SQL 생성 중 오류: {str(gen_error)}")
-                return f"-- SQL 생성 중 오류 발생: {str(gen_error)}"
+                    return sql
+                except Exception as gen_error:
+                    print(f"SQL 생성 중 오류: {str(gen_error)}")
+                    return f"-- SQL 생성 중 오류 발생: {str(gen_error)}"
+        finally:
+            residency.release(SQLCODER_RESIDENCY_NAME)
     except Exception as e:
         print(f"SQLCoder 쿼리 생성 오류: {str(e)}")
         return f"-- SQL 생성 중 오류 발생: {str(e)}"
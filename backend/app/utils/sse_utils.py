@@ -0,0 +1,101 @@
+"""
+SSE 프레이밍 모듈
+- orjson 직렬화 (미설치 시 표준 json으로 폴백)
+- 스트리밍 토큰을 시간 창(ms) 또는 바이트 임계값 기준으로 모아 하나의 프레임으로 전송
+- 캐시된 답변은 지연 없이 큰 프레임으로 즉시 재생
+- 생성 스트리머(TextIteratorStreamer)는 스레드에서 대기하며 순회하여 이벤트 루프를 막지 않음
+"""
+
+import json
+import time
+import asyncio
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+try:
+    import orjson
+except ImportError:  # orjson이 없으면 표준 json 사용
+    orjson = None
+
+# 기본 프레이밍 설정
+DEFAULT_COALESCE_WINDOW_MS = 30.0
+DEFAULT_COALESCE_MAX_BYTES = 256
+DEFAULT_REPLAY_CHUNK_CHARS = 512  # 프론트엔드가 읽기 단위별로 줄을 파싱하므로 프레임을 과도하게 키우지 않음
+
+
+def dumps(payload: Any) -> str:
+    """SSE 데이터용 JSON 직렬화"""
+    if orjson is not None:
+        return orjson.dumps(payload).decode("utf-8")
+    return json.dumps(payload)
+
+
+def format_sse(payload: Dict[str, Any]) -> str:
+    """SSE data 프레임 생성"""
+    return f"data: {dumps(payload)}\n\n"
+
+
+class TokenCoalescer:
+    """
+    스트리머에서 나온 텍스트 조각을 모아 token 프레임으로 묶는 버퍼
+
+    마지막 전송 이후 window_ms가 지났거나 버퍼가 max_bytes 이상이면 add()가 프레임을 반환합니다.
+    window_ms가 0이면 조각마다 바로 전송합니다 (기존 동작).
+    """
+
+    def __init__(
+        self,
+        window_ms: float = DEFAULT_COALESCE_WINDOW_MS,
+        max_bytes: int = DEFAULT_COALESCE_MAX_BYTES,
+    ):
+        self.window = max(0.0, window_ms) / 1000.0
+        self.max_bytes = max(1, max_bytes)
+        self._parts = []
+        self._size = 0
+        self._last_flush = time.monotonic()
+
+        # 통계
+        self.chunks = 0
+        self.frames = 0
+
+    def add(self, text: str) -> Optional[str]:
+        """텍스트 조각 추가 (전송할 프레임이 있으면 반환)"""
+        if not text:
+            return None
+        self._parts.append(text)
+        self._size += len(text.encode("utf-8"))
+        self.chunks += 1
+        if self._size >= self.max_bytes or time.monotonic() - self._last_flush >= self.window:
+            return self.flush()
+        return None
+
+    def flush(self) -> Optional[str]:
+        """버퍼에 남은 텍스트를 프레임으로 반환 (비어 있으면 None)"""
+        self._last_flush = time.monotonic()
+        if not self._parts:
+            return None
+        text = "".join(self._parts)
+        self._parts = []
+        self._size = 0
+        self.frames += 1
+        return format_sse({"token": text})
+
+
+async def iterate_streamer(streamer: Iterator[str]) -> AsyncIterator[str]:
+    """
+    TextIteratorStreamer 등 동기 반복자를 비동기로 순회
+
+    __next__는 다음 토큰까지 queue.get으로 대기하므로(모델 서버 대기열 대기 포함) 스레드에서 호출합니다.
+    이벤트 루프에서 직접 순회하면 대기하는 동안 워커의 다른 요청(헬스 체크, 업로드, 다른 SSE 스트림)이 모두 멈춥니다.
+    """
+    while True:
+        text = await asyncio.to_thread(next, streamer, None)
+        if text is None:
+            return
+        yield text
+
+
+def replay_answer_frames(answer: str, chunk_chars: int = DEFAULT_REPLAY_CHUNK_CHARS) -> Iterator[str]:
+    """캐시된 답변을 지연 없이 token 프레임으로 재생"""
+    chunk_chars = max(1, chunk_chars)
+    for i in range(0, len(answer), chunk_chars):
+        yield format_sse({"token": answer[i:i + chunk_chars]})
@@ -0,0 +1,235 @@
+"""
+시작 워밍업 모듈
+- 재시작 직후 첫 사용자가 콜드 경로(토크나이저/모델 커널 초기화, 빈 캐시)를 겪지 않도록 미리 실행
+- 합성 질문과 자주 묻는 질문(피드백 + 저장된 대화에서 추출)을 카테고리별로 실제 채팅 파이프라인에 통과
+  → 임베딩/검색/리랭크/생성 경로를 워밍하고 쿼리 임베딩/검색 결과/리랭크 점수/답변 캐시를 채움
+- 질문별 소요 시간과 첫 프레임까지의 시간, 전체 워밍업 시간 보고
+"""
+
+import os
+import json
+import time
+import asyncio
+import traceback
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.utils.feedback_analyzer import FeedbackAnalyzer
+from app.utils.result_cache import normalize_query
+
+# 기본 워밍업 설정
+DEFAULT_TOP_N = 5  # 카테고리별 자주 묻는 질문 수
+DEFAULT_MIN_COUNT = 2  # 자주 묻는 질문으로 볼 최소 등장 횟수
+DEFAULT_MAX_RUNS = 30  # 한 번의 워밍업에서 실행할 최대 (질문, 카테고리) 수
+CONVERSATION_DIR = "app/conversations"
+
+# 저장된 질문이 없어도 전체 경로(검색 → 리랭크 → 생성)를 한 번은 통과시키기 위한 합성 질문
+SYNTHETIC_QUESTIONS = ["이 문서의 주요 내용을 요약해 주세요."]
+
+WarmupPlan = List[Tuple[str, str]]  # (질문, 카테고리)
+
+
+def _conversation_questions(conversation_dir: str) -> List[str]:
+    """저장된 대화의 사용자 질문 목록"""
+    questions: List[str] = []
+    if not os.path.isdir(conversation_dir):
+        return questions
+    for filename in os.listdir(conversation_dir):
+        if not filename.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(conversation_dir, filename), "r", encoding="utf-8") as f:
+                conversation = json.load(f)
+        except Exception as e:
+            print(f"워밍업 대화 파일 로드 실패 ({filename}): {e}")
+            continue
+        for message in conversation.get("messages", []):
+            if message.get("role") == "user" and isinstance(message.get("content"), str):
+                questions.append(message["content"])
+    return questions
+
+
+def collect_frequent_questions(
+    top_n: int = DEFAULT_TOP_N,
+    min_count: int = DEFAULT_MIN_COUNT,
+    conversation_dir: str = CONVERSATION_DIR,
+) -> List[Dict[str, Any]]:
+    """
+    자주 묻는 질문 상위 top_n개 (정규화 질문 기준으로 집계)
+
+    피드백 분석기(FeedbackAnalyzer.extract_frequent_questions)의 질문 패턴과
+    저장된 대화의 사용자 질문을 합산합니다. 두 출처 모두 카테고리를 기록하지 않으므로
+    같은 목록을 워밍업 대상 카테고리마다 사용합니다.
+    """
+    counts: Counter = Counter()
+    originals: Dict[str, str] = {}  # 정규화 질문 -> 처음 본 원문
+
+    def add(question: str, count: int) -> None:
+        question = question.strip()
+        normalized = normalize_query(question)
+        if len(normalized) < 2:
+            return
+        counts[normalized] += count
+        originals.setdefault(normalized, question)
+
+    try:
+        for item in FeedbackAnalyzer().extract_frequent_questions(min_count=1):
+            add(item["question"], item["count"])
+    except Exception as e:
+        print(f"피드백 기반 자주 묻는 질문 추출 실패: {e}")
+
+    for question in _conversation_questions(conversation_dir):
+        add(question, 1)
+
+    return [
+        {"question": originals[normalized], "count": count}
+        for normalized, count in counts.most_common()
+        if count >= min_count
+    ][:top_n]
+
+
+def build_warmup_plan(
+    categories: List[str],
+    questions: List[str],
+    synthetic_questions: Optional[List[str]] = None,
+    max_runs: int = DEFAULT_MAX_RUNS,
+) -> WarmupPlan:
+    """카테고리별로 합성 질문 → 자주 묻는 질문 순서의 실행 목록 (max_runs개까지)"""
+    synthetic = SYNTHETIC_QUESTIONS if synthetic_questions is None else synthetic_questions
+    plan: WarmupPlan = []
+    for category in categories:
+        for question in [*synthetic, *questions]:
+            if len(plan) >= max_runs:
+                return plan
+            plan.append((question, category))
+    return plan
+
+
+async def drain_sse_response(response: Any) -> Tuple[str, Optional[float]]:
+    """
+    채팅 파이프라인 응답을 끝까지 소비
+
+    Returns:
+        (결과 상태, 첫 프레임까지의 시간) - 상태: generated, cached, no_docs, busy, not_ready, error
+    """
+    status_code = getattr(response, "status_code", 200)
+    body = getattr(response, "body_iterator", None)
+    if status_code == 503:
+        return ("not_ready" if b"not_ready" in getattr(response, "body", b"") else "busy"), None
+    if status_code != 200 or body is None:
+        return "error", None
+
+    start_time = time.time()
+    first_frame_time: Optional[float] = None
+    result = "generated"
+    async for chunk in body:
+        if first_frame_time is None:
+            first_frame_time = round(time.time() - start_time, 3)
+        text = chunk if isinstance(chunk, str) else chunk.decode("utf-8", errors="ignore")
+        for line in text.splitlines():
+            if not line.startswith("data: "):
+                continue
+            try:
+                frame = json.loads(line[len("data: "):])
+            except ValueError:
+                continue
+            if frame.get("event") == "busy":
+                result = "busy"
+            elif frame.get("event") == "cache_info":
+                result = "cached"
+            elif "error" in frame:
+                result = "error"
+            elif frame.get("token", "").startswith("관련 문서를 찾을 수 없습니다"):
+                result = "no_docs"
+    return result, first_frame_time
+
+
+class WarmupRunner:
+    """
+    워밍업 실행기 (이벤트 루프 스레드에서만 사용)
+
+    질문을 하나씩 순서대로 실행하므로 워밍업이 사용자 요청과 생성 슬롯을 다투는 것은 최대 하나입니다.
+    """
+
+    def __init__(self, run_question: Callable[[str, str], Awaitable[Any]]):
+        """
+        Args:
+            run_question: (질문, 카테고리)를 채팅 파이프라인에 넣고 응답을 반환하는 함수
+        """
+        self.run_question = run_question
+        self._task: Optional[asyncio.Task] = None
+        self.report: Dict[str, Any] = {"status": "idle"}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, plan_factory: Callable[[], Awaitable[WarmupPlan]], trigger: str = "manual") -> bool:
+        """
+        백그라운드 워밍업 시작
+
+        Args:
+            plan_factory: 모델 준비 대기 후 실행 목록을 반환하는 함수 (워밍업 작업 안에서 호출)
+
+        Returns:
+            새로 시작했으면 True (이미 실행 중이면 False)
+        """
+        if self.running:
+            return False
+        self.report = {"status": "pending", "trigger": trigger, "started_at": time.time()}
+        self._task = asyncio.create_task(self._run(plan_factory, trigger))
+        return True
+
+    async def _run(self, plan_factory: Callable[[], Awaitable[WarmupPlan]], trigger: str) -> None:
+        start_time = time.time()
+        report = self.report
+        try:
+            plan = await plan_factory()
+            prepare_time = time.time() - start_time
+            report.update({"status": "running", "planned": len(plan), "runs": []})
+            print(f"[워밍업] 시작: {len(plan)}개 질문 (준비 {prepare_time:.1f}초)")
+
+            for question, category in plan:
+                run_start = time.time()
+                try:
+                    response = await self.run_question(question, category)
+                    result, first_frame_time = await drain_sse_response(response)
+                except Exception as e:
+                    traceback.print_exc()
+                    result, first_frame_time = f"error: {e}", None
+                elapsed = round(time.time() - run_start, 3)
+                report["runs"].append({
+                    "question": question,
+                    "category": category,
+                    "result": result,
+                    "time": elapsed,
+                    "first_frame_time": first_frame_time,
+                })
+                print(f"[워밍업] '{question[:30]}' ({category}) → {result}, {elapsed:.2f}초")
+
+            runs = report["runs"]
+            report.update({
+                "status": "completed",
+                "prepare_time": round(prepare_time, 2),
+                "total_time": round(time.time() - start_time, 2),
+                "results": dict(Counter(run["result"] for run in runs)),
+            })
+            print(f"[워밍업] 완료: {len(runs)}개 질문, {report['total_time']:.1f}초")
+        except asyncio.CancelledError:
+            report.update({"status": "cancelled", "total_time": round(time.time() - start_time, 2)})
+            raise
+        except Exception as e:
+            traceback.print_exc()
+            report.update({"status": "failed", "error": str(e), "total_time": round(time.time() - start_time, 2)})
+        finally:
+            report["finished_at"] = time.time()
+
+    def cancel(self) -> None:
+        if self.running:
+            self._task.cancel()
+
+    def get_status(self) -> Dict[str, Any]:
+        status = dict(self.report)
+        if self.running and "started_at" in status:
+            status["elapsed"] = round(time.time() - status["started_at"], 2)
+        return status
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# backend 디렉토리를 import 경로에 추가 (app 패키지 임포트용)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
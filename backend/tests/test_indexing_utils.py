@@ -0,0 +1,73 @@
+"""
+check_file_exists 중복 확인 테스트
+- 실제 AsyncElasticsearch 클라이언트를 사용하고 HTTP 전송 계층만 고정 응답으로 대체
+  (elasticsearch-py 8.x API 메서드가 일반 함수로 감싸져 있어도 비동기 호출이 await되는지 확인)
+"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("elasticsearch")
+elastic_transport = pytest.importorskip("elastic_transport")
+
+from elasticsearch import AsyncElasticsearch
+
+from app.utils.indexing_utils import ES_INDEX_NAME, check_file_exists
+
+
+def _make_client(index_exists: bool, hits: list) -> tuple:
+    """(클라이언트, 요청 기록) - 전송 계층의 perform_request만 대체"""
+    client = AsyncElasticsearch("http://localhost:9200")
+    requests = []
+
+    async def perform_request(method, target, **kwargs):
+        requests.append((method, target))
+        meta = elastic_transport.ApiResponseMeta(
+            status=200 if method != "HEAD" or index_exists else 404,
+            http_version="1.1",
+            headers=elastic_transport.HttpHeaders({"x-elastic-product": "Elasticsearch"}),
+            duration=0.0,
+            node=elastic_transport.NodeConfig("http", "localhost", 9200),
+        )
+        body = None if method == "HEAD" else {"hits": {"hits": hits}}
+        return elastic_transport.TransportApiResponse(meta, body)
+
+    client.transport.perform_request = perform_request
+    return client, requests
+
+
+@pytest.fixture
+def uploaded_file(tmp_path):
+    path = tmp_path / "manual.txt"
+    path.write_text("중복 확인 테스트 문서", encoding="utf-8")
+    return str(path)
+
+
+def test_async_client_detects_duplicate(uploaded_file):
+    client, requests = _make_client(index_exists=True, hits=[{"_source": {"source": "manual.txt"}}])
+
+    exists, file_hash = asyncio.run(check_file_exists(client, uploaded_file))
+
+    assert exists is True
+    assert len(file_hash) == 32
+    assert [method for method, _ in requests] == ["HEAD", "POST"]
+    assert requests[1][1].startswith(f"/{ES_INDEX_NAME}/_search")
+
+
+def test_async_client_new_file(uploaded_file):
+    client, _ = _make_client(index_exists=True, hits=[])
+
+    exists, file_hash = asyncio.run(check_file_exists(client, uploaded_file))
+
+    assert exists is False
+    assert file_hash
+
+
+def test_async_client_missing_index(uploaded_file):
+    client, requests = _make_client(index_exists=False, hits=[{"_source": {}}])
+
+    exists, _ = asyncio.run(check_file_exists(client, uploaded_file))
+
+    assert exists is False
+    assert [method for method, _ in requests] == ["HEAD"]
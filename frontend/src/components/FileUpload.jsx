@@ -2,6 +2,12 @@ import { useState, useRef, useEffect } from "react";
 import { FiLoader, FiX, FiPaperclip, FiCheck, FiFolder, FiFile, FiUploadCloud, FiInfo } from 'react-icons/fi';
 import ReactDOM from 'react-dom';
 
+// 색인 작업 진행 상황 조회 설정
+const JOB_POLL_INTERVAL_MS = 1000;
+const JOB_POLL_MAX_BACKOFF_MS = 15000;
+const JOB_POLL_MAX_WAIT_MS = 30 * 60 * 1000; // 대용량/OCR 파일을 고려한 최대 대기 시간
+const JOB_POLL_RETRY_STATUSES = [429, 500, 502, 503, 504]; // 재시작/모델 로딩 중 등 일시적인 응답
+
 // 임베딩 완료 모달 컴포넌트 추가
 const EmbeddingCompleteModal = ({ isVisible, onClose }) => {
   useEffect(() => {
@@ -86,6 +92,47 @@ function FileUpload({ onClose, categories = ['메뉴얼'], onUploadSuccess, init
     setFiles(prevFiles => prevFiles.filter((_, i) => i !== index));
   };
 
+  // 색인 작업 진행 상황 조회 (완료되면 기존 업로드 응답 형식의 결과 반환)
+  // 서버 재시작/모델 로딩 중(503) 등 일시적인 오류는 간격을 늘려 가며 재시도하고, 전체 대기 시간은 제한
+  const waitForJob = async (jobId) => {
+    const startedAt = Date.now();
+    let delay = JOB_POLL_INTERVAL_MS;
+    
+    while (Date.now() - startedAt < JOB_POLL_MAX_WAIT_MS) {
+      let job = null;
+      try {
+        const response = await fetch(`/api/jobs/${jobId}`, {
+          headers: { 'Cache-Control': 'no-cache, no-store, must-revalidate' }
+        });
+        if (response.ok) {
+          job = await response.json();
+        } else if (!JOB_POLL_RETRY_STATUSES.includes(response.status)) {
+          throw new Error(`작업 조회 오류: ${response.status} ${response.statusText}`);
+        } else {
+          console.warn(`작업 조회 일시 오류 (${response.status}), 재시도 예정`);
+        }
+      } catch (error) {
+        // fetch 자체 실패(서버 재시작 중 연결 거부 등)는 재시도, 그 외 오류는 그대로 전달
+        if (!(error instanceof TypeError)) throw error;
+        console.warn(`작업 조회 연결 오류, 재시도 예정:`, error);
+      }
+      
+      if (job) {
+        setFileResults(job.results || []);
+        setUploadProgress(job.progress || 0);
+        if (job.status === 'completed' || job.status === 'failed') {
+          return job.upload_result || job;
+        }
+        delay = JOB_POLL_INTERVAL_MS;
+      } else {
+        delay = Math.min(delay * 2, JOB_POLL_MAX_BACKOFF_MS);
+      }
+      await new Promise(resolve => setTimeout(resolve, delay));
+    }
+    
+    throw new Error('색인 작업이 아직 진행 중입니다. 잠시 후 문서 목록에서 결과를 확인해주세요.');
+  };
+  
   const handleSubmit = async (e) => {
     e.preventDefault();
     if (files.length === 0) {
@@ -136,7 +183,13 @@ function FileUpload({ onClose, categories = ['메뉴얼'], onUploadSuccess, init
         throw new Error(`서버 오류: ${response.status} ${response.statusText}`);
       }
       
-      const data = await response.json();
+      let data = await response.json();
+      
+      // 백그라운드 색인 작업으로 등록된 경우 완료될 때까지 실제 진행률 조회
+      if (data.job_id && data.status === 'queued') {
+        setUploadStatus('인덱싱 중...');
+        data = await waitForJob(data.job_id);
+      }
       
       // 파일별 결과 저장
       if (data.results && data.results.length > 0) {